@@ -1 +1,105 @@
 """Schemas represent the public facing models that are exposed via HTTP endpoints and serialised to xml/json etc"""
+
+from typing import Iterable, Optional
+
+from envoy_schema import lazy_import
+
+# Public classes available directly from this package (name: defining submodule). Submodules are only imported on
+# first access of one of their names. This is kept in sync with the submodules by tests/unit/test_lazy_import.py
+_LAZY_IMPORTS: dict[str, str] = {
+    "AggregatorDomain": "aggregator",
+    "AggregatorDomainPageResponse": "aggregator",
+    "AggregatorDomainResponse": "aggregator",
+    "AggregatorPageResponse": "aggregator",
+    "AggregatorRequest": "aggregator",
+    "AggregatorResponse": "aggregator",
+    "ArchiveBase": "archive",
+    "ArchiveDynamicOperatingEnvelopeResponse": "archive",
+    "ArchivePageResponse": "archive",
+    "ArchiveSiteResponse": "archive",
+    "ArchiveTariffGeneratedRateResponse": "archive",
+    "BasePageModel": "base",
+    "AggregatorBillingResponse": "billing",
+    "BaseBillingResponse": "billing",
+    "BillingDoe": "billing",
+    "BillingReading": "billing",
+    "BillingTariffRate": "billing",
+    "CalculationLogBillingResponse": "billing",
+    "SiteBillingRequest": "billing",
+    "SiteBillingResponse": "billing",
+    "BillingCalculation": "billing_calculator",
+    "BillingIntervalCost": "billing_calculator",
+    "SiteBillingCost": "billing_calculator",
+    "SiteBillingResponseBuilder": "billing_stream",
+    "SiteBillingResponseReader": "billing_stream",
+    "SiteBillingSlice": "billing_stream",
+    "CertificateAssignmentRequest": "certificate",
+    "CertificatePageResponse": "certificate",
+    "CertificateRequest": "certificate",
+    "CertificateResponse": "certificate",
+    "ColumnarField": "columnar",
+    "ColumnarTable": "columnar",
+    "RuntimeServerConfigRequest": "config",
+    "RuntimeServerConfigResponse": "config",
+    "DoePageResponse": "doe",
+    "DynamicOperatingEnvelopeRequest": "doe",
+    "DynamicOperatingEnvelopeResponse": "doe",
+    "DoeComplianceReport": "doe_compliance",
+    "SiteDoeCompliance": "doe_compliance",
+    "CalculationLogLabelMetadata": "log",
+    "CalculationLogLabelValues": "log",
+    "CalculationLogListResponse": "log",
+    "CalculationLogRequest": "log",
+    "CalculationLogResponse": "log",
+    "CalculationLogVariableMetadata": "log",
+    "CalculationLogVariableValues": "log",
+    "CalculationLogVariableArrays": "log_arrays",
+    "CalculationLogVariableIndex": "log_index",
+    "CalculationLogColumnsStreamDecoder": "log_stream",
+    "CalculationLogStreamDecoder": "log_stream",
+    "ColumnChunk": "log_stream",
+    "StreamedCalculationLog": "log_stream",
+    "TariffGeneratedRateRequest": "pricing",
+    "TariffGeneratedRateResponse": "pricing",
+    "TariffRequest": "pricing",
+    "TariffResponse": "pricing",
+    "DERAvailability": "site",
+    "DERConfiguration": "site",
+    "DERStatus": "site",
+    "SiteGroup": "site",
+    "SitePageResponse": "site",
+    "SiteResponse": "site",
+    "SiteUpdateRequest": "site",
+    "SiteControlGroupDefaultRequest": "site_control",
+    "SiteControlGroupDefaultResponse": "site_control",
+    "SiteControlGroupPageResponse": "site_control",
+    "SiteControlGroupRequest": "site_control",
+    "SiteControlGroupResponse": "site_control",
+    "SiteControlPageResponse": "site_control",
+    "SiteControlRequest": "site_control",
+    "SiteControlResponse": "site_control",
+    "UpdateDefaultValue": "site_control",
+    "SiteControlEncoder": "site_control_encoder",
+    "SiteControlIndex": "site_control_index",
+    "SiteGroupPageResponse": "site_group",
+    "SiteGroupResponse": "site_group",
+    "CSIPAusSiteReading": "site_reading",
+    "CSIPAusSiteReadingPageResponse": "site_reading",
+    "CSIPAusSiteReadingUnit": "site_reading",
+    "PhaseEnum": "site_reading",
+    "NormalisedReadings": "site_reading_normaliser",
+    "SiteReadingNormaliser": "site_reading_normaliser",
+}
+
+__all__ = sorted(_LAZY_IMPORTS)
+
+__getattr__ = lazy_import.lazy_module_getattr(__name__, _LAZY_IMPORTS, globals())
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
+
+
+def warm_up(modules: Optional[Iterable[str]] = None) -> None:
+    """Imports (and completes any deferred schema build for) the specified submodules (default: all of them)"""
+    lazy_import.warm_up(__name__, _LAZY_IMPORTS, modules)
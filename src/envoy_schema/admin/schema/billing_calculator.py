@@ -0,0 +1,176 @@
+"""Cost calculation for billing responses (AggregatorBillingResponse, SiteBillingResponse and
+CalculationLogBillingResponse).
+
+BaseBillingResponse guarantees every list is ordered by site_id then period_start, so readings are priced with a
+single merge-join pass over wh_readings / varh_readings and active_tariffs (O(readings + tariffs) - no per reading
+searching):
+
+    * a reading is priced by the BillingTariffRate (of the same site) that is active at the reading's period_start
+    * positive (import) values use the import price, negative (export) values use the export price
+    * cost = value / 1000 * price (prices are $ per kWh / kvarh). Exports at a positive price produce a negative cost
+    * readings without an active tariff rate are reported as unpriced (and excluded from the costs)
+
+Every value is calculated with exact Decimal arithmetic."""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from operator import attrgetter, le
+from typing import NamedTuple, Sequence, Union
+
+from envoy_schema.admin.schema.billing import BaseBillingResponse, BillingReading, BillingTariffRate
+
+UNITS_PER_KILO_UNIT = Decimal(1000)  # Readings are in Wh / varh but prices are per kWh / kvarh
+
+_ZERO = Decimal(0)
+_ORDER_KEY = attrgetter("site_id", "period_start")
+
+
+class BillingIntervalCost(NamedTuple):
+    """The cost of a single billing reading"""
+
+    site_id: int
+    period_start: datetime
+    duration_seconds: int
+    value: Decimal  # The reading value (Wh / varh). Positive indicates import, negative indicates export
+    price: Decimal  # The import (or export) price that was applied ($ per kWh / kvarh)
+    cost: Decimal  # value / 1000 * price
+
+
+class SiteBillingCost(NamedTuple):
+    """The totals of every priced reading for a single site"""
+
+    site_id: int
+    import_active_wh: Decimal
+    export_active_wh: Decimal  # Positive value
+    import_active_cost: Decimal
+    export_active_cost: Decimal
+    import_reactive_varh: Decimal
+    export_reactive_varh: Decimal  # Positive value
+    import_reactive_cost: Decimal
+    export_reactive_cost: Decimal
+    total_cost: Decimal  # Sum of every cost
+    unpriced_readings: int  # Number of readings (of this site) without an active tariff rate
+
+
+class BillingCalculation(NamedTuple):
+    """The costs of a billing response"""
+
+    tariff_id: int
+    active_costs: list[BillingIntervalCost]  # Priced wh_readings (ordered by site_id then period_start)
+    reactive_costs: list[BillingIntervalCost]  # Priced varh_readings (ordered by site_id then period_start)
+    unpriced_readings: list[BillingReading]  # wh / varh readings without an active tariff rate
+    sites: list[SiteBillingCost]  # Ordered by site_id
+    total_cost: Decimal
+
+
+def _check_order(name: str, items: Sequence[Union[BillingReading, BillingTariffRate]]) -> None:
+    keys = list(map(_ORDER_KEY, items))
+    if not all(map(le, keys, keys[1:])):
+        raise ValueError(f"{name} must be ordered by site_id then period_start.")
+
+
+def price_readings(
+    readings: Sequence[BillingReading],
+    tariffs: Sequence[BillingTariffRate],
+    import_price: str = "import_active_price",
+    export_price: str = "export_active_price",
+) -> tuple[list[BillingIntervalCost], list[BillingReading]]:
+    """Merge-joins readings with tariffs (both ordered by site_id then period_start) returning (costs, unpriced). The
+    prices applied are the import_price / export_price attributes of each BillingTariffRate. Raises ValueError if
+    readings or tariffs aren't ordered"""
+    _check_order("readings", readings)
+    _check_order("tariffs", tariffs)
+    get_import_price = attrgetter(import_price)
+    get_export_price = attrgetter(export_price)
+    tariff_ends = [t.period_start + timedelta(seconds=t.duration_seconds) for t in tariffs]
+
+    costs: list[BillingIntervalCost] = []
+    unpriced: list[BillingReading] = []
+    t = 0
+    for reading in readings:
+        site_id, start = reading.site_id, reading.period_start
+
+        # Skip tariffs of earlier sites (or that end before this reading). Readings are ordered so these are never
+        # needed again
+        while t < len(tariffs) and (
+            tariffs[t].site_id < site_id or (tariffs[t].site_id == site_id and tariff_ends[t] <= start)
+        ):
+            t += 1
+
+        if t == len(tariffs) or tariffs[t].site_id != site_id or tariffs[t].period_start > start:
+            unpriced.append(reading)
+            continue
+
+        price = get_import_price(tariffs[t]) if reading.value >= 0 else get_export_price(tariffs[t])
+        costs.append(
+            BillingIntervalCost(
+                site_id=site_id,
+                period_start=start,
+                duration_seconds=reading.duration_seconds,
+                value=reading.value,
+                price=price,
+                cost=reading.value / UNITS_PER_KILO_UNIT * price,
+            )
+        )
+    return costs, unpriced
+
+
+def _site_totals(costs: list[BillingIntervalCost]) -> dict[int, list[Decimal]]:
+    """site_id -> [import value, export value (positive), import cost, export cost] (single pass over costs)"""
+    totals: dict[int, list[Decimal]] = {}
+    for cost in costs:
+        site_totals = totals.get(cost.site_id)
+        if site_totals is None:
+            site_totals = totals[cost.site_id] = [_ZERO, _ZERO, _ZERO, _ZERO]
+        if cost.value >= 0:
+            site_totals[0] += cost.value
+            site_totals[2] += cost.cost
+        else:
+            site_totals[1] -= cost.value
+            site_totals[3] += cost.cost
+    return totals
+
+
+def calculate_billing(response: BaseBillingResponse) -> BillingCalculation:
+    """Prices the wh_readings (with active prices) and varh_readings (with reactive prices) of response against its
+    active_tariffs. Raises ValueError if the lists of response aren't ordered by site_id then period_start"""
+    active_costs, unpriced_active = price_readings(response.wh_readings, response.active_tariffs)
+    reactive_costs, unpriced_reactive = price_readings(
+        response.varh_readings, response.active_tariffs, "import_reactive_price", "export_reactive_price"
+    )
+
+    active_totals = _site_totals(active_costs)
+    reactive_totals = _site_totals(reactive_costs)
+    unpriced_counts: dict[int, int] = {}
+    for reading in unpriced_active + unpriced_reactive:
+        unpriced_counts[reading.site_id] = unpriced_counts.get(reading.site_id, 0) + 1
+
+    empty = [_ZERO, _ZERO, _ZERO, _ZERO]
+    sites: list[SiteBillingCost] = []
+    for site_id in sorted(active_totals.keys() | reactive_totals.keys() | unpriced_counts.keys()):
+        active = active_totals.get(site_id, empty)
+        reactive = reactive_totals.get(site_id, empty)
+        sites.append(
+            SiteBillingCost(
+                site_id=site_id,
+                import_active_wh=active[0],
+                export_active_wh=active[1],
+                import_active_cost=active[2],
+                export_active_cost=active[3],
+                import_reactive_varh=reactive[0],
+                export_reactive_varh=reactive[1],
+                import_reactive_cost=reactive[2],
+                export_reactive_cost=reactive[3],
+                total_cost=active[2] + active[3] + reactive[2] + reactive[3],
+                unpriced_readings=unpriced_counts.get(site_id, 0),
+            )
+        )
+
+    return BillingCalculation(
+        tariff_id=response.tariff_id,
+        active_costs=active_costs,
+        reactive_costs=reactive_costs,
+        unpriced_readings=unpriced_active + unpriced_reactive,
+        sites=sites,
+        total_cost=sum((s.total_cost for s in sites), _ZERO),
+    )
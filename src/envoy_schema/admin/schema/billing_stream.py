@@ -0,0 +1,240 @@
+"""Chunked (site bounded) building and reading of SiteBillingResponse JSON.
+
+SiteBillingRequest.site_ids is capped at MAX_SITE_IDS_IN_REQUEST and a SiteBillingResponse holds every reading / tariff
+/ DOE of its sites in memory at once. For larger site lists:
+
+    Server - SiteBillingResponseBuilder accepts the response a chunk (of sites) at a time and immediately encodes
+    each chunk's lists to (spooled) temporary files. iter_json then yields a single SiteBillingResponse JSON document
+    (identical to SiteBillingResponse.model_dump_json()) without ever holding more than one chunk of models.
+
+    Client - SiteBillingResponseReader indexes a SiteBillingResponse document (bytes or an mmap of a file) without
+    decoding it and then yields one SiteBillingSlice (the models of a single site) at a time.
+
+The reader relies on the items of every list being flat JSON objects (true of BillingReading, BillingTariffRate and
+BillingDoe) that are ordered by site_id (as documented on BaseBillingResponse)."""
+
+import mmap
+import re
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import IO, Any, Iterator, NamedTuple, Optional, Union
+
+from pydantic import TypeAdapter
+
+from envoy_schema.admin.schema.billing import (
+    MAX_SITE_IDS_IN_REQUEST,
+    BaseBillingResponse,
+    BillingDoe,
+    BillingReading,
+    BillingTariffRate,
+    SiteBillingRequest,
+    SiteBillingResponse,
+)
+
+DEFAULT_SPOOL_BYTES = 16 * 1024 * 1024  # Encoded bytes (per list) held in memory before spooling to disk
+DEFAULT_READ_SIZE = 1024 * 1024
+
+BILLING_LIST_ADAPTERS: dict[str, TypeAdapter] = {
+    "varh_readings": TypeAdapter(list[BillingReading]),
+    "wh_readings": TypeAdapter(list[BillingReading]),
+    "watt_readings": TypeAdapter(list[BillingReading]),
+    "active_tariffs": TypeAdapter(list[BillingTariffRate]),
+    "active_does": TypeAdapter(list[BillingDoe]),
+}
+
+_SECTION = re.compile(rb'"(' + b"|".join(n.encode() for n in BILLING_LIST_ADAPTERS) + rb')"\s*:\s*\[([^\]]*)\]')
+_ITEM = re.compile(rb"\{[^{}]*\}")
+_ITEM_SITE_ID = re.compile(rb'"site_id"\s*:\s*(-?\d+)')
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")  # JSON insignificant whitespace
+_SEPARATOR = re.compile(rb"[ \t\n\r]*,[ \t\n\r]*")
+
+
+def site_billing_requests(
+    site_ids: list[int],
+    period_start: datetime,
+    period_end: datetime,
+    tariff_id: int,
+    sites_per_request: int = MAX_SITE_IDS_IN_REQUEST,
+) -> Iterator[SiteBillingRequest]:
+    """Splits site_ids (in order) into as many SiteBillingRequest's as required to respect MAX_SITE_IDS_IN_REQUEST"""
+    if not 0 < sites_per_request <= MAX_SITE_IDS_IN_REQUEST:
+        raise ValueError(f"sites_per_request must be between 1 and {MAX_SITE_IDS_IN_REQUEST}.")
+    for offset in range(0, len(site_ids), sites_per_request):
+        end = offset + sites_per_request
+        yield SiteBillingRequest(
+            site_ids=site_ids[offset:end],
+            period_start=period_start,
+            period_end=period_end,
+            tariff_id=tariff_id,
+        )
+
+
+class SiteBillingResponseBuilder:
+    """Builds a single SiteBillingResponse JSON document from responses for (ascending) chunks of sites
+
+    builder = SiteBillingResponseBuilder(tariff_id, site_ids, period_start, period_end)
+    for chunk in chunks:  # eg one BaseBillingResponse per SiteBillingRequest
+        builder.add(chunk)
+    for data in builder.iter_json():
+        ...
+    """
+
+    def __init__(
+        self,
+        tariff_id: int,
+        site_ids: list[int],
+        period_start: datetime,
+        period_end: datetime,
+        spool_bytes: int = DEFAULT_SPOOL_BYTES,
+    ):
+        self._header = SiteBillingResponse(
+            tariff_id=tariff_id,
+            site_ids=site_ids,
+            period_start=period_start,
+            period_end=period_end,
+            varh_readings=[],
+            wh_readings=[],
+            watt_readings=[],
+            active_tariffs=[],
+            active_does=[],
+        )
+        self._spools: dict[str, IO[bytes]] = {
+            name: tempfile.SpooledTemporaryFile(max_size=spool_bytes) for name in BILLING_LIST_ADAPTERS
+        }
+        self._last_site_ids: dict[str, Optional[int]] = {name: None for name in BILLING_LIST_ADAPTERS}
+
+    def __enter__(self) -> "SiteBillingResponseBuilder":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def add(self, chunk: BaseBillingResponse) -> None:
+        """Appends the lists of chunk. Every site_id of chunk must be greater than those of previously added chunks
+        (ValueError is raised otherwise)"""
+        for name, adapter in BILLING_LIST_ADAPTERS.items():
+            items = getattr(chunk, name)
+            if not items:
+                continue
+
+            last_site_id = self._last_site_ids[name]
+            if last_site_id is not None and items[0].site_id <= last_site_id:
+                raise ValueError(
+                    f"{name} site_id {items[0].site_id} must be greater than the site_id {last_site_id} of an earlier "
+                    "chunk."
+                )
+            self._last_site_ids[name] = items[-1].site_id
+
+            spool = self._spools[name]
+            if spool.tell():
+                spool.write(b",")
+            spool.write(adapter.dump_json(items)[1:-1])  # Strip the enclosing []
+
+    def iter_json(self, read_size: int = DEFAULT_READ_SIZE) -> Iterator[bytes]:
+        """Yields the SiteBillingResponse JSON document (in pieces of at most read_size bytes)"""
+        remaining = self._header.model_dump_json().encode()
+        for name in BILLING_LIST_ADAPTERS:
+            marker = f'"{name}":['.encode()
+            before, after = remaining.split(marker, 1)
+            yield before + marker
+
+            spool = self._spools[name]
+            spool.seek(0)
+            while data := spool.read(read_size):
+                yield data
+            spool.seek(0, 2)
+            remaining = after
+        yield remaining
+
+    def to_json(self) -> bytes:
+        return b"".join(self.iter_json())
+
+    def close(self) -> None:
+        for spool in self._spools.values():
+            spool.close()
+
+
+class SiteBillingSlice(NamedTuple):
+    """Every reading / tariff / DOE of a single site (from a SiteBillingResponse)"""
+
+    site_id: int
+    varh_readings: list[BillingReading]
+    wh_readings: list[BillingReading]
+    watt_readings: list[BillingReading]
+    active_tariffs: list[BillingTariffRate]
+    active_does: list[BillingDoe]
+
+
+class _ListIndex(NamedTuple):
+    site_ids: array  # array("q") - site_id of each item
+    starts: array  # array("q") - offset of the first byte of each item
+    ends: array  # array("q") - offset after the last byte of each item
+
+
+class SiteBillingResponseReader:
+    """Indexes a SiteBillingResponse JSON document so that it can be decoded a site at a time. raw can be any buffer
+    (eg an mmap.mmap of a file - which keeps the document itself out of process memory). Raises ValueError if raw isn't
+    a well formed SiteBillingResponse - the contents of each list item are only validated as the item's site is
+    decoded"""
+
+    def __init__(self, raw: Union[bytes, bytearray, mmap.mmap]):
+        self._raw = raw
+        self._lists: dict[str, _ListIndex] = {}
+
+        header_parts: list[bytes] = []
+        position = 0
+        for section in _SECTION.finditer(raw):
+            name = section.group(1).decode()
+            if name in self._lists:
+                raise ValueError(f"{name} appears more than once.")
+            items_start, items_end = section.span(2)
+            header_parts.append(bytes(raw[position:items_start]))
+            position = items_end
+            self._lists[name] = self._index_section(name, items_start, items_end)
+        header_parts.append(bytes(raw[position:]))
+
+        # Everything other than the list items is small - validate it as a SiteBillingResponse with empty lists
+        self.response = SiteBillingResponse.model_validate_json(b"".join(header_parts))
+
+    def _index_section(self, name: str, start: int, end: int) -> _ListIndex:
+        index = _ListIndex(array("q"), array("q"), array("q"))
+        position = start
+        for item in _ITEM.finditer(self._raw, start, end):
+            gap = _SEPARATOR if index.starts else _WHITESPACE
+            if not gap.fullmatch(self._raw, position, item.start()):
+                raise ValueError(f"{name} has unexpected content at offset {position}.")
+            position = item.end()
+            site_id = _ITEM_SITE_ID.search(item.group())
+            if site_id is None:
+                raise ValueError(f"{name} item at offset {item.start()} has no site_id.")
+            if index.site_ids and int(site_id.group(1)) < index.site_ids[-1]:
+                raise ValueError(f"{name} isn't ordered by site_id (at offset {item.start()}).")
+            index.site_ids.append(int(site_id.group(1)))
+            index.starts.append(item.start())
+            index.ends.append(item.end())
+        if not _WHITESPACE.fullmatch(self._raw, position, end):
+            raise ValueError(f"{name} has unexpected content at offset {position}.")
+        return index
+
+    def site_ids(self) -> list[int]:
+        """Every site_id with at least one item (in ascending order)"""
+        return sorted(set().union(*(set(index.site_ids) for index in self._lists.values())))
+
+    def _decode(self, name: str, site_id: int) -> list:
+        index = self._lists[name]
+        first = bisect_left(index.site_ids, site_id)
+        last = bisect_right(index.site_ids, site_id)
+        if first == last:
+            return []
+        items = b",".join(self._raw[s:e] for s, e in zip(index.starts[first:last], index.ends[first:last]))
+        return BILLING_LIST_ADAPTERS[name].validate_json(b"[" + items + b"]")
+
+    def site_slice(self, site_id: int) -> SiteBillingSlice:
+        """Decodes every item of site_id (O(log n) to locate + the cost of decoding the site's items)"""
+        return SiteBillingSlice(site_id, *(self._decode(name, site_id) for name in BILLING_LIST_ADAPTERS))
+
+    def __iter__(self) -> Iterator[SiteBillingSlice]:
+        for site_id in self.site_ids():
+            yield self.site_slice(site_id)
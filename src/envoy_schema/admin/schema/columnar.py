@@ -0,0 +1,257 @@
+"""Columnar (Apache Arrow / Parquet) export of calculation log and billing responses.
+
+Each response is flattened into one or more named ColumnarTable's - plain python columns alongside a stable schema
+(the schema is defined here rather than inferred so that it doesn't vary with the data, eg an empty list or a column
+of all None values):
+
+    CalculationLogResponse / CalculationLogListResponse:
+        calculation_logs, variable_metadata, variable_values, label_metadata, label_values
+        (child tables are keyed by calculation_log_id)
+    BaseBillingResponse (and subclasses):
+        wh_readings, varh_readings, watt_readings, active_tariffs, active_does
+        (the scalar fields of the response eg tariff_id are stored as table metadata)
+
+Types map as int -> int64, float -> float64, str -> string, Decimal -> decimal128(DECIMAL_PRECISION, DECIMAL_SCALE) and
+datetime -> timestamp[us, tz=UTC] (timezone aware datetimes are converted to UTC).
+
+Flattening only requires the standard library. Converting to Arrow tables / writing Parquet requires the optional
+pyarrow dependency (pip install envoy_schema[arrow]):
+
+    tables = billing_tables(response)
+    write_parquet(tables, "/path/to/directory")  # one {name}.parquet per table"""
+
+from itertools import repeat
+from operator import attrgetter
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple, Sequence, Union
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from envoy_schema.admin.schema.billing import BaseBillingResponse
+from envoy_schema.admin.schema.log import CalculationLogListResponse, CalculationLogResponse
+
+ARROW_INT64 = "int64"
+ARROW_FLOAT64 = "float64"
+ARROW_STRING = "string"
+ARROW_DECIMAL = "decimal"
+ARROW_TIMESTAMP = "timestamp"
+
+DECIMAL_PRECISION = 38
+DECIMAL_SCALE = 10  # Values with more decimal places than this will fail to convert
+TIMESTAMP_UNIT = "us"
+TIMESTAMP_TZ = "UTC"
+
+
+class ColumnarField(NamedTuple):
+    """A single column of a ColumnarTable schema"""
+
+    name: str
+    type: str  # One of the ARROW_* values
+    nullable: bool = False
+
+
+class ColumnarTable(NamedTuple):
+    """A flattened table - every column has the same length and is ordered as per schema"""
+
+    name: str
+    schema: tuple[ColumnarField, ...]
+    columns: dict[str, list]
+    metadata: dict[str, str]  # Any additional (scalar) values of the exported model. Values are JSON encoded
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+
+CALCULATION_LOG_FIELDS = (
+    ColumnarField("calculation_log_id", ARROW_INT64),
+    ColumnarField("created_time", ARROW_TIMESTAMP),
+    ColumnarField("calculation_range_start", ARROW_TIMESTAMP),
+    ColumnarField("calculation_range_duration_seconds", ARROW_INT64),
+    ColumnarField("interval_width_seconds", ARROW_INT64),
+    ColumnarField("topology_id", ARROW_STRING, nullable=True),
+    ColumnarField("external_id", ARROW_STRING, nullable=True),
+    ColumnarField("description", ARROW_STRING, nullable=True),
+    ColumnarField("power_forecast_creation_time", ARROW_TIMESTAMP, nullable=True),
+    ColumnarField("power_forecast_basis_time", ARROW_TIMESTAMP, nullable=True),
+    ColumnarField("weather_forecast_creation_time", ARROW_TIMESTAMP, nullable=True),
+    ColumnarField("weather_forecast_location_id", ARROW_STRING, nullable=True),
+)
+VARIABLE_METADATA_FIELDS = (
+    ColumnarField("calculation_log_id", ARROW_INT64),
+    ColumnarField("variable_id", ARROW_INT64),
+    ColumnarField("name", ARROW_STRING),
+    ColumnarField("description", ARROW_STRING),
+)
+VARIABLE_VALUE_FIELDS = (
+    ColumnarField("calculation_log_id", ARROW_INT64),
+    ColumnarField("variable_id", ARROW_INT64),
+    ColumnarField("site_id", ARROW_INT64, nullable=True),
+    ColumnarField("interval_period", ARROW_INT64),
+    ColumnarField("value", ARROW_FLOAT64),
+)
+LABEL_METADATA_FIELDS = (
+    ColumnarField("calculation_log_id", ARROW_INT64),
+    ColumnarField("label_id", ARROW_INT64),
+    ColumnarField("name", ARROW_STRING),
+    ColumnarField("description", ARROW_STRING),
+)
+LABEL_VALUE_FIELDS = (
+    ColumnarField("calculation_log_id", ARROW_INT64),
+    ColumnarField("label_id", ARROW_INT64),
+    ColumnarField("site_id", ARROW_INT64, nullable=True),
+    ColumnarField("value", ARROW_STRING),
+)
+BILLING_READING_FIELDS = (
+    ColumnarField("site_id", ARROW_INT64),
+    ColumnarField("period_start", ARROW_TIMESTAMP),
+    ColumnarField("duration_seconds", ARROW_INT64),
+    ColumnarField("value", ARROW_DECIMAL),
+)
+BILLING_TARIFF_RATE_FIELDS = (
+    ColumnarField("site_id", ARROW_INT64),
+    ColumnarField("period_start", ARROW_TIMESTAMP),
+    ColumnarField("duration_seconds", ARROW_INT64),
+    ColumnarField("import_active_price", ARROW_DECIMAL),
+    ColumnarField("export_active_price", ARROW_DECIMAL),
+    ColumnarField("import_reactive_price", ARROW_DECIMAL),
+    ColumnarField("export_reactive_price", ARROW_DECIMAL),
+)
+BILLING_DOE_FIELDS = (
+    ColumnarField("site_id", ARROW_INT64),
+    ColumnarField("period_start", ARROW_TIMESTAMP),
+    ColumnarField("duration_seconds", ARROW_INT64),
+    ColumnarField("import_limit_active_watts", ARROW_DECIMAL),
+    ColumnarField("export_limit_watts", ARROW_DECIMAL),
+)
+
+BILLING_TABLE_FIELDS: dict[str, tuple[ColumnarField, ...]] = {
+    "wh_readings": BILLING_READING_FIELDS,
+    "varh_readings": BILLING_READING_FIELDS,
+    "watt_readings": BILLING_READING_FIELDS,
+    "active_tariffs": BILLING_TARIFF_RATE_FIELDS,
+    "active_does": BILLING_DOE_FIELDS,
+}
+
+
+def _model_columns(schema: tuple[ColumnarField, ...], models: Sequence[Any]) -> dict[str, list]:
+    """Transposes models (with an attribute per schema field) into columns"""
+    names = [f.name for f in schema]
+    if not models:
+        return {name: [] for name in names}
+    rows = map(attrgetter(*names), models)
+    return {name: list(column) for name, column in zip(names, zip(*rows))}
+
+
+def _scalar_metadata(model: BaseModel, exclude: Iterable[str]) -> dict[str, str]:
+    values = model.model_dump(mode="json", exclude=set(exclude))
+    return {name: to_json(value).decode() for name, value in values.items()}
+
+
+def calculation_log_tables(logs: Iterable[CalculationLogResponse]) -> dict[str, ColumnarTable]:
+    """Flattens logs into calculation_logs, variable_metadata, variable_values, label_metadata and label_values
+    tables (child rows reference their parent via calculation_log_id)"""
+    logs = list(logs)
+    variable_metadata = _model_columns(VARIABLE_METADATA_FIELDS[1:], [m for log in logs for m in log.variable_metadata])
+    label_metadata = _model_columns(LABEL_METADATA_FIELDS[1:], [m for log in logs for m in log.label_metadata])
+    variable_values: dict[str, list] = {f.name: [] for f in VARIABLE_VALUE_FIELDS}
+    label_values: dict[str, list] = {f.name: [] for f in LABEL_VALUE_FIELDS}
+    for log in logs:
+        if log.variable_values is not None:
+            variable_values["calculation_log_id"].extend(
+                repeat(log.calculation_log_id, len(log.variable_values.values))
+            )
+            variable_values["variable_id"].extend(log.variable_values.variable_ids)
+            variable_values["site_id"].extend(log.variable_values.site_ids)
+            variable_values["interval_period"].extend(log.variable_values.interval_periods)
+            variable_values["value"].extend(log.variable_values.values)
+        if log.label_values is not None:
+            label_values["calculation_log_id"].extend(repeat(log.calculation_log_id, len(log.label_values.values)))
+            label_values["label_id"].extend(log.label_values.label_ids)
+            label_values["site_id"].extend(log.label_values.site_ids)
+            label_values["value"].extend(log.label_values.values)
+
+    return {
+        "calculation_logs": ColumnarTable(
+            "calculation_logs", CALCULATION_LOG_FIELDS, _model_columns(CALCULATION_LOG_FIELDS, logs), {}
+        ),
+        "variable_metadata": ColumnarTable(
+            "variable_metadata",
+            VARIABLE_METADATA_FIELDS,
+            {"calculation_log_id": [log.calculation_log_id for log in logs for _ in log.variable_metadata]}
+            | variable_metadata,
+            {},
+        ),
+        "variable_values": ColumnarTable("variable_values", VARIABLE_VALUE_FIELDS, variable_values, {}),
+        "label_metadata": ColumnarTable(
+            "label_metadata",
+            LABEL_METADATA_FIELDS,
+            {"calculation_log_id": [log.calculation_log_id for log in logs for _ in log.label_metadata]}
+            | label_metadata,
+            {},
+        ),
+        "label_values": ColumnarTable("label_values", LABEL_VALUE_FIELDS, label_values, {}),
+    }
+
+
+def calculation_log_list_tables(response: CalculationLogListResponse) -> dict[str, ColumnarTable]:
+    """As per calculation_log_tables with the paging values of response stored as calculation_logs metadata"""
+    tables = calculation_log_tables(response.calculation_logs)
+    tables["calculation_logs"].metadata.update(_scalar_metadata(response, ["calculation_logs"]))
+    return tables
+
+
+def billing_tables(response: BaseBillingResponse) -> dict[str, ColumnarTable]:
+    """Flattens the readings, tariffs and does of response into tables (in their existing site_id, period_start order).
+    The remaining (scalar) fields of response eg tariff_id / aggregator_id are stored as metadata of every table"""
+    metadata = _scalar_metadata(response, BILLING_TABLE_FIELDS)
+    return {
+        name: ColumnarTable(name, schema, _model_columns(schema, getattr(response, name)), dict(metadata))
+        for name, schema in BILLING_TABLE_FIELDS.items()
+    }
+
+
+def _import_pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("pyarrow is required for Arrow/Parquet export (pip install envoy_schema[arrow])") from exc
+    return pyarrow
+
+
+def arrow_schema(table: ColumnarTable) -> Any:
+    """The pyarrow.Schema of table"""
+    pa = _import_pyarrow()
+    types = {
+        ARROW_INT64: pa.int64(),
+        ARROW_FLOAT64: pa.float64(),
+        ARROW_STRING: pa.string(),
+        ARROW_DECIMAL: pa.decimal128(DECIMAL_PRECISION, DECIMAL_SCALE),
+        ARROW_TIMESTAMP: pa.timestamp(TIMESTAMP_UNIT, tz=TIMESTAMP_TZ),
+    }
+    return pa.schema(
+        [pa.field(f.name, types[f.type], nullable=f.nullable) for f in table.schema], metadata=table.metadata or None
+    )
+
+
+def to_arrow_table(table: ColumnarTable) -> Any:
+    """Converts table to a pyarrow.Table (raising ImportError if pyarrow isn't installed)"""
+    pa = _import_pyarrow()
+    return pa.Table.from_pydict(table.columns, schema=arrow_schema(table))
+
+
+def write_parquet(
+    tables: dict[str, ColumnarTable], directory: Union[str, Path], compression: str = "zstd"
+) -> list[Path]:
+    """Writes every table to directory/{name}.parquet returning the written paths (raising ImportError if pyarrow
+    isn't installed)"""
+    _import_pyarrow()
+    import pyarrow.parquet
+
+    directory = Path(directory)
+    paths: list[Path] = []
+    for name, table in tables.items():
+        path = directory / f"{name}.parquet"
+        pyarrow.parquet.write_table(to_arrow_table(table), path, compression=compression)
+        paths.append(path)
+    return paths
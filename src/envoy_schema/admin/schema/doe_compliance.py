@@ -0,0 +1,137 @@
+"""Compliance evaluation of billing watt_readings against their active_does.
+
+A watt reading (positive import, negative export) breaches a BillingDoe of the same site if the two overlap in time and
+the reading exceeds import_limit_active_watts (importing) or export_limit_watts (exporting). Readings and DOEs needn't
+share an interval length - a reading is compared to every DOE it overlaps, with the breach energy apportioned by the
+overlapping time:
+
+    breach energy (Wh) = (|value| - limit) * overlap_seconds / 3600
+
+Readings and DOEs are extracted into typed (float64 / int64) columns once and are then evaluated with a single ordered
+sweep (both lists are ordered by site_id then period_start - see BaseBillingResponse). DOEs of a site are expected not
+to overlap each other."""
+
+from array import array
+from operator import attrgetter
+from typing import Sequence, Union
+
+from pydantic import BaseModel
+
+from envoy_schema.admin.schema.billing import BaseBillingResponse, BillingDoe, BillingReading
+
+SECONDS_PER_HOUR = 3600
+
+_SITE_ID = attrgetter("site_id")
+_DURATION_SECONDS = attrgetter("duration_seconds")
+
+
+class SiteDoeCompliance(BaseModel):
+    """DOE compliance of a single site"""
+
+    site_id: int
+    evaluated_readings: int  # Number of watt readings that overlap at least one DOE
+    import_breaches: int  # Number of readings that exceed the import limit of at least one overlapping DOE
+    export_breaches: int  # Number of readings that exceed the export limit of at least one overlapping DOE
+    import_breach_wh: float  # Energy imported above the import limits
+    export_breach_wh: float  # Energy exported above the export limits
+    max_import_exceedance_watts: float  # Worst case amount over an import limit (0 if never breached)
+    max_export_exceedance_watts: float  # Worst case amount over an export limit (0 if never breached)
+
+
+class DoeComplianceReport(BaseModel):
+    """DOE compliance of every site (with at least one watt reading or DOE) of a billing response"""
+
+    sites: list[SiteDoeCompliance]  # Ordered by site_id
+    evaluated_readings: int
+    import_breaches: int
+    export_breaches: int
+    import_breach_wh: float
+    export_breach_wh: float
+    max_import_exceedance_watts: float
+    max_export_exceedance_watts: float
+
+
+def _timestamps(items: Sequence[Union[BillingReading, BillingDoe]]) -> array:
+    return array("q", (int(i.period_start.timestamp()) for i in items))
+
+
+def evaluate_doe_compliance(readings: Sequence[BillingReading], does: Sequence[BillingDoe]) -> DoeComplianceReport:
+    """Evaluates readings (watts) against does. Both must be ordered by site_id then period_start (ValueError is
+    raised otherwise)"""
+    r_site = array("q", map(_SITE_ID, readings))
+    r_start = _timestamps(readings)
+    r_end = array("q", map(int.__add__, r_start, map(_DURATION_SECONDS, readings)))
+    r_value = array("d", (float(r.value) for r in readings))
+
+    d_site = array("q", map(_SITE_ID, does))
+    d_start = _timestamps(does)
+    d_end = array("q", map(int.__add__, d_start, map(_DURATION_SECONDS, does)))
+    d_import = array("d", (float(d.import_limit_active_watts) for d in does))
+    d_export = array("d", (float(d.export_limit_watts) for d in does))
+
+    for name, site, start in (("readings", r_site, r_start), ("does", d_site, d_start)):
+        keys = list(zip(site, start))
+        if keys != sorted(keys):
+            raise ValueError(f"{name} must be ordered by site_id then period_start.")
+
+    # site_id -> [evaluated, import breaches, export breaches, import Wh, export Wh, max import W, max export W]
+    totals: dict[int, list] = {site_id: [0, 0, 0, 0.0, 0.0, 0.0, 0.0] for site_id in sorted({*r_site, *d_site})}
+    n_does = len(does)
+    d = 0
+    for site_id, start, end, value in zip(r_site, r_start, r_end, r_value):
+        # Skip DOEs of earlier sites (or that end before this reading)
+        while d < n_does and (d_site[d] < site_id or (d_site[d] == site_id and d_end[d] <= start)):
+            d += 1
+
+        site_totals = totals[site_id]
+        overlapped = import_breach = export_breach = False
+        j = d
+        end = max(end, start + 1)  # Instantaneous readings are evaluated as a 1 second sample
+        while j < n_does and d_site[j] == site_id and d_start[j] < end:
+            overlap = min(end, d_end[j]) - max(start, d_start[j])
+            if overlap > 0:
+                overlapped = True
+                if value > d_import[j]:
+                    exceedance = value - d_import[j]
+                    import_breach = True
+                    site_totals[3] += exceedance * overlap / SECONDS_PER_HOUR
+                    site_totals[5] = max(site_totals[5], exceedance)
+                elif -value > d_export[j]:
+                    exceedance = -value - d_export[j]
+                    export_breach = True
+                    site_totals[4] += exceedance * overlap / SECONDS_PER_HOUR
+                    site_totals[6] = max(site_totals[6], exceedance)
+            j += 1
+
+        site_totals[0] += overlapped
+        site_totals[1] += import_breach
+        site_totals[2] += export_breach
+
+    sites = [
+        SiteDoeCompliance(
+            site_id=site_id,
+            evaluated_readings=t[0],
+            import_breaches=t[1],
+            export_breaches=t[2],
+            import_breach_wh=t[3],
+            export_breach_wh=t[4],
+            max_import_exceedance_watts=t[5],
+            max_export_exceedance_watts=t[6],
+        )
+        for site_id, t in totals.items()
+    ]
+    return DoeComplianceReport(
+        sites=sites,
+        evaluated_readings=sum(s.evaluated_readings for s in sites),
+        import_breaches=sum(s.import_breaches for s in sites),
+        export_breaches=sum(s.export_breaches for s in sites),
+        import_breach_wh=sum(s.import_breach_wh for s in sites),
+        export_breach_wh=sum(s.export_breach_wh for s in sites),
+        max_import_exceedance_watts=max((s.max_import_exceedance_watts for s in sites), default=0.0),
+        max_export_exceedance_watts=max((s.max_export_exceedance_watts for s in sites), default=0.0),
+    )
+
+
+def evaluate_billing_doe_compliance(response: BaseBillingResponse) -> DoeComplianceReport:
+    """Evaluates the watt_readings of response against its active_does"""
+    return evaluate_doe_compliance(response.watt_readings, response.active_does)
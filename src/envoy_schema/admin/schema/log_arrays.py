@@ -0,0 +1,222 @@
+"""Typed array backing for CalculationLogVariableValues.
+
+CalculationLogVariableValues validates every element of its (potentially tens of millions of items long) lists into
+python objects. CalculationLogVariableArrays holds the same columns as contiguous typed arrays (which support the
+buffer protocol - eg numpy.frombuffer(arrays.values) is a zero copy view) and validates each column in bulk:
+
+    variable_ids / interval_periods - array("q") (int64)
+    site_ids                        - array("q") (int64) with site_id_mask (1 byte per row - 1 where site_id is None)
+    values                          - array("d") (float64)
+
+The JSON encoding/decoding is equivalent to CalculationLogVariableValues (model_dump_json / model_validate_json) with
+the exception that numeric strings (eg "1.5") aren't accepted as values. Neither direction creates a python list of a
+whole column: encoding serializes each array a bounded slice at a time and decoding validates the document a chunk at a
+time (see log_stream.CalculationLogColumnsStreamDecoder) straight into the arrays."""
+
+from array import array
+from itertools import compress, repeat
+from operator import is_
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from pydantic_core import to_json
+
+from envoy_schema.admin.schema.log import CalculationLogVariableValues
+
+DEFAULT_JSON_READ_SIZE = 1024 * 1024  # Number of bytes (or characters) of a JSON document decoded at a time
+DEFAULT_JSON_CHUNK_ITEMS = 64 * 1024  # Number of items of a column encoded to JSON at a time
+
+_COLUMN_NAMES = ("variable_ids", "site_ids", "interval_periods", "values")  # In CalculationLogVariableValues order
+
+
+def int_column(name: str, values: Iterable[Any]) -> array:
+    """Validates values as an array("q") (raising ValueError if any value isn't a 64 bit integer)"""
+    try:
+        return array("q", values)
+    except (TypeError, OverflowError) as exc:
+        raise ValueError(f"{name} must only contain (64 bit) integers: {exc}")
+
+
+def float_column(name: str, values: Iterable[Any]) -> array:
+    """Validates values as an array("d") (raising ValueError if any value isn't a number)"""
+    try:
+        return array("d", values)
+    except TypeError as exc:
+        raise ValueError(f"{name} must only contain numbers: {exc}")
+
+
+def site_id_column(name: str, values: list[Optional[int]]) -> tuple[array, bytes]:
+    """Validates a list of Optional site ids as (array("q"), mask) where mask has 1 byte per item (1 if it was None)"""
+    if not values.count(None):
+        return int_column(name, values), bytes(len(values))
+
+    mask = bytes(map(is_, values, repeat(None)))
+    values = values.copy()
+    for row in compress(range(len(values)), mask):
+        values[row] = 0
+    return int_column(name, values), mask
+
+
+class CalculationLogVariableArrays:
+    """Equivalent to CalculationLogVariableValues but with every column held as a typed array. Every column is
+    guaranteed to have the same length"""
+
+    __slots__ = ("variable_ids", "site_ids", "site_id_mask", "interval_periods", "values")
+
+    def __init__(
+        self,
+        variable_ids: array,
+        site_ids: array,
+        site_id_mask: Union[bytes, bytearray],
+        interval_periods: array,
+        values: array,
+    ):
+        for name, column, typecode in (
+            ("variable_ids", variable_ids, "q"),
+            ("site_ids", site_ids, "q"),
+            ("interval_periods", interval_periods, "q"),
+            ("values", values, "d"),
+        ):
+            if column.typecode != typecode:
+                raise ValueError(f"{name} must be an array('{typecode}') not array('{column.typecode}').")
+        if not len(variable_ids) == len(site_ids) == len(site_id_mask) == len(interval_periods) == len(values):
+            raise ValueError(
+                "variable_ids, site_ids, site_id_mask, interval_periods and values must be the same length."
+            )
+
+        self.variable_ids = variable_ids
+        self.site_ids = site_ids  # Holds 0 for None site_ids (see site_id_mask)
+        self.site_id_mask = bytes(site_id_mask)  # 1 byte per row - 1 if the site_id is None, 0 otherwise
+        self.interval_periods = interval_periods
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __repr__(self) -> str:
+        return f"CalculationLogVariableArrays(len={len(self)})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CalculationLogVariableArrays):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in CalculationLogVariableArrays.__slots__)
+
+    @classmethod
+    def from_lists(
+        cls,
+        variable_ids: list[int],
+        site_ids: list[Optional[int]],
+        interval_periods: list[int],
+        values: list[float],
+    ) -> "CalculationLogVariableArrays":
+        """Validates (in bulk) python lists of the columns. Raises ValueError if any column has an invalid type"""
+        site_ids_array, site_id_mask = site_id_column("site_ids", site_ids)
+        return cls(
+            variable_ids=int_column("variable_ids", variable_ids),
+            site_ids=site_ids_array,
+            site_id_mask=site_id_mask,
+            interval_periods=int_column("interval_periods", interval_periods),
+            values=float_column("values", values),
+        )
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any]) -> "CalculationLogVariableArrays":
+        """Validates the (decoded) JSON object form of CalculationLogVariableValues"""
+        try:
+            return cls.from_lists(raw["variable_ids"], raw["site_ids"], raw["interval_periods"], raw["values"])
+        except KeyError as exc:
+            raise ValueError(f"Missing column {exc}")
+        except AttributeError:
+            raise ValueError("Every column must be a list.")
+
+    @classmethod
+    def from_json(
+        cls, raw: Union[str, bytes], read_size: int = DEFAULT_JSON_READ_SIZE
+    ) -> "CalculationLogVariableArrays":
+        """Equivalent to CalculationLogVariableValues.model_validate_json (raising ValueError for invalid data). raw is
+        decoded read_size bytes/characters at a time - each chunk of each column is validated and appended directly to
+        the arrays"""
+        # log_stream depends on the column validators of this module
+        from envoy_schema.admin.schema.log_stream import (
+            FIELD_VARIABLE_VALUES,
+            CalculationLogColumnsStreamDecoder,
+            ColumnChunk,
+        )
+
+        columns: dict[str, array] = {
+            "variable_ids": array("q"),
+            "site_ids": array("q"),
+            "interval_periods": array("q"),
+            "values": array("d"),
+        }
+        site_id_mask = bytearray()
+
+        def sink(chunk: ColumnChunk) -> None:
+            columns[chunk.column].extend(chunk.values)
+            if chunk.site_id_mask is not None:
+                site_id_mask.extend(chunk.site_id_mask)
+
+        decoder = CalculationLogColumnsStreamDecoder(sink, FIELD_VARIABLE_VALUES)
+        for start in range(0, len(raw), read_size):
+            end = start + read_size
+            data = raw[start:end]
+            decoder.feed(data.encode() if isinstance(data, str) else data)
+        decoder.close()
+        return cls(
+            variable_ids=columns["variable_ids"],
+            site_ids=columns["site_ids"],
+            site_id_mask=site_id_mask,
+            interval_periods=columns["interval_periods"],
+            values=columns["values"],
+        )
+
+    @classmethod
+    def from_model(cls, model: CalculationLogVariableValues) -> "CalculationLogVariableArrays":
+        return cls.from_lists(model.variable_ids, model.site_ids, model.interval_periods, model.values)
+
+    def site_ids_list(self, start: int = 0, end: Optional[int] = None) -> list[Optional[int]]:
+        """site_ids[start:end] as a python list (with None for masked rows)"""
+        site_ids: list[Optional[int]] = self.site_ids[start:end].tolist()
+        mask = self.site_id_mask[start:end]
+        if mask.count(1):
+            for row in compress(range(len(site_ids)), mask):
+                site_ids[row] = None
+        return site_ids
+
+    def to_dict(self) -> dict[str, list]:
+        return {
+            "variable_ids": self.variable_ids.tolist(),
+            "site_ids": self.site_ids_list(),
+            "interval_periods": self.interval_periods.tolist(),
+            "values": self.values.tolist(),
+        }
+
+    def to_model(self) -> CalculationLogVariableValues:
+        """Creates the equivalent CalculationLogVariableValues (without re-validating the already validated columns)"""
+        columns = self.to_dict()
+        return CalculationLogVariableValues.model_construct(
+            variable_ids=columns["variable_ids"],
+            site_ids=columns["site_ids"],
+            interval_periods=columns["interval_periods"],
+            values=columns["values"],
+        )
+
+    def iter_json(self, chunk_items: int = DEFAULT_JSON_CHUNK_ITEMS) -> Iterator[str]:
+        """Yields the JSON encoding (see to_json) in pieces. Each column is encoded chunk_items at a time so only a
+        bounded slice of a column is ever held as python objects"""
+        for idx, name in enumerate(_COLUMN_NAMES):
+            yield f'{"," if idx else "{"}"{name}":['
+            column = getattr(self, name)
+            for start in range(0, len(column), chunk_items):
+                end = start + chunk_items
+                if name == "site_ids":
+                    items: list = self.site_ids_list(start, end)
+                else:
+                    items = column[start:end].tolist()
+                encoded = to_json(items, inf_nan_mode="null").decode()  # inf/nan are encoded as null (like pydantic)
+                yield encoded[1:-1] if start == 0 else "," + encoded[1:-1]  # Strip the enclosing []
+            yield "]"
+        yield "}"
+
+    def to_json(self, chunk_items: int = DEFAULT_JSON_CHUNK_ITEMS) -> str:
+        """Equivalent to CalculationLogVariableValues.model_dump_json()"""
+        return "".join(self.iter_json(chunk_items))
@@ -0,0 +1,216 @@
+"""Bulk consistency validation and indexed lookup of calculation log values.
+
+validate_calculation_log checks the constraints documented on CalculationLogRequest that the models themselves don't
+enforce - every check is performed over whole columns (no per row python work unless a problem is found):
+
+    * every column of variable_values / label_values has the same length
+    * every interval_period lies within the calculation range (0 <= N < interval_count(request))
+    * every variable_id / label_id has a corresponding variable_metadata / label_metadata entry
+
+CalculationLogVariableIndex sorts variable values by (variable_id, site_id, interval_period) and hashes each
+(variable_id, site_id) series so that point lookups are O(log n) and "every interval for site X, variable Y" is a
+single slice of the sorted columns:
+
+    index = CalculationLogVariableIndex.from_model(request.variable_values)
+    index.get(variable_id=1, site_id=3, interval_period=5)
+    interval_periods, values = index.series(variable_id=1, site_id=3, start_period=0, end_period=12)"""
+
+from array import array
+from bisect import bisect_left
+from itertools import compress, groupby, islice
+from operator import ge
+from typing import Iterable, Optional, Sized, Union
+
+from envoy_schema.admin.schema.log import (
+    CalculationLogLabelValues,
+    CalculationLogRequest,
+    CalculationLogVariableValues,
+)
+from envoy_schema.admin.schema.log_arrays import CalculationLogVariableArrays
+
+SeriesKey = tuple[int, Optional[int]]  # (variable_id, site_id)
+
+
+def interval_count(request: CalculationLogRequest) -> int:
+    """The number of (fixed width) intervals in the calculation range. A trailing partial interval is counted"""
+    if request.interval_width_seconds <= 0:
+        raise ValueError(f"interval_width_seconds must be positive, not {request.interval_width_seconds}.")
+    if request.calculation_range_duration_seconds < 0:
+        raise ValueError(
+            f"calculation_range_duration_seconds can't be negative, not {request.calculation_range_duration_seconds}."
+        )
+    return -(-request.calculation_range_duration_seconds // request.interval_width_seconds)
+
+
+def _check_lengths(name: str, columns: dict[str, Sized]) -> None:
+    lengths = {column: len(values) for column, values in columns.items()}
+    if len(set(lengths.values())) > 1:
+        described = ", ".join(f"{column}={length}" for column, length in lengths.items())
+        raise ValueError(f"Every column of {name} must have the same length ({described}).")
+
+
+def _check_references(name: str, ids: Iterable[int], metadata_ids: list[int], metadata_name: str) -> None:
+    if len(set(metadata_ids)) != len(metadata_ids):
+        raise ValueError(f"{metadata_name} has duplicate ids.")
+    unknown = set(ids).difference(metadata_ids)
+    if unknown:
+        raise ValueError(f"{name} references ids without {metadata_name}: {sorted(unknown)}.")
+
+
+def validate_variable_values(
+    request: CalculationLogRequest,
+    variable_values: Union[CalculationLogVariableValues, CalculationLogVariableArrays],
+) -> None:
+    """Validates variable_values (which needn't be request.variable_values - eg arrays that were streamed separately)
+    against request. Raises ValueError describing the first problem found"""
+    _check_lengths(
+        "variable_values",
+        {
+            "variable_ids": variable_values.variable_ids,
+            "site_ids": variable_values.site_ids,
+            "interval_periods": variable_values.interval_periods,
+            "values": variable_values.values,
+        },
+    )
+
+    periods = variable_values.interval_periods
+    count = interval_count(request)
+    if len(periods) and (min(periods) < 0 or max(periods) >= count):
+        invalid = [p < 0 or p >= count for p in periods]
+        row = invalid.index(True)
+        raise ValueError(
+            f"{invalid.count(True)} interval_periods are outside of the calculation range [0, {count}). "
+            f"First is interval_period {periods[row]} at row {row}."
+        )
+
+    _check_references(
+        "variable_values",
+        variable_values.variable_ids,
+        [m.variable_id for m in request.variable_metadata],
+        "variable_metadata",
+    )
+
+
+def validate_label_values(request: CalculationLogRequest, label_values: CalculationLogLabelValues) -> None:
+    """Validates label_values against request. Raises ValueError describing the first problem found"""
+    _check_lengths(
+        "label_values",
+        {"label_ids": label_values.label_ids, "site_ids": label_values.site_ids, "values": label_values.values},
+    )
+    _check_references(
+        "label_values", label_values.label_ids, [m.label_id for m in request.label_metadata], "label_metadata"
+    )
+
+
+def validate_calculation_log(request: CalculationLogRequest) -> None:
+    """Validates the variable_values / label_values of request. Raises ValueError describing the first problem
+    found"""
+    interval_count(request)
+    if request.variable_values is not None:
+        validate_variable_values(request, request.variable_values)
+    if request.label_values is not None:
+        validate_label_values(request, request.label_values)
+
+
+class CalculationLogVariableIndex:
+    """A read only index of calculation log variable values over (variable_id, site_id, interval_period). Raises
+    ValueError if that combination isn't unique (as is required within a CalculationLog)"""
+
+    __slots__ = ("interval_periods", "values", "rows", "_series")
+
+    def __init__(self, arrays: CalculationLogVariableArrays):
+        # Stable sorts from least to most significant - each is O(n) if the values are already sorted (as returned
+        # from the server). None site_ids sort after every other site_id
+        order = list(range(len(arrays)))
+        order.sort(key=arrays.interval_periods.__getitem__)
+        order.sort(key=arrays.site_ids.__getitem__)
+        order.sort(key=arrays.site_id_mask.__getitem__)
+        order.sort(key=arrays.variable_ids.__getitem__)
+
+        self.rows = array("q", order)  # The row (of arrays) for each sorted item
+        self.interval_periods = array("q", map(arrays.interval_periods.__getitem__, order))
+        self.values = array("d", map(arrays.values.__getitem__, order))
+
+        # (variable_id, site_id) -> (start, end) slice of the sorted columns
+        self._series: dict[SeriesKey, tuple[int, int]] = {}
+        keys = zip(
+            map(arrays.variable_ids.__getitem__, order),
+            map(arrays.site_ids.__getitem__, order),
+            map(arrays.site_id_mask.__getitem__, order),
+        )
+        start = 0
+        for (variable_id, site_id, masked), group in groupby(keys):
+            end = start + len(list(group))
+            periods = self.interval_periods[start:end]
+            unordered = bytes(map(ge, periods, islice(periods, 1, None)))  # 1 where not strictly increasing
+            if unordered.count(1):
+                duplicate = next(compress(islice(periods, 1, None), unordered))
+                raise ValueError(
+                    f"Duplicate value for variable_id {variable_id}, site_id {None if masked else site_id}, "
+                    f"interval_period {duplicate}."
+                )
+            self._series[(variable_id, None if masked else site_id)] = (start, end)
+            start = end
+
+    @classmethod
+    def from_model(cls, variable_values: CalculationLogVariableValues) -> "CalculationLogVariableIndex":
+        return cls(CalculationLogVariableArrays.from_model(variable_values))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __repr__(self) -> str:
+        return f"CalculationLogVariableIndex(len={len(self)}, series={len(self._series)})"
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._series
+
+    def keys(self) -> list[SeriesKey]:
+        """Every (variable_id, site_id) with at least one value - sorted by variable_id then site_id (None last)"""
+        return list(self._series)
+
+    def variable_ids(self) -> list[int]:
+        return list(dict.fromkeys(variable_id for variable_id, _ in self._series))
+
+    def site_ids(self, variable_id: int) -> list[Optional[int]]:
+        """Every site_id with at least one value for variable_id (sorted with None last)"""
+        return [site_id for v, site_id in self._series if v == variable_id]
+
+    def _find(self, variable_id: int, site_id: Optional[int], start_period: Optional[int]) -> tuple[int, int]:
+        start, end = self._series.get((variable_id, site_id), (0, 0))
+        if start_period is not None:
+            start = bisect_left(self.interval_periods, start_period, start, end)
+        return start, end
+
+    def get(self, variable_id: int, site_id: Optional[int], interval_period: int) -> Optional[float]:
+        """The value for the specified variable_id, site_id and interval_period (None if there isn't one)"""
+        pos, end = self._find(variable_id, site_id, interval_period)
+        if pos < end and self.interval_periods[pos] == interval_period:
+            return self.values[pos]
+        return None
+
+    def series_slice(
+        self,
+        variable_id: int,
+        site_id: Optional[int],
+        start_period: Optional[int] = None,
+        end_period: Optional[int] = None,
+    ) -> slice:
+        """The slice of the sorted columns (interval_periods / values / rows) for variable_id and site_id, limited to
+        interval periods in [start_period, end_period) (if specified)"""
+        start, end = self._find(variable_id, site_id, start_period)
+        if end_period is not None:
+            end = bisect_left(self.interval_periods, end_period, start, end)
+        return slice(start, max(start, end))
+
+    def series(
+        self,
+        variable_id: int,
+        site_id: Optional[int],
+        start_period: Optional[int] = None,
+        end_period: Optional[int] = None,
+    ) -> tuple[array, array]:
+        """(interval_periods, values) arrays (sorted by interval_period) for variable_id and site_id, limited to
+        interval periods in [start_period, end_period) (if specified)"""
+        selected = self.series_slice(variable_id, site_id, start_period, end_period)
+        return self.interval_periods[selected], self.values[selected]
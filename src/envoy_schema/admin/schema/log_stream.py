@@ -0,0 +1,562 @@
+"""Incremental (streaming) decoding of CalculationLogRequest JSON documents.
+
+The bulk of a CalculationLogRequest is the column lists of variable_values and label_values. CalculationLogStreamDecoder
+accepts the document in arbitrary sized byte chunks and, rather than accumulating those columns, validates them in
+chunks (as typed arrays - see log_arrays) and passes each ColumnChunk to a caller supplied sink as soon as it's been
+decoded. Every other (scalar / metadata) property is buffered and validated with the request model as normal once the
+document is complete. Peak memory is therefore bounded by the size of the fed chunks rather than the document.
+
+    decoder = CalculationLogStreamDecoder(sink=lambda chunk: ...)
+    for data in request_body:
+        decoder.feed(data)
+    result = decoder.close()  # StreamedCalculationLog
+
+Number columns are decoded a whole chunk at a time (one pydantic_core.from_json per chunk) - only label_values.values
+(a string column) is decoded item by item. Buffered values (and strings) that span many feeds are scanned for their end
+as each feed arrives (see _ValueScanner) and only decoded once complete, so decoding stays linear in the document size
+however small the fed chunks are."""
+
+import codecs
+import json
+import re
+from array import array
+from typing import Any, BinaryIO, Callable, Iterable, NamedTuple, Optional, Union
+
+from pydantic_core import from_json
+
+from envoy_schema.admin.schema.log import CalculationLogRequest
+from envoy_schema.admin.schema.log_arrays import float_column, int_column, site_id_column
+
+DEFAULT_READ_SIZE = 1024 * 1024  # Number of bytes read from a file like source per feed
+
+FIELD_VARIABLE_VALUES = "variable_values"
+FIELD_LABEL_VALUES = "label_values"
+
+_COLUMN_INT = "int"
+_COLUMN_FLOAT = "float"
+_COLUMN_SITE_ID = "site_id"
+_COLUMN_STR = "str"
+
+# The (streamed) columns of each streamed field and how each column is validated
+STREAMED_COLUMNS: dict[str, dict[str, str]] = {
+    FIELD_VARIABLE_VALUES: {
+        "variable_ids": _COLUMN_INT,
+        "site_ids": _COLUMN_SITE_ID,
+        "interval_periods": _COLUMN_INT,
+        "values": _COLUMN_FLOAT,
+    },
+    FIELD_LABEL_VALUES: {"label_ids": _COLUMN_INT, "site_ids": _COLUMN_SITE_ID, "values": _COLUMN_STR},
+}
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+_STRING_SPECIAL = re.compile(r'["\\]')  # Characters that can end (or escape) within a JSON string
+_STRUCTURAL = re.compile(r'["{}\[\]]')  # Characters that change the nesting of a JSON value (outside of strings)
+
+
+class _ValueScanner:
+    """Incrementally finds the end of a JSON string / object / array (without decoding it). Text is passed to scan in
+    document order (starting with the value's opening character) and every character is examined at most once.
+    Malformed values aren't detected here - that's left to decoding the complete value"""
+
+    __slots__ = ("depth", "in_string", "escaped", "complete")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False  # The last character scanned was a backslash within a string
+        self.complete = False
+
+    def scan(self, text: str, pos: int = 0) -> None:
+        end = len(text)
+        while pos < end and not self.complete:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                    pos += 1
+                    continue
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    return
+                pos = match.end()
+                if match.group() == "\\":
+                    self.escaped = True
+                else:
+                    self.in_string = False
+                    self.complete = self.depth == 0
+                continue
+
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                return
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                self.complete = self.depth <= 0
+
+
+class ColumnChunk(NamedTuple):
+    """A contiguous chunk of a single streamed column"""
+
+    field: str  # FIELD_VARIABLE_VALUES or FIELD_LABEL_VALUES
+    column: str  # The column name eg "site_ids"
+    offset: int  # The index (within the column) of the first item in this chunk
+    values: Union[array, list[str]]  # array("q") for integer columns, array("d") for floats, list[str] for strings
+    site_id_mask: Optional[bytes]  # Only for site_ids columns - 1 byte per item (1 if the site_id was None)
+
+
+class StreamedCalculationLog(NamedTuple):
+    """The result of streaming a CalculationLogRequest"""
+
+    request: CalculationLogRequest  # The request with variable_values / label_values set to None
+    variable_value_count: Optional[int]  # Number of variable_values rows streamed (None if variable_values is null)
+    label_value_count: Optional[int]  # Number of label_values rows streamed (None if label_values is null)
+
+
+ColumnSink = Callable[[ColumnChunk], None]
+
+
+class CalculationLogStreamDecoder:
+    """Incrementally decodes a CalculationLogRequest (or subclass eg CalculationLogResponse) JSON document. Streamed
+    columns are validated and passed to sink (in document order) as they are decoded. Raises ValueError as soon as
+    the document is found to be invalid"""
+
+    def __init__(self, sink: ColumnSink, model: type[CalculationLogRequest] = CalculationLogRequest):
+        self._sink = sink
+        self._model = model
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._consumed = 0  # Number of characters that have been dropped from the front of _buf
+        self._final = False
+        self._state = self._top_start
+
+        self._properties: dict[str, Any] = {}  # The buffered (non streamed) properties
+        self._column_lengths: dict[str, dict[str, int]] = {}  # field -> column -> length (for streamed fields)
+        self._key: str = ""  # The current top level property name
+        self._column: str = ""  # The current streamed column name
+        self._expect_item = False  # Set after a comma in a streamed column (another item MUST follow)
+        self._done = False
+
+        # Set while waiting for the end of a (potentially large) buffered value - see _read_buffered_value
+        self._scanner: Optional[_ValueScanner] = None
+        self._pending: list[str] = []  # Text fed since the scanner started (not yet appended to _buf)
+
+    def feed(self, data: bytes) -> None:
+        """Feeds the next chunk of the document into the decoder"""
+        if self._final:
+            raise ValueError("The decoder has already been closed.")
+        text = self._utf8.decode(data)
+        scanner = self._scanner
+        if scanner is not None and not scanner.complete:
+            # Only the new text is scanned (and it isn't joined to _buf) until the value is complete
+            self._pending.append(text)
+            scanner.scan(text)
+            if not scanner.complete:
+                return
+            text = "".join(self._pending)
+            self._pending.clear()
+        self._buf += text
+        self._run()
+
+    def _flush(self) -> None:
+        """Signals the end of the document to the buffer (before the final _run)"""
+        self._buf += "".join(self._pending) + self._utf8.decode(b"", final=True)
+        self._pending.clear()
+        self._final = True
+
+    def close(self) -> StreamedCalculationLog:
+        """Signals the end of the document - validating (and returning) the buffered properties. Raises ValueError
+        if the document is incomplete or invalid"""
+        self._flush()
+        self._run()
+        if not self._done:
+            raise ValueError("Unexpected end of the CalculationLog document.")
+
+        counts: dict[str, Optional[int]] = {}
+        for field in STREAMED_COLUMNS:
+            counts[field] = self._row_count(field)
+            if counts[field] is not None:
+                self._properties[field] = None
+
+        return StreamedCalculationLog(
+            request=self._model.model_validate(self._properties),
+            variable_value_count=counts[FIELD_VARIABLE_VALUES],
+            label_value_count=counts[FIELD_LABEL_VALUES],
+        )
+
+    def _row_count(self, field: str) -> Optional[int]:
+        """The number of rows streamed for field (None if it wasn't streamed). Raises ValueError if any column is
+        missing or the columns have different lengths"""
+        lengths = self._column_lengths.get(field, None)
+        if lengths is None:
+            return None
+        columns = STREAMED_COLUMNS[field]
+        if set(lengths) != set(columns):
+            raise ValueError(f"{field} must have every column of {sorted(columns)}.")
+        if len(set(lengths.values())) != 1:
+            raise ValueError(f"{field} columns must all have the same length. Got {lengths}")
+        return next(iter(lengths.values()))
+
+    def _run(self) -> None:
+        while self._state():
+            pass
+        # Drop everything that's been consumed (so the buffer doesn't grow with the document)
+        if pos := self._pos:
+            self._buf = self._buf[pos:]
+            self._consumed += pos
+            self._pos = 0
+
+    # Each state returns True if it made progress (False if more data is required)
+
+    def _skip_whitespace(self) -> Optional[str]:
+        """Advances past any whitespace and returns the next character (or None if more data is required)"""
+        buf = self._buf
+        pos = self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        if pos == len(buf):
+            if self._final and not self._done:
+                raise ValueError("Unexpected end of the CalculationLog document.")
+            return None
+        return buf[pos]
+
+    def _expect(self, char: str, expected: str) -> None:
+        if char not in expected:
+            raise ValueError(f"Expected one of '{expected}' at offset {self._consumed + self._pos} but got '{char}'.")
+        self._pos += 1
+
+    def _read_value(self) -> tuple[bool, Any]:
+        """Decodes the next complete JSON value. Returns (False, None) if more data is required"""
+        try:
+            value, end = _decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if self._final:
+                raise ValueError(f"Invalid JSON value at offset {self._consumed + self._pos}.")
+            return (False, None)
+
+        # A number at the end of the buffer may not be complete (eg 12 might be the first half of 123)
+        if end == len(self._buf) and not self._final and not isinstance(value, (str, dict, list)):
+            return (False, None)
+        self._pos = end
+        return (True, value)
+
+    def _read_buffered_value(self) -> tuple[bool, Any]:
+        """Equivalent to _read_value for a string / object / array that may span many feeds. Rather than attempting to
+        decode the value from its start on every feed, its end is found by a _ValueScanner (which feed continues) and
+        the value is only decoded once complete"""
+        scanner = self._scanner
+        if scanner is None:
+            scanner = self._scanner = _ValueScanner()
+            scanner.scan(self._buf, self._pos)
+        if not scanner.complete and not self._final:
+            return (False, None)
+        self._scanner = None
+        return self._read_value()
+
+    def _read_key(self) -> Optional[str]:
+        ok, key = self._read_value()
+        if not ok:
+            return None
+        if not isinstance(key, str):
+            raise ValueError(f"Expected a property name but got {key!r}.")
+        return key
+
+    def _top_start(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        self._expect(char, "{")
+        self._state = self._top_key_or_end
+        return True
+
+    def _top_key_or_end(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        if char == "}":
+            self._pos += 1
+            self._state = self._trailing
+            self._done = True
+            return True
+        return self._top_key()
+
+    def _top_key(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        self._expect(char, '"')
+        self._pos -= 1
+        key = self._read_key()
+        if key is None:
+            return False
+        self._key = key
+        self._state = self._top_colon
+        return True
+
+    def _top_colon(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        self._expect(char, ":")
+        self._state = self._top_value
+        return True
+
+    def _top_value(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+
+        if self._key in STREAMED_COLUMNS and char == "{":
+            self._pos += 1
+            self._column_lengths[self._key] = {}
+            self._state = self._columns_key_or_end
+            return True
+
+        ok, value = self._read_buffered_value() if char in '"[{' else self._read_value()
+        if not ok:
+            return False
+        self._properties[self._key] = value
+        self._state = self._top_after_value
+        return True
+
+    def _top_after_value(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        self._expect(char, ",}")
+        if char == "}":
+            self._state = self._trailing
+            self._done = True
+        else:
+            self._state = self._top_key
+        return True
+
+    def _trailing(self) -> bool:
+        buf = self._buf
+        pos = self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos != len(buf):
+            raise ValueError(f"Unexpected data after the CalculationLog document at offset {self._consumed + pos}.")
+        self._pos = pos
+        return False
+
+    def _columns_key_or_end(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        if char == "}":
+            self._pos += 1
+            self._state = self._top_after_value
+            return True
+        return self._columns_key()
+
+    def _columns_key(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        self._expect(char, '"')
+        self._pos -= 1
+        column = self._read_key()
+        if column is None:
+            return False
+        if column not in STREAMED_COLUMNS[self._key]:
+            raise ValueError(f"{self._key} has no column {column}.")
+        if column in self._column_lengths[self._key]:
+            raise ValueError(f"{self._key} has a duplicate column {column}.")
+        self._column = column
+        self._column_lengths[self._key][column] = 0
+        self._state = self._columns_colon
+        return True
+
+    def _columns_colon(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        self._expect(char, ":")
+        self._state = self._column_start
+        return True
+
+    def _column_start(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        if char != "[":
+            raise ValueError(f"{self._key}.{self._column} must be a list.")
+        self._pos += 1
+        self._expect_item = False
+        if STREAMED_COLUMNS[self._key][self._column] == _COLUMN_STR:
+            self._state = self._column_items
+        else:
+            self._state = self._column_segment
+        return True
+
+    def _column_segment(self) -> bool:
+        """Decodes every complete item of a number column currently in the buffer (as a single chunk)"""
+        buf = self._buf
+        end = buf.find("]", self._pos)
+        if end >= 0:
+            segment_end = end
+            next_pos = end + 1
+        else:
+            segment_end = buf.rfind(",", self._pos)
+            if segment_end < 0:
+                if self._final:
+                    raise ValueError(f"Unexpected end of {self._key}.{self._column}.")
+                return False
+            next_pos = segment_end + 1
+
+        start = self._pos
+        segment = buf[start:segment_end]
+        if not segment.strip():
+            if self._expect_item or end < 0:
+                raise ValueError(
+                    f"Invalid list item in {self._key}.{self._column} at offset {self._consumed + self._pos}."
+                )
+            items: list = []
+        else:
+            try:
+                items = from_json(f"[{segment}]")
+            except ValueError:
+                raise ValueError(
+                    f"Invalid list item in {self._key}.{self._column} at offset {self._consumed + self._pos}."
+                )
+
+        self._emit(items)
+        self._pos = next_pos
+        if end >= 0:
+            self._state = self._columns_after_value
+        else:
+            self._expect_item = True
+        return True
+
+    def _column_items(self) -> bool:
+        """Decodes the items of a string column one at a time (strings may contain ',' or ']')"""
+        items: list = []
+        progressed = False
+        while True:
+            char = self._skip_whitespace()
+            if char is None:
+                break
+            if char == "]" and not self._expect_item:
+                self._pos += 1
+                self._state = self._columns_after_value
+                progressed = True
+                break
+
+            start = self._pos
+            ok, value = self._read_buffered_value() if char == '"' else self._read_value()
+            if not ok:
+                break
+            char = self._skip_whitespace()
+            if char is None:
+                self._pos = start  # Re-read the item once the separator is available
+                break
+            self._expect(char, ",]")
+            items.append(value)
+            progressed = True
+            if char == "]":
+                self._state = self._columns_after_value
+                break
+            self._expect_item = True
+
+        if items:
+            self._emit(items)
+        return progressed
+
+    def _emit(self, items: list) -> None:
+        if not items:
+            return
+        name = f"{self._key}.{self._column}"
+        column_type = STREAMED_COLUMNS[self._key][self._column]
+        site_id_mask: Optional[bytes] = None
+        values: Union[array, list[str]]
+        if column_type == _COLUMN_INT:
+            values = int_column(name, items)
+        elif column_type == _COLUMN_FLOAT:
+            values = float_column(name, items)
+        elif column_type == _COLUMN_SITE_ID:
+            values, site_id_mask = site_id_column(name, items)
+        else:
+            if not all(isinstance(v, str) for v in items):
+                raise ValueError(f"{name} must only contain strings.")
+            values = items
+
+        lengths = self._column_lengths[self._key]
+        offset = lengths[self._column]
+        lengths[self._column] = offset + len(values)
+        self._expect_item = False
+        self._sink(ColumnChunk(self._key, self._column, offset, values, site_id_mask))
+
+    def _columns_after_value(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        self._expect(char, ",}")
+        if char == "}":
+            self._state = self._top_after_value
+        else:
+            self._state = self._columns_key
+        return True
+
+
+class CalculationLogColumnsStreamDecoder(CalculationLogStreamDecoder):
+    """Incrementally decodes a standalone JSON document of a single streamed field (i.e. a CalculationLogVariableValues
+    or CalculationLogLabelValues) passing its column chunks to sink. close() returns the number of rows"""
+
+    def __init__(self, sink: ColumnSink, field: str):
+        if field not in STREAMED_COLUMNS:
+            raise ValueError(f"{field} isn't one of the streamed fields {sorted(STREAMED_COLUMNS)}.")
+        super().__init__(sink)
+        self._key = field
+        self._column_lengths[field] = {}
+        self._state = self._columns_start
+
+    def close(self) -> int:  # type: ignore[override]
+        self._flush()
+        self._run()
+        if not self._done:
+            raise ValueError(f"Unexpected end of the {self._key} document.")
+        return self._row_count(self._key) or 0
+
+    def _columns_start(self) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        self._expect(char, "{")
+        self._state = self._columns_key_or_end
+        return True
+
+    def _top_after_value(self) -> bool:
+        # The (only) columns object has ended - that's the end of the document
+        self._state = self._trailing
+        self._done = True
+        return True
+
+
+def decode_calculation_log_stream(
+    source: Union[bytes, BinaryIO, Iterable[bytes]],
+    sink: ColumnSink,
+    model: type[CalculationLogRequest] = CalculationLogRequest,
+    read_size: int = DEFAULT_READ_SIZE,
+) -> StreamedCalculationLog:
+    """Decodes a CalculationLogRequest document from source (raw bytes, a binary file like object or an iterable of
+    byte chunks) passing every streamed column chunk to sink"""
+    decoder = CalculationLogStreamDecoder(sink, model)
+    if isinstance(source, bytes):
+        decoder.feed(source)
+    elif hasattr(source, "read"):
+        while data := source.read(read_size):  # type: ignore[union-attr]
+            decoder.feed(data)
+    else:
+        for data in source:  # type: ignore[union-attr]
+            decoder.feed(data)
+    return decoder.close()
@@ -0,0 +1,153 @@
+"""Bulk encoding of admin SiteControlRequest / SiteControlResponse's as sep2 DERControlResponse's.
+
+Every watt value is encoded as an ActivePower(value, multiplier) using the server's site_control_pow10_encoding
+(see RuntimeServerConfigResponse) so that the value sent is round(watts / 10^pow10) with multiplier=pow10 (rounding is
+half to even). Other fields are mapped as:
+
+    set_energized / set_connect -> opModEnergize / opModConnect
+    set_point_percentage -> opModFixedW (hundredths of a percent)
+    ramp_time_seconds -> rampTms (hundredths of a second)
+    randomize_start_seconds -> randomizeStart
+
+SiteControlEncoder scales an entire page of controls a column at a time and then assembles the (already valid) sep2
+models without re-validating them. iter_der_control_list_xml goes one step further and streams a DERControlList
+document as each DERControlResponse is assembled."""
+
+from datetime import datetime
+from decimal import Decimal
+from itertools import repeat
+from operator import attrgetter, methodcaller
+from typing import Any, Iterator, Optional, Sequence, cast
+
+from envoy_schema.admin.schema.config import RuntimeServerConfigResponse
+from envoy_schema.admin.schema.site_control import SiteControlRequest, SiteControlResponse
+from envoy_schema.server.schema.sep2.der import DERControlBase, DERControlListResponse, DERControlResponse
+from envoy_schema.server.schema.sep2.der_control_types import ActivePower
+from envoy_schema.server.schema.sep2.event import EventStatus, EventStatusType
+from envoy_schema.server.schema.sep2.serialization import iter_list_xml_chunks
+from envoy_schema.server.schema.sep2.types import DateTimeIntervalType
+
+# SiteControlRequest field -> DERControlBase ActivePower field
+ACTIVE_POWER_FIELDS: dict[str, str] = {
+    "import_limit_watts": "opModImpLimW",
+    "export_limit_watts": "opModExpLimW",
+    "generation_limit_watts": "opModGenLimW",
+    "load_limit_watts": "opModLoadLimW",
+    "storage_target_watts": "opModStorageTargetW",
+}
+
+# SiteControlRequest field -> (DERControlBase int field, power of ten that the sep2 value is expressed in)
+HUNDREDTHS_FIELDS: dict[str, tuple[str, int]] = {
+    "set_point_percentage": ("opModFixedW", -2),  # SignedPerCent - 10000 = 100%
+    "ramp_time_seconds": ("rampTms", -2),  # hundredths of a second
+}
+
+_TO_INTEGRAL = methodcaller("to_integral_value")  # Context rounding (ROUND_HALF_EVEN)
+
+
+def scale_column(values: Sequence[Optional[Decimal]], pow10: int) -> list[Optional[int]]:
+    """Returns round(value / 10^pow10) for every value (None values are preserved)"""
+    if None not in values:
+        return list(map(int, map(_TO_INTEGRAL, map(Decimal.scaleb, cast(Sequence[Decimal], values), repeat(-pow10)))))
+    return [None if v is None else int(v.scaleb(-pow10).to_integral_value()) for v in values]
+
+
+class SiteControlEncoder:
+    """Encodes pages of site controls as sep2 DERControlBase / DERControlResponse's using a fixed pow10 encoding"""
+
+    def __init__(self, pow10: int):
+        self.pow10 = pow10
+
+    @classmethod
+    def from_config(cls, config: RuntimeServerConfigResponse) -> "SiteControlEncoder":
+        return cls(config.site_control_pow10_encoding)
+
+    def encode_bases(self, controls: Sequence[SiteControlRequest]) -> list[DERControlBase]:
+        """Encodes the DERControlBase of every control"""
+        fields: list[dict[str, Any]] = [{} for _ in controls]
+
+        for source, target in (("set_connect", "opModConnect"), ("set_energized", "opModEnergize")):
+            for row, value in enumerate(map(attrgetter(source), controls)):
+                if value is not None:
+                    fields[row][target] = value
+
+        for source, target in ACTIVE_POWER_FIELDS.items():
+            for row, value in enumerate(scale_column([getattr(c, source) for c in controls], self.pow10)):
+                if value is not None:
+                    fields[row][target] = ActivePower.model_construct(multiplier=self.pow10, value=value)
+
+        for source, (target, pow10) in HUNDREDTHS_FIELDS.items():
+            for row, value in enumerate(scale_column([getattr(c, source) for c in controls], pow10)):
+                if value is not None:
+                    fields[row][target] = value
+
+        return [DERControlBase.model_construct(**f) for f in fields]
+
+    def encode(
+        self,
+        controls: Sequence[SiteControlRequest],
+        mrids: Sequence[str],
+        now: datetime,
+        hrefs: Optional[Sequence[str]] = None,
+    ) -> list[DERControlResponse]:
+        """Encodes every control as a DERControlResponse. mrids (and optionally hrefs) must have an item per control.
+        The EventStatus is calculated relative to now (the creationTime of SiteControlRequest's is also now)"""
+        return list(self.iter_encode(controls, mrids, now, hrefs))
+
+    def iter_encode(
+        self,
+        controls: Sequence[SiteControlRequest],
+        mrids: Sequence[str],
+        now: datetime,
+        hrefs: Optional[Sequence[str]] = None,
+    ) -> Iterator[DERControlResponse]:
+        if len(mrids) != len(controls) or (hrefs is not None and len(hrefs) != len(controls)):
+            raise ValueError("mrids (and hrefs if specified) must have an item per control.")
+
+        now_ts = int(now.timestamp())
+        bases = self.encode_bases(controls)
+        for row, control in enumerate(controls):
+            start = int(control.start_time.timestamp())
+            superseded = isinstance(control, SiteControlResponse) and control.superseded
+            if superseded:
+                status = EventStatusType.Superseded
+            elif start <= now_ts < start + control.duration_seconds:
+                status = EventStatusType.Active
+            else:
+                status = EventStatusType.Scheduled
+
+            fields: dict[str, Any] = {
+                "mRID": mrids[row],
+                "creationTime": (
+                    int(control.created_time.timestamp()) if isinstance(control, SiteControlResponse) else now_ts
+                ),
+                "EventStatus_": EventStatus.model_construct(
+                    currentStatus=int(status), dateTime=now_ts, potentiallySuperseded=superseded
+                ),
+                "interval": DateTimeIntervalType.model_construct(duration=control.duration_seconds, start=start),
+                "DERControlBase_": bases[row],
+            }
+            if hrefs is not None:
+                fields["href"] = hrefs[row]
+            if control.randomize_start_seconds is not None:
+                fields["randomizeStart"] = control.randomize_start_seconds
+            yield DERControlResponse.model_construct(**fields)
+
+    def iter_der_control_list_xml(
+        self,
+        controls: Sequence[SiteControlRequest],
+        mrids: Sequence[str],
+        now: datetime,
+        hrefs: Optional[Sequence[str]] = None,
+        **header: Any,
+    ) -> Iterator[bytes]:
+        """Streams a DERControlList XML document containing every control. header provides the other
+        DERControlListResponse fields (eg all_, results, href)"""
+        return iter_list_xml_chunks(
+            DERControlListResponse,
+            self.iter_encode(controls, mrids, now, hrefs),
+            skip_empty=False,
+            exclude_none=True,
+            exclude_unset=True,
+            **header,
+        )
@@ -0,0 +1,142 @@
+"""Interval index over SiteControlResponse's for overlap, active control and supersede queries.
+
+Controls are grouped by site_id and held (per site) sorted by start_time alongside a "max end" segment tree, so the
+controls overlapping any period are found in O((k + 1) log n) (k being the number of matches) rather than checking
+every control:
+
+    index = SiteControlIndex()
+    index.add(page.controls, primacy=group.primacy)  # Once per SiteControlGroup page
+    index.active_at(site_id, when)  # Controls active at when (highest priority first)
+    index.overlapping(new_control)  # Controls that overlap new_control
+    index.recompute_superseded()  # Every control with its superseded flag recalculated
+
+Controls cover the half open period [start_time, start_time + duration_seconds). Priority is decided by the primacy of
+each control's SiteControlGroup (lower is higher priority) followed by created_time (newer is higher priority) and
+then site_control_id (higher is higher priority). A control is superseded if it overlaps a higher priority control of
+the same site."""
+
+from bisect import bisect_left
+from datetime import datetime
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from envoy_schema.admin.schema.site_control import SiteControlRequest, SiteControlResponse
+
+
+class _IndexedControl(NamedTuple):
+    start: int  # start_time (seconds since epoch)
+    end: int  # start + duration_seconds
+    priority: tuple[int, float, int]  # Sorts highest priority first
+    control: SiteControlResponse
+
+
+def _period(start_time: datetime, duration_seconds: int) -> tuple[int, int]:
+    start = int(start_time.timestamp())
+    return start, start + max(duration_seconds, 0)
+
+
+class _SiteIntervals:
+    """The (sorted by start) controls of a single site with a segment tree of the max end of each subtree"""
+
+    __slots__ = ("controls", "starts", "size", "max_ends")
+
+    def __init__(self, controls: list[_IndexedControl]):
+        self.controls = sorted(controls, key=lambda c: (c.start, c.priority))
+        self.starts = [c.start for c in self.controls]
+        self.size = 1
+        while self.size < len(self.controls):
+            self.size *= 2
+        self.max_ends = [0] * (2 * self.size)  # Node n has children 2n and 2n + 1. Leaves start at node size
+        for i, control in enumerate(self.controls):
+            self.max_ends[self.size + i] = control.end
+        for node in range(self.size - 1, 0, -1):
+            self.max_ends[node] = max(self.max_ends[2 * node], self.max_ends[2 * node + 1])
+
+    def overlapping(self, start: int, end: int) -> Iterator[_IndexedControl]:
+        """Yields every control overlapping [start, end) in order of start"""
+        limit = bisect_left(self.starts, end)  # Only controls starting before end can overlap
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if lo >= limit or self.max_ends[node] <= start:
+                continue  # Every control under node starts too late or ends too early
+            if node >= self.size:
+                yield self.controls[lo]
+                continue
+            mid = (lo + hi) // 2
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+
+
+class SiteControlIndex:
+    """An index of SiteControlResponse's (from any number of SiteControlGroup's) by site_id and time"""
+
+    def __init__(self) -> None:
+        self._pending: dict[int, list[_IndexedControl]] = {}
+        self._sites: dict[int, _SiteIntervals] = {}
+        self._order: list[_IndexedControl] = []  # Every control in the order it was added
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def add(self, controls: Iterable[SiteControlResponse], primacy: int) -> None:
+        """Adds controls that all belong to a SiteControlGroup with the specified primacy"""
+        for control in controls:
+            start, end = _period(control.start_time, control.duration_seconds)
+            indexed = _IndexedControl(
+                start=start,
+                end=end,
+                priority=(primacy, -control.created_time.timestamp(), -control.site_control_id),
+                control=control,
+            )
+            self._pending.setdefault(control.site_id, []).append(indexed)
+            self._order.append(indexed)
+
+    def _site(self, site_id: int) -> Optional[_SiteIntervals]:
+        pending = self._pending.pop(site_id, None)
+        if pending is not None:  # Sites are (re)built lazily - only the first query after an add pays for the sort
+            existing = self._sites.get(site_id, None)
+            self._sites[site_id] = _SiteIntervals(pending + (existing.controls if existing else []))
+        return self._sites.get(site_id, None)
+
+    def site_ids(self) -> list[int]:
+        return sorted(self._sites.keys() | self._pending.keys())
+
+    def _overlapping(self, site_id: int, start: int, end: int) -> list[_IndexedControl]:
+        site = self._site(site_id)
+        if site is None:
+            return []
+        return sorted(site.overlapping(start, end), key=lambda c: c.priority)
+
+    def active_at(self, site_id: int, when: datetime) -> list[SiteControlResponse]:
+        """Every control of site_id active at when (highest priority first). The first (if any) is the control that
+        should be acted on"""
+        instant = int(when.timestamp())
+        return [c.control for c in self._overlapping(site_id, instant, instant + 1)]
+
+    def overlapping(self, control: SiteControlRequest) -> list[SiteControlResponse]:
+        """Every indexed control (of the same site) that overlaps control (highest priority first). If control is an
+        indexed SiteControlResponse it's excluded from the results"""
+        start, end = _period(control.start_time, control.duration_seconds)
+        return [c.control for c in self._overlapping(control.site_id, start, end) if c.control is not control]
+
+    def is_superseded(self, control: SiteControlResponse, primacy: int) -> bool:
+        """Whether control (of a group with primacy) overlaps a higher priority indexed control"""
+        start, end = _period(control.start_time, control.duration_seconds)
+        priority = (primacy, -control.created_time.timestamp(), -control.site_control_id)
+        site = self._site(control.site_id)
+        return site is not None and any(c.priority < priority for c in site.overlapping(start, end))
+
+    def recompute_superseded(self) -> list[SiteControlResponse]:
+        """Every indexed control (in the order they were added) with superseded recalculated. Controls whose
+        superseded flag changes are returned as updated copies, all others are returned as is"""
+        results: list[SiteControlResponse] = []
+        for indexed in self._order:
+            site = self._site(indexed.control.site_id)
+            superseded = site is not None and any(
+                c.priority < indexed.priority for c in site.overlapping(indexed.start, indexed.end)
+            )
+            control = indexed.control
+            if control.superseded != superseded:
+                control = control.model_copy(update={"superseded": superseded})
+            results.append(control)
+        return results
@@ -0,0 +1,180 @@
+"""Normalisation of sep2 mirror Readings (as a ReadingBatch) into csip-aus site readings.
+
+Every Reading.value of a MirrorMeterReading shares a single ReadingType, so everything that ReadingType implies (the
+CSIPAusSiteReadingUnit, PhaseEnum, powerOfTenMultiplier and load convention sign) is resolved ONCE by
+SiteReadingNormaliser and then applied to an entire column of values:
+
+    normaliser = SiteReadingNormaliser(mirror_meter_reading.readingType)
+    normaliser.normalise(batch)  # NormalisedReadings of raw arrays (float values)
+    normaliser.to_site_readings(batch)  # list[CSIPAusSiteReading] (exact Decimal values)
+
+Readings without a value or timePeriod can't be represented as a CSIPAusSiteReading and are dropped."""
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from itertools import islice, repeat
+from operator import truediv
+from typing import Iterator, NamedTuple, Optional
+
+from envoy_schema.admin.schema.site_reading import (
+    CSIPAusSiteReading,
+    CSIPAusSiteReadingPageResponse,
+    CSIPAusSiteReadingUnit,
+    PhaseEnum,
+)
+from envoy_schema.server.schema.sep2.metering import ReadingType
+from envoy_schema.server.schema.sep2.reading_batch import ReadingBatch, ReadingField
+from envoy_schema.server.schema.sep2.types import FlowDirectionType, KindType, PhaseCode, UomType
+
+UNIT_BY_UOM: dict[UomType, CSIPAusSiteReadingUnit] = {
+    UomType.REAL_POWER_WATT: CSIPAusSiteReadingUnit.ACTIVEPOWER,
+    UomType.REACTIVE_POWER_VAR: CSIPAusSiteReadingUnit.REACTIVEPOWER,
+    UomType.FREQUENCY_HZ: CSIPAusSiteReadingUnit.FREQUENCY,
+    UomType.VOLTAGE: CSIPAusSiteReadingUnit.VOLTAGE,
+    UomType.REAL_ENERGY_WATT_HOURS: CSIPAusSiteReadingUnit.STORED_ENERGY,
+}
+
+# Single phase (and phase to neutral) codes condense to their PhaseEnum. Whole of site (ABC) readings are NA
+PHASE_BY_PHASE_CODE: dict[PhaseCode, PhaseEnum] = {
+    PhaseCode.NOT_APPLICABLE: PhaseEnum.NA,
+    PhaseCode.PHASE_ABC: PhaseEnum.NA,
+    PhaseCode.PHASE_A_S1: PhaseEnum.AN,
+    PhaseCode.PHASE_AN_S1N: PhaseEnum.AN,
+    PhaseCode.PHASE_B: PhaseEnum.BN,
+    PhaseCode.PHASE_BN: PhaseEnum.BN,
+    PhaseCode.PHASE_C_S2: PhaseEnum.CN,
+    PhaseCode.PHASE_CN_S2N: PhaseEnum.CN,
+}
+
+SUPPORTED_KINDS = {KindType.NOT_APPLICABLE, KindType.ENERGY, KindType.POWER}
+
+# Load convention: positive is import from the grid. Readings without a flowDirection are provided as stored
+SIGN_BY_FLOW_DIRECTION: dict[FlowDirectionType, int] = {
+    FlowDirectionType.NOT_APPLICABLE: 1,
+    FlowDirectionType.FORWARD: 1,
+    FlowDirectionType.REVERSE: -1,
+}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_UNREPRESENTABLE = ReadingField.TIME_PERIOD | ReadingField.VALUE
+_REPRESENTABLE_TABLE = bytes(not v & _UNREPRESENTABLE for v in range(256))  # none_mask byte -> 0/1 selector
+
+
+class NormalisedReadings(NamedTuple):
+    """Columns of normalised readings (one item per representable Reading) for a single unit/phase"""
+
+    csip_aus_unit: CSIPAusSiteReadingUnit
+    phase: PhaseEnum
+    start: array  # array("q") of reading start times (seconds since epoch)
+    duration: array  # array("q") of reading durations (seconds)
+    value: array  # array("d") of normalised values (powerOfTenMultiplier and sign applied)
+
+
+class SiteReadingNormaliser:
+    """Converts Readings of a single ReadingType into csip-aus site readings. Raises ValueError if the ReadingType
+    isn't csip-aus compatible (see CSIPAusSiteReadingUnit)"""
+
+    def __init__(self, reading_type: ReadingType):
+        if reading_type.uom is None or reading_type.uom not in UNIT_BY_UOM:
+            raise ValueError(f"ReadingType uom {reading_type.uom} can't be mapped to a CSIPAusSiteReadingUnit.")
+        kind = reading_type.kind or KindType.NOT_APPLICABLE
+        if kind not in SUPPORTED_KINDS:
+            raise ValueError(f"ReadingType kind {kind} isn't supported for csip-aus site readings.")
+        phase = PHASE_BY_PHASE_CODE.get(reading_type.phase or PhaseCode.NOT_APPLICABLE, None)
+        if phase is None:
+            raise ValueError(f"ReadingType phase {reading_type.phase} can't be mapped to a PhaseEnum.")
+
+        self.csip_aus_unit = UNIT_BY_UOM[reading_type.uom]
+        self.phase = phase
+        self.power_of_ten = reading_type.powerOfTenMultiplier or 0
+        self.sign = SIGN_BY_FLOW_DIRECTION.get(reading_type.flowDirection or FlowDirectionType.NOT_APPLICABLE, 1)
+
+    def select_representable(self, batch: ReadingBatch) -> ReadingBatch:
+        """Returns batch without the rows that are missing a value or timePeriod"""
+        selector = batch.none_mask.tobytes().translate(_REPRESENTABLE_TABLE)
+        return batch if selector.count(0) == 0 else batch.select(selector)
+
+    def scale_values(self, values: array) -> array:
+        """Applies the powerOfTenMultiplier and sign to an entire column of (raw) values returning an array("d")"""
+        if self.power_of_ten >= 0:
+            return array("d", map((self.sign * 10.0**self.power_of_ten).__mul__, values))
+        # Dividing by an (exact) power of ten is correctly rounded - multiplying by eg 0.001 is not
+        return array("d", map(truediv, values, repeat(self.sign * 10.0 ** (-self.power_of_ten))))
+
+    def scale_values_exact(self, values: array) -> list[Decimal]:
+        """As per scale_values but returning exact Decimal values"""
+        scaled = map(Decimal.scaleb, map(Decimal, values), repeat(self.power_of_ten))
+        if self.sign < 0:
+            scaled = map(Decimal.copy_negate, scaled)
+        return list(scaled)
+
+    def normalise(self, batch: ReadingBatch) -> NormalisedReadings:
+        batch = self.select_representable(batch)
+        return NormalisedReadings(
+            csip_aus_unit=self.csip_aus_unit,
+            phase=self.phase,
+            start=batch.start,
+            duration=batch.duration,
+            value=self.scale_values(batch.value),
+        )
+
+    def to_site_readings(self, batch: ReadingBatch) -> list[CSIPAusSiteReading]:
+        """Converts every representable row of batch to a CSIPAusSiteReading. The models are constructed without
+        re-validation as every field is already of the correct type"""
+        batch = self.select_representable(batch)
+        return [
+            CSIPAusSiteReading.model_construct(
+                reading_start_time=_EPOCH + timedelta(seconds=start),
+                duration_seconds=duration,
+                phase=self.phase,
+                value=value,
+                csip_aus_unit=self.csip_aus_unit,
+            )
+            for start, duration, value in zip(batch.start, batch.duration, self.scale_values_exact(batch.value))
+        ]
+
+    def iter_pages(
+        self,
+        batch: ReadingBatch,
+        site_id: int,
+        limit: int,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> Iterator[CSIPAusSiteReadingPageResponse]:
+        """Yields every representable row of batch as consecutive CSIPAusSiteReadingPageResponse's of at most limit
+        readings. start_time/end_time default to the extent of the readings"""
+        if limit <= 0:
+            raise ValueError(f"limit must be positive, not {limit}.")
+
+        readings = self.to_site_readings(batch)
+        if start_time is None:
+            start_time = min((r.reading_start_time for r in readings), default=_EPOCH)
+        if end_time is None:
+            end_time = max(
+                (r.reading_start_time + timedelta(seconds=r.duration_seconds) for r in readings), default=start_time
+            )
+
+        it = iter(readings)
+        for offset in range(0, max(len(readings), 1), limit):
+            yield CSIPAusSiteReadingPageResponse(
+                total_count=len(readings),
+                limit=limit,
+                start=offset,
+                site_id=site_id,
+                start_time=start_time,
+                end_time=end_time,
+                readings=list(islice(it, limit)),
+            )
+
+
+def normalise_readings(reading_type: ReadingType, batches: list[ReadingBatch]) -> NormalisedReadings:
+    """Normalises several batches (eg every MirrorReadingSet of a MirrorMeterReading) sharing reading_type"""
+    normaliser = SiteReadingNormaliser(reading_type)
+    start, duration, value = array("q"), array("q"), array("d")
+    for batch in batches:
+        normalised = normaliser.normalise(batch)
+        start.extend(normalised.start)
+        duration.extend(normalised.duration)
+        value.extend(normalised.value)
+    return NormalisedReadings(normaliser.csip_aus_unit, normaliser.phase, start, duration, value)
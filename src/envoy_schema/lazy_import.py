@@ -0,0 +1,62 @@
+"""Utilities for packages that expose the classes of their submodules lazily (via a module level __getattr__).
+
+Importing a schema module builds the pydantic (and pydantic-xml) schema of every model it defines (and every model
+it imports). Short lived processes that only touch a handful of models can avoid most of that cost by importing
+models through the package (which only imports the submodule that defines the requested name) and optionally by
+setting ENVOY_SCHEMA_DEFER_BUILD (see DEFER_BUILD). warm_up can be used to pay the full cost up front instead."""
+
+import importlib
+import os
+from types import ModuleType
+from typing import Any, Callable, Iterable, Optional
+
+from pydantic import BaseModel
+
+# If set (to 1/true/yes) before importing any sep2 models, the pydantic/pydantic-xml schemas will be built on first use
+# of each model (or on warm_up) rather than at import time
+DEFER_BUILD_ENV_VAR = "ENVOY_SCHEMA_DEFER_BUILD"
+DEFER_BUILD: bool = os.environ.get(DEFER_BUILD_ENV_VAR, "").strip().lower() in ("1", "true", "yes")
+
+
+def build_models(module: ModuleType) -> int:
+    """Completes the (deferred) schema build for every model defined in module (in definition order so that child
+    models are built before their parents). Returns the number of models that were built"""
+    built = 0
+    for obj in list(vars(module).values()):
+        if (
+            isinstance(obj, type)
+            and issubclass(obj, BaseModel)
+            and obj.__module__ == module.__name__
+            and not obj.__pydantic_complete__
+        ):
+            obj.model_rebuild()
+            built += 1
+    return built
+
+
+def lazy_module_getattr(
+    package_name: str, lazy_imports: dict[str, str], package_globals: dict[str, Any]
+) -> Callable[[str], Any]:
+    """Creates a module level __getattr__ for package_name that resolves the names in lazy_imports (name: submodule)
+    by importing the submodule on first access. Resolved values are cached in package_globals"""
+
+    def __getattr__(name: str) -> Any:
+        submodule = lazy_imports.get(name, None)
+        if submodule is None:
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+
+        value = getattr(importlib.import_module(f"{package_name}.{submodule}"), name)
+        package_globals[name] = value
+        return value
+
+    return __getattr__
+
+
+def warm_up(package_name: str, lazy_imports: dict[str, str], modules: Optional[Iterable[str]] = None) -> None:
+    """Imports (and completes any deferred schema build for) the specified submodules of package_name. If modules is
+    None, every submodule referenced by lazy_imports will be warmed up"""
+    if modules is None:
+        modules = sorted(set(lazy_imports.values()))
+
+    for submodule in modules:
+        build_models(importlib.import_module(f"{package_name}.{submodule}"))
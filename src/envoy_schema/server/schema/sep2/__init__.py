@@ -1 +1,188 @@
 """Schemas representing IEEE 2030.5 (smart energy profile 2)"""
+
+from typing import Iterable, Optional
+
+from envoy_schema import lazy_import
+
+# Public classes available directly from this package (name: defining submodule). Submodules are only imported on
+# first access of one of their names. This is kept in sync with the submodules by tests/unit/test_lazy_import.py
+# DERControlResponse is also the name of a Response (response.py) - it must be imported from that module directly
+_LAZY_IMPORTS: dict[str, str] = {
+    "BaseXmlModelWithNS": "base",
+    "AbnormalCategoryType": "der",
+    "AlarmStatusType": "der",
+    "ConnectStatusType": "der",
+    "ConnectStatusTypeValue": "der",
+    "DER": "der",
+    "DERAvailability": "der",
+    "DERCapability": "der",
+    "DERControlBase": "der",
+    "DERControlListResponse": "der",
+    "DERControlResponse": "der",
+    "DERControlType": "der",
+    "DERListResponse": "der",
+    "DERProgramListResponse": "der",
+    "DERProgramResponse": "der",
+    "DERSettings": "der",
+    "DERStatus": "der",
+    "DERType": "der",
+    "DOESupportedMode": "der",
+    "DefaultDERControl": "der",
+    "DemandResponseProgramListResponse": "der",
+    "DemandResponseProgramResponse": "der",
+    "EndDeviceControlResponse": "der",
+    "FreqDroopType": "der",
+    "InverterStatusType": "der",
+    "InverterStatusTypeValue": "der",
+    "LocalControlModeStatusType": "der",
+    "LocalControlModeStatusTypeValue": "der",
+    "ManufacturerStatusValue": "der",
+    "NormalCategoryType": "der",
+    "OperationalModeStatusType": "der",
+    "OperationalModeStatusTypeValue": "der",
+    "StateOfChargeStatusValue": "der",
+    "StorageModeStatusType": "der",
+    "StorageModeStatusTypeValue": "der",
+    "VPPSupportedMode": "der",
+    "ActivePower": "der_control_types",
+    "AmpereHour": "der_control_types",
+    "ApparentPower": "der_control_types",
+    "CurrentRMS": "der_control_types",
+    "FixedVar": "der_control_types",
+    "PowerFactor": "der_control_types",
+    "PowerFactorWithExcitation": "der_control_types",
+    "ReactivePower": "der_control_types",
+    "ReactiveSusceptance": "der_control_types",
+    "VoltageRMS": "der_control_types",
+    "WattHour": "der_control_types",
+    "DeviceCapabilityResponse": "device_capability",
+    "ResourceCodec": "encoding",
+    "AbstractDevice": "end_device",
+    "EndDeviceListResponse": "end_device",
+    "EndDeviceRequest": "end_device",
+    "EndDeviceResponse": "end_device",
+    "RegistrationResponse": "end_device",
+    "ErrorResponse": "error",
+    "Event": "event",
+    "EventStatus": "event",
+    "EventStatusType": "event",
+    "RandomizableEvent": "event",
+    "ExiGrammar": "experimental_exi",
+    "ExiParticle": "experimental_exi",
+    "FunctionSetAssignmentsBase": "function_set_assignments",
+    "FunctionSetAssignmentsListResponse": "function_set_assignments",
+    "FunctionSetAssignmentsResponse": "function_set_assignments",
+    "IdentifiedObject": "identification",
+    "Link": "identification",
+    "List": "identification",
+    "ListLink": "identification",
+    "Resource": "identification",
+    "RespondableResource": "identification",
+    "RespondableSubscribableIdentifiedObject": "identification",
+    "SubscribableIdentifiedObject": "identification",
+    "SubscribableList": "identification",
+    "SubscribableResource": "identification",
+    "FunctionSetIdentifier": "log_events",
+    "LogEvent": "log_events",
+    "LogEventList": "log_events",
+    "ProfileIdentifier": "log_events",
+    "MeterReading": "metering",
+    "Reading": "metering",
+    "ReadingBase": "metering",
+    "ReadingListResponse": "metering",
+    "ReadingSet": "metering",
+    "ReadingSetBase": "metering",
+    "ReadingType": "metering",
+    "UsagePoint": "metering",
+    "UsagePointBase": "metering",
+    "MeterReadingBase": "metering_mirror",
+    "MirrorMeterReading": "metering_mirror",
+    "MirrorMeterReadingList": "metering_mirror",
+    "MirrorMeterReadingListRequest": "metering_mirror",
+    "MirrorMeterReadingRequest": "metering_mirror",
+    "MirrorReadingSet": "metering_mirror",
+    "MirrorUsagePoint": "metering_mirror",
+    "MirrorUsagePointList": "metering_mirror",
+    "MirrorUsagePointListResponse": "metering_mirror",
+    "MirrorUsagePointRequest": "metering_mirror",
+    "MirrorStreamItem": "metering_mirror_stream",
+    "MirrorStreamParser": "metering_mirror_stream",
+    "TypedNotification": "notification",
+    "ConsumptionTariffIntervalListResponse": "pricing",
+    "ConsumptionTariffIntervalResponse": "pricing",
+    "RateComponentListResponse": "pricing",
+    "RateComponentResponse": "pricing",
+    "TariffProfileListResponse": "pricing",
+    "TariffProfileResponse": "pricing",
+    "TimeTariffIntervalListResponse": "pricing",
+    "TimeTariffIntervalResponse": "pricing",
+    "Condition": "pub_sub",
+    "ConditionAttributeIdentifier": "pub_sub",
+    "Notification": "pub_sub",
+    "NotificationListResponse": "pub_sub",
+    "NotificationResourceCombined": "pub_sub",
+    "NotificationStatus": "pub_sub",
+    "Subscription": "pub_sub",
+    "SubscriptionBase": "pub_sub",
+    "SubscriptionEncoding": "pub_sub",
+    "SubscriptionListResponse": "pub_sub",
+    "ReadingBatch": "reading_batch",
+    "ReadingField": "reading_batch",
+    "MirrorReadingIndex": "reading_index",
+    "ReadingDuplicate": "reading_index",
+    "ReadingGap": "reading_index",
+    "ReadingOverlap": "reading_index",
+    "ResampledReadings": "reading_resample",
+    "ApplianceLoadReduction": "response",
+    "ApplianceLoadReductionType": "response",
+    "AppliedTargetReduction": "response",
+    "DrResponse": "response",
+    "DutyCycle": "response",
+    "FlowReservationResponseResponse": "response",
+    "Offset": "response",
+    "PriceResponse": "response",
+    "Response": "response",
+    "ResponseListResponse": "response",
+    "ResponseSet": "response",
+    "ResponseSetList": "response",
+    "ResponseType": "response",
+    "SetPoint": "response",
+    "TextResponse": "response",
+    "UnsupportedPlanError": "serialization",
+    "XmlSerializationPlan": "serialization",
+    "TimeResponse": "time",
+    "AccumulationBehaviourType": "types",
+    "CommodityType": "types",
+    "ConsumptionBlockType": "types",
+    "CurrencyCode": "types",
+    "DERUnitRefType": "types",
+    "DataQualifierType": "types",
+    "DateTimeIntervalType": "types",
+    "DeviceCategory": "types",
+    "FlowDirectionType": "types",
+    "KindType": "types",
+    "PhaseCode": "types",
+    "PrimacyType": "types",
+    "QualityFlagsType": "types",
+    "ReasonCodeType": "types",
+    "RoleFlagsType": "types",
+    "ServiceKind": "types",
+    "SubscribableType": "types",
+    "TOUType": "types",
+    "TimeQualityType": "types",
+    "UnitValueType": "types",
+    "UomType": "types",
+}
+
+__all__ = sorted(_LAZY_IMPORTS)
+
+__getattr__ = lazy_import.lazy_module_getattr(__name__, _LAZY_IMPORTS, globals())
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
+
+
+def warm_up(modules: Optional[Iterable[str]] = None) -> None:
+    """Imports (and completes any deferred schema build for) the specified submodules (default: all of them)"""
+    lazy_import.warm_up(__name__, _LAZY_IMPORTS, modules)
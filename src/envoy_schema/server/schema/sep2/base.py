@@ -1,6 +1,17 @@
+from typing import Any, ClassVar, Optional
+
+from lxml import etree
 from pydantic_xml import BaseXmlModel
 from pydantic_xml.element import SearchMode
 
+from envoy_schema.lazy_import import DEFER_BUILD
+from envoy_schema.server.schema.sep2.serialization import (
+    XmlSerializationPlan,
+    compile_plan,
+    ensure_xml_serializer,
+    to_xml_bytes,
+)
+
 nsmap = {
     "": "urn:ieee:std:2030.5:ns",
     "csipaus": "https://csipaus.org/ns/v1.3-beta/storage",
@@ -9,7 +20,10 @@ nsmap = {
 
 
 class BaseXmlModelWithNS(BaseXmlModel):
-    model_config = {"arbitrary_types_allowed": True}
+    model_config = {"arbitrary_types_allowed": True, "defer_build": DEFER_BUILD}
+
+    # Compiled serialization plan for this class (None if unsupported). See serialization.XmlSerializationPlan
+    __xml_plan__: ClassVar[Optional[XmlSerializationPlan]] = None
 
     def __init_subclass__(
         cls,
@@ -19,3 +33,28 @@ class BaseXmlModelWithNS(BaseXmlModel):
         super().__init_subclass__(*args, **kwargs)
         cls.__xml_nsmap__ = nsmap
         cls.__xml_search_mode__ = SearchMode.UNORDERED
+
+        # pydantic-xml only builds the serializer (which the plan is derived from) after __init_subclass__ so the plan
+        # is compiled in __build_serializer__. Reset here so subclasses never inherit their parent's plan
+        cls.__xml_plan__ = None
+
+    @classmethod
+    def __build_serializer__(cls) -> None:
+        super().__build_serializer__()
+        cls.__xml_plan__ = compile_plan(cls) if cls.__xml_serializer__ is not None else None
+
+    @classmethod
+    def from_xml_tree(cls, root: etree._Element, *args: Any, **kwargs: Any) -> Any:
+        ensure_xml_serializer(cls)  # Only required if this model's build was deferred (see DEFER_BUILD)
+        return super().from_xml_tree(root, *args, **kwargs)
+
+    def to_xml_tree(self, **kwargs: Any) -> etree._Element:
+        ensure_xml_serializer(type(self))  # Only required if this model's build was deferred (see DEFER_BUILD)
+        return super().to_xml_tree(**kwargs)
+
+    def to_xml_bytes(
+        self, *, skip_empty: bool = False, exclude_none: bool = False, exclude_unset: bool = False
+    ) -> bytes:
+        """Equivalent to to_xml (with no additional serialization kwargs) but uses this class's precompiled
+        serialization plan (falling back to to_xml if no plan could be compiled)"""
+        return to_xml_bytes(self, skip_empty=skip_empty, exclude_none=exclude_none, exclude_unset=exclude_unset)
@@ -0,0 +1,75 @@
+"""Encodes/decodes sep2 resources according to a SubscriptionEncoding (i.e. Subscription.encoding).
+
+Only the XML encoding (application/sep+xml) is implemented by this package. A schema informed EXI (application/sep-exi)
+codec must be generated from the full sep2 XSD and is expected to be provided by the consumer via register_codec. Until
+one is registered, attempting to use SubscriptionEncoding.EXI will raise a ValueError rather than producing a payload
+that a client can't decode. Any registered codec should use the XML codec as the reference for round trip testing.
+
+experimental_exi.py has a compact EXI-like codec that is NOT EXI 1.0 conformant (so isn't registered by default)."""
+
+from typing import Callable, NamedTuple, TypeVar
+
+from envoy_schema.server.schema.sep2.base import BaseXmlModelWithNS
+from envoy_schema.server.schema.sep2.pub_sub import SubscriptionEncoding
+
+MEDIA_TYPE_SEP_XML = "application/sep+xml"
+MEDIA_TYPE_SEP_EXI = "application/sep-exi"
+
+SUBSCRIPTION_ENCODING_MEDIA_TYPES: dict[SubscriptionEncoding, str] = {
+    SubscriptionEncoding.XML: MEDIA_TYPE_SEP_XML,
+    SubscriptionEncoding.EXI: MEDIA_TYPE_SEP_EXI,
+}
+
+ModelT = TypeVar("ModelT", bound=BaseXmlModelWithNS)
+
+
+class ResourceCodec(NamedTuple):
+    """Pair of functions for converting a sep2 model to/from a specific encoding"""
+
+    encode: Callable[[BaseXmlModelWithNS], bytes]
+    decode: Callable[[type[BaseXmlModelWithNS], bytes], BaseXmlModelWithNS]
+
+
+def encode_xml(entity: BaseXmlModelWithNS) -> bytes:
+    return entity.to_xml_bytes(skip_empty=False, exclude_none=True, exclude_unset=True)
+
+
+def decode_xml(model_type: type[BaseXmlModelWithNS], raw: bytes) -> BaseXmlModelWithNS:
+    return model_type.from_xml(raw)
+
+
+_codecs: dict[SubscriptionEncoding, ResourceCodec] = {SubscriptionEncoding.XML: ResourceCodec(encode_xml, decode_xml)}
+
+
+def register_codec(encoding: SubscriptionEncoding, codec: ResourceCodec) -> None:
+    """Registers (replacing any existing) codec for the specified encoding"""
+    _codecs[encoding] = codec
+
+
+def get_codec(encoding: SubscriptionEncoding) -> ResourceCodec:
+    """Fetches the codec registered for encoding - raises ValueError if no codec is available"""
+    codec = _codecs.get(encoding, None)
+    if codec is None:
+        raise ValueError(f"No codec has been registered for encoding {encoding} ({media_type(encoding)}).")
+    return codec
+
+
+def media_type(encoding: SubscriptionEncoding) -> str:
+    """Returns the HTTP Content-Type associated with encoding"""
+    return SUBSCRIPTION_ENCODING_MEDIA_TYPES[encoding]
+
+
+def encode_resource(entity: BaseXmlModelWithNS, encoding: SubscriptionEncoding = SubscriptionEncoding.XML) -> bytes:
+    """Encodes entity using the codec for encoding. Raises ValueError if there is no codec available"""
+    return get_codec(encoding).encode(entity)
+
+
+def decode_resource(
+    model_type: type[ModelT], raw: bytes, encoding: SubscriptionEncoding = SubscriptionEncoding.XML
+) -> ModelT:
+    """Decodes raw into an instance of model_type using the codec for encoding. Raises ValueError if there is no codec
+    available"""
+    entity = get_codec(encoding).decode(model_type, raw)
+    if not isinstance(entity, model_type):
+        raise ValueError(f"Codec for {encoding} decoded {type(entity)} instead of {model_type}.")
+    return entity
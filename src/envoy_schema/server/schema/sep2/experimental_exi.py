@@ -0,0 +1,458 @@
+"""EXPERIMENTAL compact binary encoding of the sep2 models, modelled on schema informed EXI (Efficient XML Interchange).
+
+THIS IS NOT A CONFORMANT EXI 1.0 ENCODING and must not be sent as application/sep-exi to third parties - a 2030.5
+gateway (or any standard EXI processor) can't decode it. It isn't registered for SubscriptionEncoding.EXI (see
+encoding.py). Known differences from EXI 1.0 include:
+
+    * No document grammar - there are no SD / SE(root) / ED events so the root type must be agreed out of band (it's
+      the model_type passed to decode_experimental_exi)
+    * Every int uses the EXI (signed) Integer representation - the Unsigned Integer / n-bit Unsigned Integer
+      representations for xs:unsigned* and bounded types aren't used
+    * xsi:type is encoded as an ordinary string attribute rather than as a QName typed AT(xsi:type) event
+    * The grammars are built from the models (rather than from sep.xsd) with no built-in / undeclared productions
+
+The element grammars are derived from the same pydantic-xml serializer metadata used to generate the XML encoding (see
+serialization.py). Each model type becomes a strict element grammar whose particles are the model's attributes (sorted
+by local name then namespace) followed by the model's child elements in declaration order (which mirrors the sequences
+in sep.xsd). A particle is required if its field can't be omitted from the XML and repeats if it's a list. Leaf values
+are encoded as:
+
+    bool -> Boolean
+    int (including IntEnum/IntFlag) -> Integer
+    HexBinary* -> Binary (decoded as upper case hex digits)
+    anything else -> String (via a string table)
+
+XML produced by encode_xml is the reference - decoding a payload always produces the same model as decoding the XML of
+the same entity (hex digits aside). EXPERIMENTAL_EXI_CODEC can be registered (via encoding.register_codec) between
+peers that are both using this module."""
+
+from typing import TYPE_CHECKING, Annotated, Any, NamedTuple, Optional, TypeVar, Union, get_args, get_origin
+
+from lxml import etree
+from pydantic import PlainSerializer, WrapSerializer
+from pydantic.fields import FieldInfo
+from pydantic_xml.serializers.factories import homogeneous, model, primitive
+from pydantic_xml.serializers.serializer import Serializer
+from pydantic_xml.utils import QName
+
+from envoy_schema.server.schema.sep2.encoding import ResourceCodec
+from envoy_schema.server.schema.sep2.primitive_types import serialize_octet
+from envoy_schema.server.schema.sep2.serialization import ensure_xml_serializer, to_xml_bytes
+
+if TYPE_CHECKING:
+    from pydantic_xml import BaseXmlModel
+
+ModelT = TypeVar("ModelT", bound="BaseXmlModel")
+
+EXI_COOKIE = b"$EXI"
+EXI_HEADER = b"\x80"  # Distinguishing bits (10), no options, final version 1
+
+# Datatype representations for leaf values
+VALUE_STRING = 0
+VALUE_INTEGER = 1
+VALUE_BOOLEAN = 2
+VALUE_BINARY_HEX = 3
+
+_END_ELEMENT = -1  # Particle index used by the EE production
+
+_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+
+
+class ExiParticle(NamedTuple):
+    """A single attribute / child element that can appear in an ExiGrammar"""
+
+    qname: str  # {ns}local clark name
+    is_attribute: bool
+    required: bool  # Must occur (once) before the element can end
+    repeated: bool  # Can occur any number of times (only for child elements)
+    value: int  # VALUE_* datatype of the leaf value (ignored if grammar is set)
+    grammar: Optional["ExiGrammar"]  # The grammar of a child element that is itself a model
+
+
+class ExiGrammar:
+    """The strict EXI element grammar for a single model type.
+
+    states[s] lists the productions available in state s (in event code order) as (particle_index, next_state) tuples
+    where particle_index is _END_ELEMENT for the EE production. State s is "before particles[s]" and the final state
+    (len(particles)) only allows EE"""
+
+    def __init__(self, model_type: type, tag: str, nsmap: dict[str, str]):
+        self.model_type = model_type
+        self.tag = tag
+        self.nsmap = nsmap
+        self.particles: list[ExiParticle] = []
+        self.states: list[list[tuple[int, int]]] = []
+        self.state_bits: list[int] = []
+        self.lookups: list[dict[Optional[str], tuple[int, int, int]]] = []  # qname (None for EE): code, idx, next
+
+    def build_states(self, particles: list[ExiParticle]) -> None:
+        self.particles = particles
+        for state in range(len(particles) + 1):
+            productions: list[tuple[int, int]] = []
+            for idx in range(state, len(particles)):
+                particle = particles[idx]
+                productions.append((idx, idx if particle.repeated else idx + 1))
+                if particle.required:
+                    break
+            else:
+                productions.append((_END_ELEMENT, state))
+
+            lookup: dict[Optional[str], tuple[int, int, int]] = {}
+            for code, (idx, next_state) in enumerate(productions):
+                qname = None if idx == _END_ELEMENT else particles[idx].qname
+                lookup.setdefault(qname, (code, idx, next_state))
+
+            self.states.append(productions)
+            self.state_bits.append((len(productions) - 1).bit_length())
+            self.lookups.append(lookup)
+
+
+_grammars: dict[type, ExiGrammar] = {}
+
+
+def _value_kind(annotation: Any, metadata: list[Any]) -> int:
+    """Resolves the VALUE_* datatype for a field annotation (with its Annotated metadata)"""
+    for m in metadata:
+        if isinstance(m, PlainSerializer) and m.func is serialize_octet:
+            return VALUE_BINARY_HEX
+        if isinstance(m, (PlainSerializer, WrapSerializer)):
+            return VALUE_STRING  # Unknown lexical form - only a string can represent it exactly
+
+    origin = get_origin(annotation)
+    if origin is Annotated:
+        args = get_args(annotation)
+        return _value_kind(args[0], list(args[1:]) + metadata)
+    if origin is not None:
+        kinds = {_value_kind(a, metadata) for a in get_args(annotation) if a is not type(None)}
+        return kinds.pop() if len(kinds) == 1 else VALUE_STRING
+
+    if annotation is bool:
+        return VALUE_BOOLEAN
+    if isinstance(annotation, type) and issubclass(annotation, int):
+        return VALUE_INTEGER
+    return VALUE_STRING
+
+
+def _allows_none(annotation: Any) -> bool:
+    origin = get_origin(annotation)
+    if origin is Annotated:
+        return _allows_none(get_args(annotation)[0])
+    return annotation is type(None) or (origin is Union and any(_allows_none(a) for a in get_args(annotation)))
+
+
+def _compile_particle(model_type: type, field_name: str, field_info: FieldInfo, serializer: Serializer) -> ExiParticle:
+    required = field_info.is_required() and not _allows_none(field_info.annotation)
+    if field_name in model_type.__pydantic_decorators__.field_serializers:  # type: ignore[attr-defined]
+        value = VALUE_STRING
+    else:
+        value = _value_kind(field_info.annotation, list(field_info.metadata))
+
+    if isinstance(serializer, primitive.AttributeSerializer):
+        return ExiParticle(serializer.attr_name, True, required, False, value, None)
+
+    if isinstance(serializer, primitive.ElementSerializer) and not serializer._nillable:
+        return ExiParticle(serializer._element_name, False, required, False, value, None)
+
+    if isinstance(serializer, model.ModelProxySerializer) and not serializer._nillable:
+        return ExiParticle(serializer.element_name, False, required, False, value, get_grammar(serializer.model))
+
+    if isinstance(serializer, homogeneous.ElementSerializer):
+        inner = _compile_particle(model_type, field_name, field_info, serializer._inner_serializer)
+        if not inner.is_attribute and not inner.repeated:
+            return inner._replace(required=False, repeated=True)
+
+    raise ValueError(f"{model_type.__name__}.{field_name} uses an XML construct that can't be EXI encoded.")
+
+
+def get_grammar(model_type: type["BaseXmlModel"]) -> ExiGrammar:
+    """Returns the (cached) ExiGrammar for model_type. Raises ValueError if model_type can't be EXI encoded"""
+    grammar = _grammars.get(model_type, None)
+    if grammar is not None:
+        return grammar
+
+    ensure_xml_serializer(model_type)
+    serializer = model_type.__xml_serializer__
+    if not isinstance(serializer, model.ModelSerializer):
+        raise ValueError(f"{model_type.__name__} doesn't have a pydantic-xml model serializer.")
+
+    # Registered before compiling particles so that self referencing models resolve to this (incomplete) grammar
+    grammar = ExiGrammar(model_type, serializer.element_name, dict(serializer.nsmap or {}))
+    _grammars[model_type] = grammar
+    try:
+        excluded = set(getattr(serializer, "_fields_serialization_exclude", set()))
+        particles = [
+            _compile_particle(model_type, field_name, model_type.model_fields[field_name], field_serializer)
+            for field_name, field_serializer in serializer.fields_serializers.items()
+            if field_name not in excluded
+        ]
+    except Exception:
+        del _grammars[model_type]
+        raise
+
+    def attribute_order(p: ExiParticle) -> tuple[str, str]:
+        qname = QName.from_uri(p.qname)
+        return (qname.tag, qname.ns or "")
+
+    grammar.build_states(
+        sorted((p for p in particles if p.is_attribute), key=attribute_order)
+        + [p for p in particles if not p.is_attribute]
+    )
+    return grammar
+
+
+class _BitWriter:
+    """Writes a bit-packed EXI stream (most significant bit first)"""
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+        self.current = 0
+        self.pending_bits = 0
+
+    def write_bits(self, value: int, bits: int) -> None:
+        if not bits:
+            return
+        self.current = (self.current << bits) | value
+        self.pending_bits += bits
+        while self.pending_bits >= 8:
+            self.pending_bits -= 8
+            self.buffer.append((self.current >> self.pending_bits) & 0xFF)
+        self.current &= (1 << self.pending_bits) - 1
+
+    def write_unsigned(self, value: int) -> None:
+        while value > 0x7F:
+            self.write_bits((value & 0x7F) | 0x80, 8)
+            value >>= 7
+        self.write_bits(value, 8)
+
+    def write_integer(self, value: int) -> None:
+        if value < 0:
+            self.write_bits(1, 1)
+            self.write_unsigned(-value - 1)
+        else:
+            self.write_bits(0, 1)
+            self.write_unsigned(value)
+
+    def write_characters(self, value: str) -> None:
+        for c in value:
+            self.write_unsigned(ord(c))
+
+    def to_bytes(self) -> bytes:
+        if self.pending_bits:
+            self.write_bits(0, 8 - self.pending_bits)  # Pad to a byte boundary
+        return bytes(self.buffer)
+
+
+class _BitReader:
+    """Reads a bit-packed EXI stream (most significant bit first)"""
+
+    def __init__(self, data: bytes, offset: int) -> None:
+        self.data = data
+        self.position = offset * 8
+
+    def read_bits(self, bits: int) -> int:
+        value = 0
+        while bits:
+            byte_idx, bit_offset = divmod(self.position, 8)
+            if byte_idx >= len(self.data):
+                raise ValueError("Unexpected end of EXI stream.")
+            available = 8 - bit_offset
+            take = min(available, bits)
+            value = (value << take) | ((self.data[byte_idx] >> (available - take)) & ((1 << take) - 1))
+            bits -= take
+            self.position += take
+        return value
+
+    def read_unsigned(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            octet = self.read_bits(8)
+            value |= (octet & 0x7F) << shift
+            if octet < 0x80:
+                return value
+            shift += 7
+
+    def read_integer(self) -> int:
+        if self.read_bits(1):
+            return -self.read_unsigned() - 1
+        return self.read_unsigned()
+
+    def read_characters(self, length: int) -> str:
+        try:
+            return "".join([chr(self.read_unsigned()) for _ in range(length)])
+        except (ValueError, OverflowError) as exc:
+            raise ValueError(f"Invalid character in EXI string: {exc}")
+
+
+class _StringTable:
+    """The EXI value string table (global partition + a local partition per attribute/element qname)"""
+
+    def __init__(self) -> None:
+        self.global_values: list[str] = []
+        self.global_ids: dict[str, int] = {}
+        self.local_values: dict[str, list[str]] = {}
+        self.local_ids: dict[str, dict[str, int]] = {}
+
+    def add(self, qname: str, value: str) -> None:
+        if not value:
+            return
+        self.global_ids[value] = len(self.global_values)
+        self.global_values.append(value)
+        local_values = self.local_values.setdefault(qname, [])
+        self.local_ids.setdefault(qname, {})[value] = len(local_values)
+        local_values.append(value)
+
+    def write(self, writer: _BitWriter, qname: str, value: str) -> None:
+        local_id = self.local_ids.get(qname, {}).get(value, None)
+        if local_id is not None:
+            writer.write_unsigned(0)
+            writer.write_bits(local_id, (len(self.local_values[qname]) - 1).bit_length())
+            return
+
+        global_id = self.global_ids.get(value, None)
+        if global_id is not None:
+            writer.write_unsigned(1)
+            writer.write_bits(global_id, (len(self.global_values) - 1).bit_length())
+            return
+
+        writer.write_unsigned(len(value) + 2)
+        writer.write_characters(value)
+        self.add(qname, value)
+
+    def read(self, reader: _BitReader, qname: str) -> str:
+        kind = reader.read_unsigned()
+        if kind == 0:
+            local_values = self.local_values.get(qname, [])
+            return self._lookup(local_values, reader.read_bits((len(local_values) - 1).bit_length()))
+        if kind == 1:
+            return self._lookup(self.global_values, reader.read_bits((len(self.global_values) - 1).bit_length()))
+
+        value = reader.read_characters(kind - 2)
+        self.add(qname, value)
+        return value
+
+    @staticmethod
+    def _lookup(values: list[str], idx: int) -> str:
+        if idx >= len(values):
+            raise ValueError(f"EXI string table miss for compact identifier {idx}.")
+        return values[idx]
+
+
+def _write_value(writer: _BitWriter, strings: _StringTable, particle: ExiParticle, text: str) -> None:
+    kind = particle.value
+    try:
+        if kind == VALUE_INTEGER:
+            writer.write_integer(int(text))
+        elif kind == VALUE_BOOLEAN:
+            if text not in ("true", "false", "1", "0"):
+                raise ValueError(f"'{text}' isn't a boolean")
+            writer.write_bits(1 if text in ("true", "1") else 0, 1)
+        elif kind == VALUE_BINARY_HEX:
+            data = bytes.fromhex(text)
+            writer.write_unsigned(len(data))
+            for octet in data:
+                writer.write_bits(octet, 8)
+        else:
+            strings.write(writer, particle.qname, text)
+    except ValueError as exc:
+        raise ValueError(f"Unable to EXI encode {particle.qname} value '{text}': {exc}")
+
+
+def _read_value(reader: _BitReader, strings: _StringTable, particle: ExiParticle) -> str:
+    kind = particle.value
+    if kind == VALUE_INTEGER:
+        return str(reader.read_integer())
+    if kind == VALUE_BOOLEAN:
+        return "true" if reader.read_bits(1) else "false"
+    if kind == VALUE_BINARY_HEX:
+        return bytes(reader.read_bits(8) for _ in range(reader.read_unsigned())).hex().upper()
+    return strings.read(reader, particle.qname)
+
+
+def _write_element(writer: _BitWriter, strings: _StringTable, grammar: ExiGrammar, element: etree._Element) -> None:
+    items: list[tuple[str, Any]] = sorted(
+        element.attrib.items(), key=lambda kv: (QName.from_uri(kv[0]).tag, QName.from_uri(kv[0]).ns or "")
+    )
+    items.extend((child.tag, child) for child in element if isinstance(child.tag, str))
+
+    state = 0
+    for qname, item in items:
+        production = grammar.lookups[state].get(qname, None)
+        if production is None:
+            expected = [q or "end of element" for q in grammar.lookups[state]]
+            raise ValueError(f"{qname} can't be EXI encoded at this position in {grammar.tag}. Expected {expected}.")
+        code, idx, state_next = production
+        writer.write_bits(code, grammar.state_bits[state])
+
+        particle = grammar.particles[idx]
+        if particle.is_attribute:
+            _write_value(writer, strings, particle, item)
+        elif particle.grammar is not None:
+            _write_element(writer, strings, particle.grammar, item)
+        else:
+            _write_value(writer, strings, particle, item.text or "")
+        state = state_next
+
+    end = grammar.lookups[state].get(None, None)
+    if end is None:
+        raise ValueError(f"{grammar.tag} is missing required content {grammar.particles[state].qname}.")
+    writer.write_bits(end[0], grammar.state_bits[state])
+
+
+def _read_element(reader: _BitReader, strings: _StringTable, grammar: ExiGrammar, element: etree._Element) -> None:
+    state = 0
+    while True:
+        productions = grammar.states[state]
+        code = reader.read_bits(grammar.state_bits[state])
+        if code >= len(productions):
+            raise ValueError(f"Invalid EXI event code {code} in {grammar.tag}.")
+        idx, state = productions[code]
+        if idx == _END_ELEMENT:
+            return
+
+        particle = grammar.particles[idx]
+        if particle.is_attribute:
+            element.set(particle.qname, _read_value(reader, strings, particle))
+            continue
+
+        child = etree.SubElement(element, particle.qname)
+        if particle.grammar is not None:
+            _read_element(reader, strings, particle.grammar, child)
+        else:
+            child.text = _read_value(reader, strings, particle)
+
+
+def encode_experimental_exi(entity: "BaseXmlModel") -> bytes:
+    """Encodes entity as an (experimental, non conformant) EXI stream. The encoded content is the same as encode_xml
+    (i.e. None/unset values are excluded). Raises ValueError if entity can't be represented by its ExiGrammar"""
+    grammar = get_grammar(type(entity))
+    # Rendering with the precompiled plan and reparsing is considerably faster than pydantic-xml's to_xml_tree
+    xml = to_xml_bytes(entity, skip_empty=False, exclude_none=True, exclude_unset=True)
+    tree = etree.fromstring(xml, _PARSER)
+
+    writer = _BitWriter()
+    for octet in EXI_HEADER:
+        writer.write_bits(octet, 8)
+    _write_element(writer, _StringTable(), grammar, tree)
+    return writer.to_bytes()
+
+
+def decode_experimental_exi(model_type: type[ModelT], raw: bytes) -> ModelT:
+    """Decodes a stream produced by encode_experimental_exi into an instance of model_type. Raises ValueError if raw
+    isn't a valid stream for model_type"""
+    grammar = get_grammar(model_type)
+    raw = bytes(raw)
+    reader = _BitReader(raw, len(EXI_COOKIE) if raw.startswith(EXI_COOKIE) else 0)
+    if reader.read_bits(2) != 0b10:
+        raise ValueError("Missing EXI distinguishing bits.")
+    if reader.read_bits(1):
+        raise ValueError("EXI header options aren't supported (options must be agreed out of band).")
+    if reader.read_bits(5) != 0:
+        raise ValueError("Only final version 1 EXI streams are supported.")
+
+    root = etree.Element(grammar.tag, nsmap={k or None: v for k, v in grammar.nsmap.items()})
+    _read_element(reader, _StringTable(), grammar, root)
+    return model_type.from_xml_tree(root)
+
+
+EXPERIMENTAL_EXI_CODEC = ResourceCodec(encode_experimental_exi, decode_experimental_exi)
@@ -0,0 +1,155 @@
+"""Streaming (incremental) parsing of the mirror metering upload documents.
+
+A MirrorMeterReadingListRequest / MirrorUsagePointRequest can hold thousands of Reading elements. Instead of
+materialising the entire document as an lxml tree (and then as pydantic models) these utilities use the lxml pull parser
+to yield MirrorUsagePoint / MirrorMeterReading / MirrorReadingSet / Reading models as soon as each element closes. Every
+streamed element is removed from the underlying tree after it's been yielded, so peak memory is bounded by the size of a
+single element rather than the size of the upload.
+
+Because elements are yielded as they close, the streamed "container" models (MirrorReadingSet, MirrorMeterReading and
+MirrorUsagePoint) will NOT include the children that were already streamed (i.e. MirrorReadingSet.readings,
+MirrorMeterReading.mirrorReadingSets and MirrorUsagePoint.mirrorMeterReadings will be None). The mRID's of the enclosing
+elements are instead provided alongside every yielded item.
+
+With batch_readings=True the Readings of each MirrorReadingSet are NOT yielded individually - they are decoded directly
+into a columnar ReadingBatch (see reading_batch) that is provided alongside the yielded MirrorReadingSet."""
+
+from io import BytesIO
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional, Union
+
+from lxml import etree
+
+from envoy_schema.server.schema.sep2.base import nsmap
+from envoy_schema.server.schema.sep2.metering import Reading
+from envoy_schema.server.schema.sep2.metering_mirror import MirrorMeterReading, MirrorReadingSet, MirrorUsagePoint
+from envoy_schema.server.schema.sep2.reading_batch import ReadingBatch
+
+DEFAULT_CHUNK_SIZE = 64 * 1024  # Number of bytes read from a file like source per parser feed
+
+_NS = nsmap[""]
+TAG_READING = f"{{{_NS}}}Reading"
+TAG_MIRROR_READING_SET = f"{{{_NS}}}MirrorReadingSet"
+TAG_MIRROR_METER_READING = f"{{{_NS}}}MirrorMeterReading"
+TAG_MIRROR_USAGE_POINT = f"{{{_NS}}}MirrorUsagePoint"
+TAG_MRID = f"{{{_NS}}}mRID"
+
+StreamedMirrorEntity = Union[MirrorUsagePoint, MirrorMeterReading, MirrorReadingSet, Reading]
+
+
+class MirrorStreamItem(NamedTuple):
+    """A single entity parsed from a mirror upload along with the mRID's of the elements that enclose it."""
+
+    entity: StreamedMirrorEntity
+    mirror_usage_point_mrid: Optional[str]  # mRID of the enclosing MirrorUsagePoint (if any)
+    mirror_meter_reading_mrid: Optional[str]  # mRID of the enclosing MirrorMeterReading (if any)
+    mirror_reading_set_mrid: Optional[str]  # mRID of the enclosing MirrorReadingSet (if any)
+    readings: Optional[ReadingBatch] = None  # The Readings of a MirrorReadingSet entity (only if batch_readings)
+
+
+def _ancestor_mrid(element: etree._Element, tag: str) -> Optional[str]:
+    """Finds the nearest ancestor of element with tag and returns its mRID text (or None)"""
+    for ancestor in element.iterancestors(tag):
+        mrid = ancestor.find(TAG_MRID)
+        return mrid.text.strip() if mrid is not None and mrid.text else None
+    return None
+
+
+class MirrorStreamParser:
+    """Incremental parser for MirrorMeterReadingListRequest, MirrorMeterReadingRequest and MirrorUsagePointRequest
+    documents. Feed it raw bytes (in arbitrary sized chunks) and it will return MirrorStreamItem's as soon as their
+    underlying elements are complete.
+
+    Only MirrorUsagePoint, MirrorMeterReading, MirrorReadingSet and Reading elements are yielded (a root
+    MirrorMeterReadingList element is never yielded)
+
+    batch_readings: If True, the Readings of each MirrorReadingSet will be decoded into MirrorStreamItem.readings of
+    the MirrorReadingSet item (rather than each being yielded as a Reading)"""
+
+    def __init__(self, batch_readings: bool = False) -> None:
+        self._batch_readings = batch_readings
+        self._batch = ReadingBatch()  # The Readings of the currently open MirrorReadingSet (only if batch_readings)
+        self._parser = etree.XMLPullParser(
+            events=("end",),
+            tag=(TAG_READING, TAG_MIRROR_READING_SET, TAG_MIRROR_METER_READING, TAG_MIRROR_USAGE_POINT),
+            resolve_entities=False,
+            no_network=True,
+        )
+
+    def feed(self, data: bytes) -> list[MirrorStreamItem]:
+        """Feeds another chunk of the document into the parser, returning any items that have been completed"""
+        self._parser.feed(data)
+        return self._read_items()
+
+    def close(self) -> list[MirrorStreamItem]:
+        """Signals that the document has finished, returning any remaining items. Raises a lxml XMLSyntaxError if the
+        document is incomplete."""
+        self._parser.close()
+        return self._read_items()
+
+    def _read_items(self) -> list[MirrorStreamItem]:
+        items: list[MirrorStreamItem] = []
+        for _, element in self._parser.read_events():
+            parent = element.getparent()
+            entity: StreamedMirrorEntity
+            batch: Optional[ReadingBatch] = None
+            if element.tag == TAG_READING:
+                if parent is None or parent.tag != TAG_MIRROR_READING_SET:
+                    continue  # MirrorMeterReading.reading is parsed as part of the MirrorMeterReading
+                if self._batch_readings:
+                    self._batch.append_element(element)
+                    element.clear()
+                    parent.remove(element)
+                    continue
+                entity = Reading.from_xml_tree(element)
+            elif element.tag == TAG_MIRROR_READING_SET:
+                entity = MirrorReadingSet.from_xml_tree(element)
+                if self._batch_readings:
+                    batch, self._batch = self._batch, ReadingBatch()
+            elif element.tag == TAG_MIRROR_METER_READING:
+                entity = MirrorMeterReading.from_xml_tree(element)
+            else:
+                entity = MirrorUsagePoint.from_xml_tree(element)
+
+            items.append(
+                MirrorStreamItem(
+                    entity=entity,
+                    mirror_usage_point_mrid=_ancestor_mrid(element, TAG_MIRROR_USAGE_POINT),
+                    mirror_meter_reading_mrid=_ancestor_mrid(element, TAG_MIRROR_METER_READING),
+                    mirror_reading_set_mrid=_ancestor_mrid(element, TAG_MIRROR_READING_SET),
+                    readings=batch,
+                )
+            )
+
+            # Now that it's been parsed - drop the element so the tree doesn't grow with the size of the document
+            element.clear()
+            if parent is not None:
+                parent.remove(element)
+
+        return items
+
+
+def iter_mirror_stream(
+    source: Union[bytes, BinaryIO, Iterable[bytes]], chunk_size: int = DEFAULT_CHUNK_SIZE, batch_readings: bool = False
+) -> Iterator[MirrorStreamItem]:
+    """Yields MirrorStreamItem's from a MirrorMeterReadingListRequest / MirrorUsagePointRequest document as they are
+    parsed.
+
+    source can be the raw document bytes, a binary file like object (read in chunk_size blocks) or an iterable of byte
+    chunks (eg an HTTP request body stream). batch_readings is passed to MirrorStreamParser"""
+    chunks: Iterable[bytes]
+    if isinstance(source, bytes):
+        chunks = _read_chunks(BytesIO(source), chunk_size)
+    elif hasattr(source, "read"):
+        chunks = _read_chunks(source, chunk_size)  # type: ignore[arg-type]
+    else:
+        chunks = source  # type: ignore[assignment]
+
+    parser = MirrorStreamParser(batch_readings=batch_readings)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def _read_chunks(fp: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    while chunk := fp.read(chunk_size):
+        yield chunk
@@ -0,0 +1,216 @@
+"""Typed encoding/decoding of Notification.resource based on its xsi:type.
+
+Notification.resource is modelled as NotificationResourceCombined (see pub_sub) as pydantic-xml can't dispatch on
+xsi:type. The functions here work around that by handling the <Resource> element separately from the rest of the
+Notification - it is parsed/serialized as ONLY the concrete model identified by xsi:type (eg DERControlListResponse).
+The Notification "envelope" that is returned/accepted will always have resource = None"""
+
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Union
+
+from lxml import etree
+
+from envoy_schema.server.schema.sep2.base import nsmap
+from envoy_schema.server.schema.sep2.der import (
+    DefaultDERControl,
+    DERAvailability,
+    DERCapability,
+    DERControlListResponse,
+    DERProgramListResponse,
+    DERSettings,
+    DERStatus,
+)
+from envoy_schema.server.schema.sep2.end_device import EndDeviceListResponse
+from envoy_schema.server.schema.sep2.function_set_assignments import FunctionSetAssignmentsListResponse
+from envoy_schema.server.schema.sep2.identification import Resource
+from envoy_schema.server.schema.sep2.metering import ReadingListResponse
+from envoy_schema.server.schema.sep2.pricing import TimeTariffIntervalListResponse
+from envoy_schema.server.schema.sep2.pub_sub import (
+    XSI_TYPE_DEFAULT,
+    XSI_TYPE_DEFAULT_DER_CONTROL,
+    XSI_TYPE_DER_AVAILABILITY,
+    XSI_TYPE_DER_CAPABILITY,
+    XSI_TYPE_DER_CONTROL_LIST,
+    XSI_TYPE_DER_PROGRAM_LIST,
+    XSI_TYPE_DER_SETTINGS,
+    XSI_TYPE_DER_STATUS,
+    XSI_TYPE_END_DEVICE_LIST,
+    XSI_TYPE_FUNCTION_SET_ASSIGNMENTS_LIST,
+    XSI_TYPE_READING_LIST,
+    XSI_TYPE_RESOURCE,
+    XSI_TYPE_TIME_TARIFF_INTERVAL_LIST,
+    Notification,
+    NotificationStatus,
+    Subscription,
+)
+from envoy_schema.server.schema.sep2.serialization import STEP_LIST, ensure_xml_serializer, get_plan
+
+NOTIFICATION_RESOURCE_FIELD = "resource"
+NOTIFICATION_RESOURCE_TAG = f"{{{nsmap['']}}}Resource"
+XSI_TYPE_ATTRIBUTE = f"{{{nsmap['xsi']}}}type"
+
+# The concrete model for each supported Notification.resource xsi:type
+NOTIFICATION_RESOURCE_TYPES: dict[str, type[Resource]] = {
+    XSI_TYPE_TIME_TARIFF_INTERVAL_LIST: TimeTariffIntervalListResponse,
+    XSI_TYPE_DER_CONTROL_LIST: DERControlListResponse,
+    XSI_TYPE_DER_AVAILABILITY: DERAvailability,
+    XSI_TYPE_DER_CAPABILITY: DERCapability,
+    XSI_TYPE_DER_SETTINGS: DERSettings,
+    XSI_TYPE_DER_STATUS: DERStatus,
+    XSI_TYPE_DER_PROGRAM_LIST: DERProgramListResponse,
+    XSI_TYPE_FUNCTION_SET_ASSIGNMENTS_LIST: FunctionSetAssignmentsListResponse,
+    XSI_TYPE_DEFAULT_DER_CONTROL: DefaultDERControl,
+    XSI_TYPE_END_DEVICE_LIST: EndDeviceListResponse,
+    XSI_TYPE_READING_LIST: ReadingListResponse,
+    XSI_TYPE_RESOURCE: Resource,
+}
+_XSI_TYPES_BY_MODEL: dict[type[Resource], str] = {t: xsi_type for xsi_type, t in NOTIFICATION_RESOURCE_TYPES.items()}
+
+_parser = etree.XMLParser(resolve_entities=False, no_network=True)
+
+
+class TypedNotification(NamedTuple):
+    """A Notification whose resource has been parsed as the concrete model identified by its xsi:type"""
+
+    notification: Notification  # The notification "envelope" - resource will always be None
+    resource: Optional[Resource]  # The resource (if any) as the model from NOTIFICATION_RESOURCE_TYPES
+
+
+def get_notification_resource_type(xsi_type: Optional[str]) -> type[Resource]:
+    """Returns the model for the specified xsi:type (falling back to Resource if it's unknown/None)"""
+    return NOTIFICATION_RESOURCE_TYPES.get(xsi_type or XSI_TYPE_DEFAULT, Resource)
+
+
+def parse_notification(xml: Union[str, bytes]) -> TypedNotification:
+    """Parses a Notification document, decoding the resource (if any) as ONLY the model identified by its xsi:type"""
+    root = etree.fromstring(xml, parser=_parser)  # nosec
+
+    resource: Optional[Resource] = None
+    resource_element = root.find(NOTIFICATION_RESOURCE_TAG)
+    if resource_element is not None:
+        root.remove(resource_element)
+
+        resource_type = get_notification_resource_type(resource_element.get(XSI_TYPE_ATTRIBUTE, None))
+        ensure_xml_serializer(resource_type)
+        resource_element.tag = resource_type.__xml_serializer__.element_name  # type: ignore[union-attr]
+        resource = resource_type.from_xml_tree(resource_element)
+
+    return TypedNotification(notification=Notification.from_xml_tree(root), resource=resource)
+
+
+def render_resource(
+    resource: Resource, *, skip_empty: bool = False, exclude_none: bool = True, exclude_unset: bool = True
+) -> bytes:
+    """Renders resource as the encoded <Resource xsi:type="..."> element of a Notification. The xsi:type will be set
+    from NOTIFICATION_RESOURCE_TYPES if resource.type hasn't been populated. The result can be passed to
+    render_notification (many times) to avoid re-rendering the resource for each Notification"""
+    xsi_type = _XSI_TYPES_BY_MODEL.get(type(resource), None)
+    if xsi_type is None:
+        raise ValueError(f"{type(resource)} isn't a supported Notification resource type.")
+    if resource.type is None and xsi_type != XSI_TYPE_RESOURCE:
+        resource = resource.model_copy(update={"type": xsi_type})
+
+    plan = get_plan(type(resource))
+    if plan is None:
+        raise ValueError(f"{type(resource)} doesn't have a serialization plan.")
+    return plan.render_element(
+        resource, "Resource", skip_empty=skip_empty, exclude_none=exclude_none, exclude_unset=exclude_unset
+    )
+
+
+def render_notification(
+    notification: Notification,
+    resource: Union[Resource, bytes, None],
+    *,
+    skip_empty: bool = False,
+    exclude_none: bool = True,
+    exclude_unset: bool = True,
+) -> bytes:
+    """Renders notification as an encoded XML document with resource (either a model from NOTIFICATION_RESOURCE_TYPES
+    or the output of render_resource) as its <Resource> element. notification.resource is ignored"""
+    if resource is not None and not isinstance(resource, bytes):
+        resource = render_resource(
+            resource, skip_empty=skip_empty, exclude_none=exclude_none, exclude_unset=exclude_unset
+        )
+
+    plan = get_plan(Notification)
+    if plan is None:
+        raise ValueError("Notification doesn't have a serialization plan.")
+    return plan.render_spliced(
+        notification,
+        {NOTIFICATION_RESOURCE_FIELD: resource or b""},
+        skip_empty=skip_empty,
+        exclude_none=exclude_none,
+        exclude_unset=exclude_unset,
+    )
+
+
+def limit_resource(resource: Resource, limit: int) -> Resource:
+    """Returns resource truncated to at most limit list items (updating results). Resources that aren't a List (or
+    are already within limit) are returned unchanged"""
+    list_field = _get_list_field(type(resource))
+    if list_field is None:
+        return resource
+
+    items = getattr(resource, list_field)
+    if items is None or len(items) <= limit:
+        return resource
+    truncated = items[: max(limit, 0)]
+    return resource.model_copy(update={list_field: truncated, "results": len(truncated)})
+
+
+def render_notifications(
+    resource: Optional[Resource],
+    subscriptions: Iterable[Subscription],
+    *,
+    status: NotificationStatus = NotificationStatus.DEFAULT,
+    notification_href: Optional[Callable[[Subscription], str]] = None,
+    skip_empty: bool = False,
+    exclude_none: bool = True,
+    exclude_unset: bool = True,
+) -> Iterator[tuple[Subscription, bytes]]:
+    """Renders a Notification of resource for each of subscriptions, yielding (subscription, notification_xml).
+
+    resource is only rendered once for each distinct (effective) Subscription.limit - every notification splices in
+    the same pre rendered <Resource> element. Only the envelope (subscribedResource, subscriptionURI, href and status)
+    is rendered per subscription. subscriptionURI is taken from Subscription.href (which must be set).
+
+    notification_href: If set - will be called for each subscription to generate the Notification.href"""
+    rendered_by_count: dict[Optional[int], bytes] = {}
+    list_length: Optional[int] = None
+    if resource is not None and (list_field := _get_list_field(type(resource))) is not None:
+        list_length = len(getattr(resource, list_field) or [])
+
+    for subscription in subscriptions:
+        if subscription.href is None:
+            raise ValueError(f"Subscription for {subscription.subscribedResource} has no href (subscriptionURI).")
+
+        rendered: Optional[bytes] = None
+        if resource is not None:
+            count = None if list_length is None else min(max(subscription.limit, 0), list_length)
+            rendered = rendered_by_count.get(count, None)
+            if rendered is None:
+                rendered = render_resource(
+                    resource if count is None else limit_resource(resource, count),
+                    skip_empty=skip_empty,
+                    exclude_none=exclude_none,
+                    exclude_unset=exclude_unset,
+                )
+                rendered_by_count[count] = rendered
+
+        envelope = Notification(
+            subscribedResource=subscription.subscribedResource, subscriptionURI=subscription.href, status=status
+        )
+        if notification_href is not None:
+            envelope.href = notification_href(subscription)
+        yield subscription, render_notification(
+            envelope, rendered, skip_empty=skip_empty, exclude_none=exclude_none, exclude_unset=exclude_unset
+        )
+
+
+def _get_list_field(resource_type: type[Resource]) -> Optional[str]:
+    """The name of the list items field if resource_type is a sep2 List (otherwise None)"""
+    plan = get_plan(resource_type)
+    if plan is None or "results" not in resource_type.model_fields:
+        return None
+    list_fields = [step[1] for step in plan.steps if step[0] == STEP_LIST]
+    return list_fields[0] if len(list_fields) == 1 else None
@@ -114,7 +114,8 @@ class NotificationResourceCombined(Resource):
 
     The plan is for the server to only fill out the fields relevant for the notification being served (based on
     the xsi:type attribute). Clients using this to parse Notifications will have to manually map the fields to
-    the appropriate types.
+    the appropriate types. Alternatively, see the notification module which parses/renders the resource as ONLY the
+    concrete model identified by xsi:type.
 
     HERE BE DRAGONS FOR XSD VALIDITY:
         In order to keep XSD element ordering, we've had to do a few "creative" element orderings to ensure that
@@ -0,0 +1,89 @@
+"""Column (array) level decoding and filtering of Reading.qualityFlags (see types.QualityFlagsType).
+
+A column of qualityFlags is held as an array("H") of the decoded HexBinary16 values (the same as
+ReadingBatch.quality_flags). Predicates over a column are evaluated as a "selector" - a bytes object with one 0/1 byte
+per row that can be passed to itertools.compress or ReadingBatch.select:
+
+    flags = decode_quality_flags(["01", "41", "09"])  # array("H", [1, 65, 9])
+    select_quality_flags(flags, none_of=QualityFlagsType.FORECAST)  # b"\\x01\\x00\\x01"
+
+Every QualityFlagsType bit lives in the low byte of the flags so selectors are evaluated by building a 256 entry
+lookup table for the predicate and then translating the low byte of every row through it (bytes.translate) - there is
+no per row python code."""
+
+import sys
+from array import array
+from itertools import repeat
+from typing import Iterable, Optional, Union
+
+from envoy_schema.server.schema.sep2.primitive_types import validate_hex_binary_batch
+from envoy_schema.server.schema.sep2.reading_batch import encode_hex16
+from envoy_schema.server.schema.sep2.types import QualityFlagsType
+
+# Any of the "replaced by a machine computed value" flags
+ESTIMATED_FLAGS = QualityFlagsType.ESTIMATED_BY_DAY | QualityFlagsType.ESTIMATED_BY_LINEAR
+
+_LOW_BYTE_MASK = 0xFF
+# Slices the low byte of every uint16 from array("H").tobytes()
+_LOW_BYTES = slice(0 if sys.byteorder == "little" else 1, None, 2)
+
+QualityFlags = Union[QualityFlagsType, int]
+
+
+def decode_quality_flags(values: Iterable[Optional[str]]) -> array:
+    """Decodes a column of qualityFlags (HexBinary16) strings to an array("H") of flags. None values (qualityFlags is
+    Optional) decode as QualityFlagsType.NONE. Raises ValueError (with the offending index) for invalid values"""
+    validated = validate_hex_binary_batch(["00" if v is None else v for v in values], 16)
+    return array("H", map(int, validated, repeat(16)))
+
+
+def encode_quality_flags(flags: Iterable[int]) -> list[str]:
+    """Encodes a column of flags as qualityFlags (HexBinary16 octet) strings"""
+    return list(map(encode_hex16, flags))
+
+
+def _matches(v: int, all_of: int, any_of: int, none_of: int) -> bool:
+    return (v & all_of) == all_of and (not any_of or bool(v & any_of)) and not v & none_of
+
+
+def select_quality_flags(
+    flags: array,
+    *,
+    all_of: QualityFlags = QualityFlagsType.NONE,
+    any_of: QualityFlags = QualityFlagsType.NONE,
+    none_of: QualityFlags = QualityFlagsType.NONE,
+) -> bytes:
+    """Returns a selector (one 0/1 byte per row of flags) for the rows whose flags:
+        have every bit in all_of set AND (if specified) have at least one bit in any_of set AND have no bits in none_of
+    set. flags must be an array("H") (eg from decode_quality_flags or ReadingBatch.quality_flags)"""
+    if flags.typecode != "H":
+        raise ValueError(f"flags must be an array('H') not array('{flags.typecode}').")
+    all_of, any_of, none_of = int(all_of), int(any_of), int(none_of)
+
+    if (all_of | any_of | none_of) > _LOW_BYTE_MASK:
+        # Predicates on reserved (high byte) bits are rare - evaluate the predicate once per distinct value instead
+        lookup = {v: _matches(v, all_of, any_of, none_of) for v in set(flags)}
+        return bytes(map(lookup.__getitem__, flags))
+
+    table = bytes(_matches(v, all_of, any_of, none_of) for v in range(256))
+    return flags.tobytes()[_LOW_BYTES].translate(table)
+
+
+def exclude_forecast(flags: array) -> bytes:
+    """Selector for rows that aren't flagged as FORECAST"""
+    return select_quality_flags(flags, none_of=QualityFlagsType.FORECAST)
+
+
+def only_valid(flags: array) -> bytes:
+    """Selector for rows that are flagged as VALID"""
+    return select_quality_flags(flags, all_of=QualityFlagsType.VALID)
+
+
+def any_estimated(flags: array) -> bytes:
+    """Selector for rows that are flagged with any of ESTIMATED_FLAGS"""
+    return select_quality_flags(flags, any_of=ESTIMATED_FLAGS)
+
+
+def count_quality_flags(flags: array) -> dict[QualityFlagsType, int]:
+    """Returns the number of rows that have each (individual) QualityFlagsType bit set"""
+    return {flag: select_quality_flags(flags, all_of=flag).count(1) for flag in QualityFlagsType if flag.value}
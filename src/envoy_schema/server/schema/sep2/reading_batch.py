@@ -0,0 +1,361 @@
+"""Columnar representation of the Readings in a MirrorReadingSet.
+
+A MirrorReadingSet with thousands of Readings is otherwise held as thousands of Reading (and DateTimeIntervalType)
+models. ReadingBatch instead stores each Reading field as a typed column (stdlib array) so that a batch of N readings
+is a handful of contiguous buffers:
+
+    start / duration / value    - array("q") (int64)
+    quality_flags / local_id    - array("H") (uint16) decoded from the HexBinary16 strings
+    tou_tier / consumption_block - array("B") (uint8)
+    none_mask                   - array("B") of ReadingField flags recording which Optional fields were None
+    set_mask                    - array("B") of ReadingField flags recording which defaulted fields were explicitly set
+
+Rows can be filtered with ReadingBatch.select (see quality_flags for building selectors).
+
+Conversion to/from Reading is lossless in value (and in which fields are set) - the only normalisation is that the
+HexBinary16 fields are rendered back as their shortest octet string eg "1" and "0001" both become "01". The rarely
+used Resource attributes (href, xsi:type and subscribable) are held sparsely in extras (keyed by row).
+
+ReadingBatch.append_element decodes a <Reading> lxml element directly into the columns (without creating any
+models) - see MirrorStreamParser(batch_readings=True)"""
+
+from array import array
+from enum import IntFlag, auto
+from itertools import compress
+from typing import Any, Iterable, Optional, Sequence
+
+from lxml import etree
+
+from envoy_schema.server.schema.sep2 import types
+from envoy_schema.server.schema.sep2.base import nsmap
+from envoy_schema.server.schema.sep2.metering import Reading
+from envoy_schema.server.schema.sep2.metering_mirror import MirrorReadingSet
+from envoy_schema.server.schema.sep2.primitive_types import hex_binary_validator
+
+_NS = nsmap[""]
+_TAG_CONSUMPTION_BLOCK = f"{{{_NS}}}consumptionBlock"
+_TAG_QUALITY_FLAGS = f"{{{_NS}}}qualityFlags"
+_TAG_TIME_PERIOD = f"{{{_NS}}}timePeriod"
+_TAG_TOU_TIER = f"{{{_NS}}}touTier"
+_TAG_VALUE = f"{{{_NS}}}value"
+_TAG_LOCAL_ID = f"{{{_NS}}}localID"
+_TAG_DURATION = f"{{{_NS}}}duration"
+_TAG_START = f"{{{_NS}}}start"
+_ATTR_TYPE = f"{{{nsmap['xsi']}}}type"
+
+_EXTRA_ATTRIBUTES = ("type", "href", "subscribable")
+
+_validate_hex16 = hex_binary_validator(16)
+
+
+class ReadingField(IntFlag):
+    """Flags for the Optional Reading fields (as recorded in ReadingBatch.none_mask)"""
+
+    NONE = 0
+    TIME_PERIOD = auto()
+    VALUE = auto()
+    QUALITY_FLAGS = auto()
+    TOU_TIER = auto()
+    CONSUMPTION_BLOCK = auto()
+    LOCAL_ID = auto()
+
+
+# none_mask for a Reading where only the defaulted fields (qualityFlags, touTier and consumptionBlock) are set
+_DEFAULT_NONE_MASK = int(ReadingField.TIME_PERIOD | ReadingField.VALUE | ReadingField.LOCAL_ID)
+
+# The fields of Reading with a (non None) default - set_mask distinguishes an explicit default value from an unset field
+_DEFAULTED_FIELDS = {
+    "qualityFlags": ReadingField.QUALITY_FLAGS,
+    "touTier": ReadingField.TOU_TIER,
+    "consumptionBlock": ReadingField.CONSUMPTION_BLOCK,
+}
+
+
+def decode_hex16(v: str) -> int:
+    """Decodes a (validated) HexBinary16 string to its integer value"""
+    return int(_validate_hex16(v), 16)
+
+
+def encode_hex16(v: int) -> str:
+    """Encodes v as a HexBinary16 octet string (eg 1 -> "01", 256 -> "0100")"""
+    return f"{v:02x}" if v < 0x100 else f"{v:04x}"
+
+
+class ReadingBatch:
+    """A columnar (array backed) list of Readings. Rows are appended in order and every column has len(self) items.
+    Columns for None values hold 0 (check none_mask before using them)"""
+
+    __slots__ = (
+        "start",
+        "duration",
+        "value",
+        "quality_flags",
+        "tou_tier",
+        "consumption_block",
+        "local_id",
+        "none_mask",
+        "set_mask",
+        "extras",
+    )
+
+    def __init__(self) -> None:
+        self.start = array("q")  # timePeriod.start
+        self.duration = array("q")  # timePeriod.duration
+        self.value = array("q")
+        self.quality_flags = array("H")  # Decoded qualityFlags (maps to QualityFlagsType)
+        self.tou_tier = array("B")
+        self.consumption_block = array("B")
+        self.local_id = array("H")  # Decoded localID
+        self.none_mask = array("B")  # ReadingField flags for each field that is None
+        self.set_mask = array("B")  # ReadingField flags for each defaulted field that was explicitly set
+        self.extras: dict[int, dict[str, Any]] = {}  # Row index -> Resource attributes (type/href/subscribable)
+
+    def __len__(self) -> int:
+        return len(self.none_mask)
+
+    def __repr__(self) -> str:
+        return f"ReadingBatch(len={len(self)})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ReadingBatch):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in ReadingBatch.__slots__)
+
+    def _append_row(
+        self,
+        start: int,
+        duration: int,
+        value: int,
+        quality_flags: int,
+        tou_tier: int,
+        consumption_block: int,
+        local_id: int,
+        none_mask: int,
+        set_mask: int,
+        extras: Optional[dict[str, Any]],
+    ) -> None:
+        # Validate the range of every column BEFORE appending anything so a failure can't leave the columns misaligned
+        for v, column in (
+            (start, self.start),
+            (duration, self.duration),
+            (value, self.value),
+            (quality_flags, self.quality_flags),
+            (local_id, self.local_id),
+        ):
+            lower, upper = _COLUMN_RANGES[column.typecode]
+            if not lower <= v <= upper:
+                raise ValueError(f"{v} is out of range for a ReadingBatch column.")
+
+        row = len(self)
+        self.start.append(start)
+        self.duration.append(duration)
+        self.value.append(value)
+        self.quality_flags.append(quality_flags)
+        self.tou_tier.append(tou_tier)
+        self.consumption_block.append(consumption_block)
+        self.local_id.append(local_id)
+        self.none_mask.append(none_mask)
+        self.set_mask.append(set_mask)
+        if extras:
+            self.extras[row] = extras
+
+    def append(self, reading: Reading) -> None:
+        """Appends reading as the last row of this batch"""
+        none_mask = 0
+        start = duration = 0
+        if reading.timePeriod is None:
+            none_mask |= ReadingField.TIME_PERIOD
+        else:
+            start = reading.timePeriod.start
+            duration = reading.timePeriod.duration
+
+        value = 0
+        if reading.value is None:
+            none_mask |= ReadingField.VALUE
+        else:
+            value = reading.value
+
+        quality_flags = 0
+        if reading.qualityFlags is None:
+            none_mask |= ReadingField.QUALITY_FLAGS
+        else:
+            quality_flags = int(reading.qualityFlags, 16)
+
+        tou_tier = 0
+        if reading.touTier is None:
+            none_mask |= ReadingField.TOU_TIER
+        else:
+            tou_tier = reading.touTier
+
+        consumption_block = 0
+        if reading.consumptionBlock is None:
+            none_mask |= ReadingField.CONSUMPTION_BLOCK
+        else:
+            consumption_block = reading.consumptionBlock
+
+        local_id = 0
+        if reading.localID is None:
+            none_mask |= ReadingField.LOCAL_ID
+        else:
+            local_id = int(reading.localID, 16)
+
+        set_mask = 0
+        for field_name, flag in _DEFAULTED_FIELDS.items():
+            if field_name in reading.model_fields_set:
+                set_mask |= flag
+
+        extras = {a: getattr(reading, a) for a in _EXTRA_ATTRIBUTES if getattr(reading, a) is not None}
+        self._append_row(
+            start, duration, value, quality_flags, tou_tier, consumption_block, local_id, none_mask, set_mask, extras
+        )
+
+    def append_element(self, element: etree._Element) -> None:
+        """Decodes a <Reading> element directly into a new row (without creating a Reading model). The element
+        is validated equivalently to Reading.from_xml_tree - raising ValueError if it's invalid"""
+        none_mask = _DEFAULT_NONE_MASK
+        set_mask = 0
+        start = duration = value = quality_flags = tou_tier = consumption_block = local_id = 0
+
+        for child in element:
+            tag = child.tag
+            text = child.text
+            if tag == _TAG_TIME_PERIOD:
+                start_element = child.find(_TAG_START)
+                duration_element = child.find(_TAG_DURATION)
+                if start_element is None or duration_element is None:
+                    raise ValueError("Reading timePeriod requires both start and duration.")
+                start = _parse_int(start_element.text, "timePeriod.start")
+                duration = _parse_int(duration_element.text, "timePeriod.duration")
+                none_mask &= ~ReadingField.TIME_PERIOD
+            elif text is None:
+                continue  # Not a field element we decode (or an empty element which is treated as unset)
+            elif tag == _TAG_VALUE:
+                value = _parse_int(text, "value")
+                none_mask &= ~ReadingField.VALUE
+            elif tag == _TAG_QUALITY_FLAGS:
+                quality_flags = decode_hex16(text)
+                set_mask |= ReadingField.QUALITY_FLAGS
+            elif tag == _TAG_TOU_TIER:
+                tou_tier = types.TOUType(_parse_int(text, "touTier"))
+                set_mask |= ReadingField.TOU_TIER
+            elif tag == _TAG_CONSUMPTION_BLOCK:
+                consumption_block = types.ConsumptionBlockType(_parse_int(text, "consumptionBlock"))
+                set_mask |= ReadingField.CONSUMPTION_BLOCK
+            elif tag == _TAG_LOCAL_ID:
+                local_id = decode_hex16(text)
+                none_mask &= ~ReadingField.LOCAL_ID
+
+        extras: dict[str, Any] = {}
+        if (xsi_type := element.get(_ATTR_TYPE, None)) is not None:
+            extras["type"] = xsi_type
+        if (href := element.get("href", None)) is not None:
+            extras["href"] = href
+        if (subscribable := element.get("subscribable", None)) is not None:
+            extras["subscribable"] = types.SubscribableType(_parse_int(subscribable, "subscribable"))
+
+        self._append_row(
+            start, duration, value, quality_flags, tou_tier, consumption_block, local_id, none_mask, set_mask, extras
+        )
+
+    def select(self, selector: bytes) -> "ReadingBatch":
+        """Returns a new batch of only the rows whose selector byte is non zero (see quality_flags for building
+        selectors). selector must have exactly one byte per row"""
+        if len(selector) != len(self):
+            raise ValueError(f"selector has {len(selector)} items but the batch has {len(self)} rows.")
+
+        selected = ReadingBatch()
+        for column in ReadingBatch.__slots__:
+            if column != "extras":
+                getattr(selected, column).extend(compress(getattr(self, column), selector))
+        if self.extras:
+            new_rows = compress(range(len(self)), selector)
+            selected.extras = {new_row: self.extras[row] for new_row, row in enumerate(new_rows) if row in self.extras}
+        return selected
+
+    def take(self, rows: Sequence[int]) -> "ReadingBatch":
+        """Returns a new batch of the specified rows (in the order of rows - which may repeat / reorder rows)"""
+        taken = ReadingBatch()
+        for column in ReadingBatch.__slots__:
+            if column != "extras":
+                getattr(taken, column).extend(map(getattr(self, column).__getitem__, rows))
+        if self.extras:
+            taken.extras = {new_row: self.extras[row] for new_row, row in enumerate(rows) if row in self.extras}
+        return taken
+
+    @classmethod
+    def concat(cls, batches: Iterable["ReadingBatch"]) -> "ReadingBatch":
+        """Returns a new batch of every row of batches (in order)"""
+        combined = cls()
+        for batch in batches:
+            offset = len(combined)
+            for column in ReadingBatch.__slots__:
+                if column != "extras":
+                    getattr(combined, column).extend(getattr(batch, column))
+            combined.extras.update((offset + row, extras) for row, extras in batch.extras.items())
+        return combined
+
+    def extend(self, readings: Iterable[Reading]) -> None:
+        for reading in readings:
+            self.append(reading)
+
+    @classmethod
+    def from_readings(cls, readings: Optional[Iterable[Reading]]) -> "ReadingBatch":
+        batch = cls()
+        if readings is not None:
+            batch.extend(readings)
+        return batch
+
+    @classmethod
+    def from_reading_set(cls, reading_set: MirrorReadingSet) -> "ReadingBatch":
+        return cls.from_readings(reading_set.readings)
+
+    def reading(self, row: int) -> Reading:
+        """Creates the Reading model for the specified row. Fields holding their Reading default are left unset
+        unless they were explicitly set (see set_mask)"""
+        none_mask = self.none_mask[row]
+        set_mask = self.set_mask[row]
+        fields: dict[str, Any] = self.extras.get(row, {}).copy()
+
+        if not none_mask & ReadingField.TIME_PERIOD:
+            fields["timePeriod"] = types.DateTimeIntervalType(start=self.start[row], duration=self.duration[row])
+        if not none_mask & ReadingField.VALUE:
+            fields["value"] = self.value[row]
+        if not none_mask & ReadingField.LOCAL_ID:
+            fields["localID"] = encode_hex16(self.local_id[row])
+
+        if none_mask & ReadingField.QUALITY_FLAGS:
+            fields["qualityFlags"] = None
+        elif set_mask & ReadingField.QUALITY_FLAGS or self.quality_flags[row]:
+            fields["qualityFlags"] = encode_hex16(self.quality_flags[row])
+
+        if none_mask & ReadingField.TOU_TIER:
+            fields["touTier"] = None
+        elif set_mask & ReadingField.TOU_TIER or self.tou_tier[row]:
+            fields["touTier"] = self.tou_tier[row]
+
+        if none_mask & ReadingField.CONSUMPTION_BLOCK:
+            fields["consumptionBlock"] = None
+        elif set_mask & ReadingField.CONSUMPTION_BLOCK or self.consumption_block[row]:
+            fields["consumptionBlock"] = self.consumption_block[row]
+
+        return Reading(**fields)
+
+    def to_readings(self) -> list[Reading]:
+        return [self.reading(row) for row in range(len(self))]
+
+    def to_reading_set(self, reading_set: MirrorReadingSet) -> MirrorReadingSet:
+        """Returns a copy of reading_set with its readings replaced by the Readings in this batch"""
+        return reading_set.model_copy(update={"readings": self.to_readings()})
+
+
+# (min, max) of each array typecode used by ReadingBatch (checked before appending so rows stay aligned)
+_COLUMN_RANGES: dict[str, tuple[int, int]] = {"q": (-(2**63), 2**63 - 1), "H": (0, 2**16 - 1), "B": (0, 2**8 - 1)}
+
+
+def _parse_int(text: Optional[str], name: str) -> int:
+    if text is None:
+        raise ValueError(f"Reading {name} is missing a value.")
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f"Reading {name} '{text}' is not a valid integer.")
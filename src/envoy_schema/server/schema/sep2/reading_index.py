@@ -0,0 +1,163 @@
+"""Duplicate / overlap / gap detection for mirror reading uploads.
+
+Devices frequently re-post overlapping MirrorReadingSet windows. The readings of every MirrorReadingSet posted for the
+same MirrorMeterReading.mRID are combined (as a ReadingBatch), sorted by (timePeriod.start, localID) and then checked
+in a single pass (O(n log n) overall):
+
+    duplicates - readings with the same timePeriod.start and localID as an earlier reading (the first is kept)
+    overlaps   - (non duplicate) readings that start before the end of a preceding reading
+    gaps       - at least one ReadingType.intervalLength (or any time if there is no intervalLength) without a reading
+
+The deduplicated (and sorted) ReadingBatch is returned alongside the report. Readings without a timePeriod can't be
+indexed - they are counted (as untimed) and excluded."""
+
+from array import array
+from itertools import compress
+from typing import Iterable, NamedTuple, Optional
+
+from envoy_schema.server.schema.sep2.metering_mirror import MirrorMeterReading, MirrorMeterReadingListRequest
+from envoy_schema.server.schema.sep2.reading_batch import ReadingBatch, ReadingField
+
+_TIMED_TABLE = bytes(not v & ReadingField.TIME_PERIOD for v in range(256))  # none_mask byte -> 0/1 selector
+
+
+class ReadingDuplicate(NamedTuple):
+    """A reading that was dropped as it has the same (start, localID) as an earlier reading"""
+
+    start: int  # timePeriod.start of the duplicated reading
+    local_id: Optional[int]  # Decoded localID of the duplicated reading (if any)
+    mirror_reading_set_mrid: str  # The MirrorReadingSet that the dropped reading was posted in
+    kept_mirror_reading_set_mrid: str  # The MirrorReadingSet that the kept reading was posted in
+
+
+class ReadingOverlap(NamedTuple):
+    """A reading that starts before the end of a preceding (non duplicate) reading"""
+
+    start: int  # timePeriod.start of the overlapping reading
+    overlap_seconds: int  # How far the reading overlaps the latest ending preceding reading
+
+
+class ReadingGap(NamedTuple):
+    """A period without any readings"""
+
+    start: int  # The end of the reading before the gap
+    end: int  # The start of the reading after the gap
+    missing_intervals: Optional[int]  # Whole intervalLength's in the gap (None if intervalLength is unknown)
+
+
+class MirrorReadingIndex(NamedTuple):
+    """The indexed readings of a single MirrorMeterReading.mRID"""
+
+    mirror_meter_reading_mrid: str
+    interval_length: Optional[int]  # ReadingType.intervalLength (if it was posted)
+    readings: ReadingBatch  # Deduplicated readings, sorted by (start, localID)
+    duplicates: list[ReadingDuplicate]
+    overlaps: list[ReadingOverlap]
+    gaps: list[ReadingGap]
+    untimed: int  # Number of readings that were excluded as they have no timePeriod
+
+
+def index_reading_batch(
+    mirror_meter_reading_mrid: str,
+    batch: ReadingBatch,
+    set_mrids: list[str],
+    set_idxs: array,
+    interval_length: Optional[int] = None,
+) -> MirrorReadingIndex:
+    """Indexes batch where set_idxs is an array (one item per row of batch) of the index in set_mrids of the
+    MirrorReadingSet that each row was posted in"""
+    selector = batch.none_mask.tobytes().translate(_TIMED_TABLE)
+    if (untimed := selector.count(0)) != 0:
+        batch = batch.select(selector)
+        set_idxs = array(set_idxs.typecode, compress(set_idxs, selector))
+
+    # localID sorts as -1 (before every decoded localID) if it's None
+    local_keys = [
+        -1 if mask & ReadingField.LOCAL_ID else local_id for mask, local_id in zip(batch.none_mask, batch.local_id)
+    ]
+    keys = list(zip(batch.start, local_keys))
+    order = sorted(range(len(batch)), key=keys.__getitem__)  # Stable - the first posted duplicate sorts first
+
+    kept: list[int] = []
+    duplicates: list[ReadingDuplicate] = []
+    overlaps: list[ReadingOverlap] = []
+    gaps: list[ReadingGap] = []
+    gap_threshold = interval_length if interval_length and interval_length > 0 else 1
+    last_key: Optional[tuple[int, int]] = None
+    max_end: Optional[int] = None
+    for row in order:
+        key = keys[row]
+        start = key[0]
+        if key == last_key:
+            duplicates.append(
+                ReadingDuplicate(
+                    start=start,
+                    local_id=None if key[1] < 0 else key[1],
+                    mirror_reading_set_mrid=set_mrids[set_idxs[row]],
+                    kept_mirror_reading_set_mrid=set_mrids[set_idxs[kept[-1]]],
+                )
+            )
+            continue
+
+        if max_end is not None:
+            if start < max_end:
+                overlaps.append(ReadingOverlap(start=start, overlap_seconds=max_end - start))
+            elif start - max_end >= gap_threshold:
+                gaps.append(
+                    ReadingGap(
+                        start=max_end,
+                        end=start,
+                        missing_intervals=(start - max_end) // interval_length if interval_length else None,
+                    )
+                )
+
+        end = start + batch.duration[row]
+        max_end = end if max_end is None else max(max_end, end)
+        last_key = key
+        kept.append(row)
+
+    return MirrorReadingIndex(
+        mirror_meter_reading_mrid=mirror_meter_reading_mrid,
+        interval_length=interval_length,
+        readings=batch.take(kept),
+        duplicates=duplicates,
+        overlaps=overlaps,
+        gaps=gaps,
+        untimed=untimed,
+    )
+
+
+def index_mirror_meter_readings(mirror_meter_readings: Iterable[MirrorMeterReading]) -> list[MirrorReadingIndex]:
+    """Indexes the readings of every MirrorReadingSet - combining all MirrorMeterReading's with the same mRID. Results
+    are in order of the first appearance of each mRID"""
+    set_mrids: dict[str, list[str]] = {}
+    set_idxs: dict[str, array] = {}
+    batches: dict[str, list[ReadingBatch]] = {}
+    interval_lengths: dict[str, Optional[int]] = {}
+    for mmr in mirror_meter_readings:
+        mrid_batches = batches.setdefault(mmr.mRID, [])
+        mrid_set_mrids = set_mrids.setdefault(mmr.mRID, [])
+        mrid_set_idxs = set_idxs.setdefault(mmr.mRID, array("I"))
+        if interval_lengths.get(mmr.mRID, None) is None and mmr.readingType is not None:
+            interval_lengths[mmr.mRID] = mmr.readingType.intervalLength
+
+        for reading_set in mmr.mirrorReadingSets or []:
+            batch = ReadingBatch.from_reading_set(reading_set)
+            mrid_set_idxs.extend([len(mrid_set_mrids)] * len(batch))
+            mrid_set_mrids.append(reading_set.mRID)
+            mrid_batches.append(batch)
+
+    return [
+        index_reading_batch(
+            mrid,
+            ReadingBatch.concat(mrid_batches),
+            set_mrids[mrid],
+            set_idxs[mrid],
+            interval_lengths.get(mrid, None),
+        )
+        for mrid, mrid_batches in batches.items()
+    ]
+
+
+def index_mirror_reading_list(request: MirrorMeterReadingListRequest) -> list[MirrorReadingIndex]:
+    return index_mirror_meter_readings(request.mirrorMeterReadings or [])
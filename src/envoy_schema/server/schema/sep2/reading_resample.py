@@ -0,0 +1,161 @@
+"""Resampling of Reading time series into fixed width (eg 5/15/30 minute) buckets.
+
+How readings are combined into a bucket depends on the ReadingType:
+
+    accumulationBehaviour CUMULATIVE / SUMMATION - each reading is the register value at the end of its timePeriod (the
+        start for a zero duration snapshot). The register is first diffed and each change is treated as DELTA_DATA
+        spread over the whole period since the previous reading (so a missing reading doesn't cram the change into a
+        single interval). The first reading only establishes the baseline. A register that decreases (a rollover or
+        meter reset) can't be diffed - nothing is recorded for the period since the previous reading (it shows as
+        missing coverage) and the lower reading becomes the new baseline.
+    accumulationBehaviour DELTA_DATA - values are summed (a reading spanning several buckets is apportioned by time)
+    Otherwise (INSTANTANEOUS, INDICATING etc) the dataQualifier decides:
+        AVERAGE / STANDARD / NOT_APPLICABLE - time weighted average
+        MAXIMUM / MINIMUM - max / min of every reading that overlaps the bucket
+        STD_DEVIATION_* - can't be resampled (raises ValueError)
+
+Buckets are aligned to multiples of width from origin (defaulting to the unix epoch so that buckets fall on clock
+boundaries). Only buckets that overlap at least one reading are returned. Readings with a duration of 0 are treated
+as a 1 second sample at their start."""
+
+from array import array
+from itertools import compress
+from typing import Iterator, NamedTuple, Optional
+
+from envoy_schema.server.schema.sep2.metering import ReadingType
+from envoy_schema.server.schema.sep2.reading_batch import ReadingBatch, ReadingField
+from envoy_schema.server.schema.sep2.types import AccumulationBehaviourType, DataQualifierType
+
+AGGREGATE_SUM = "sum"
+AGGREGATE_MEAN = "mean"
+AGGREGATE_MAX = "max"
+AGGREGATE_MIN = "min"
+
+CUMULATIVE_BEHAVIOURS = {AccumulationBehaviourType.CUMULATIVE, AccumulationBehaviourType.SUMMATION}
+
+AGGREGATE_BY_DATA_QUALIFIER: dict[DataQualifierType, str] = {
+    DataQualifierType.NOT_APPLICABLE: AGGREGATE_MEAN,
+    DataQualifierType.AVERAGE: AGGREGATE_MEAN,
+    DataQualifierType.STANDARD: AGGREGATE_MEAN,
+    DataQualifierType.MAXIMUM: AGGREGATE_MAX,
+    DataQualifierType.MINIMUM: AGGREGATE_MIN,
+}
+
+_UNUSABLE = ReadingField.TIME_PERIOD | ReadingField.VALUE
+_USABLE_TABLE = bytes(not v & _UNUSABLE for v in range(256))  # none_mask byte -> 0/1 selector
+
+
+class ResampledReadings(NamedTuple):
+    """Columns of fixed width buckets (one item per bucket, sorted by start)"""
+
+    width: int  # Width of every bucket (seconds)
+    aggregate: str  # How readings were combined (one of the AGGREGATE_* values)
+    start: array  # array("q") of bucket start times (seconds since epoch)
+    value: array  # array("d") of bucket values
+    coverage: array  # array("q") of the seconds of each bucket that were covered by readings
+
+
+def get_aggregate(
+    accumulation_behaviour: Optional[AccumulationBehaviourType], data_qualifier: Optional[DataQualifierType]
+) -> tuple[bool, str]:
+    """Returns (is_cumulative, aggregate) for the specified ReadingType values. Raises ValueError if the readings
+    can't be resampled"""
+    if accumulation_behaviour in CUMULATIVE_BEHAVIOURS:
+        return (True, AGGREGATE_SUM)
+    if accumulation_behaviour == AccumulationBehaviourType.DELTA_DATA:
+        return (False, AGGREGATE_SUM)
+
+    aggregate = AGGREGATE_BY_DATA_QUALIFIER.get(data_qualifier or DataQualifierType.NOT_APPLICABLE, None)
+    if aggregate is None:
+        raise ValueError(f"Readings with dataQualifier {data_qualifier} can't be resampled.")
+    return (False, aggregate)
+
+
+def resample_intervals(
+    start: array,
+    duration: array,
+    value: array,
+    width: int,
+    accumulation_behaviour: Optional[AccumulationBehaviourType] = None,
+    data_qualifier: Optional[DataQualifierType] = None,
+    origin: int = 0,
+) -> ResampledReadings:
+    """Resamples the intervals described by the (equal length) start/duration/value columns into buckets of width
+    seconds. The columns needn't be sorted"""
+    if width <= 0:
+        raise ValueError(f"width must be positive, not {width}.")
+    if not len(start) == len(duration) == len(value):
+        raise ValueError("start, duration and value must have the same length.")
+    is_cumulative, aggregate = get_aggregate(accumulation_behaviour, data_qualifier)
+
+    order = sorted(range(len(start)), key=start.__getitem__)
+    rows: Iterator[tuple[int, int, float]] = zip(
+        map(start.__getitem__, order), map(duration.__getitem__, order), map(value.__getitem__, order)
+    )
+    if is_cumulative:
+        previous: Optional[tuple[int, float]] = None  # (end, value) of the previous register reading
+        deltas: list[tuple[int, int, float]] = []
+        for s, d, v in rows:
+            end = s + max(d, 0)
+            if previous is not None and v >= previous[1]:  # A decrease is a rollover / reset (see module docstring)
+                deltas.append((previous[0], end - previous[0], v - previous[1]))
+            previous = (end, v)
+        rows = iter(deltas)
+
+    totals: dict[int, float] = {}  # bucket -> sum (AGGREGATE_SUM), weighted sum (AGGREGATE_MEAN) or max/min
+    coverage: dict[int, int] = {}  # bucket -> seconds covered
+    for s, d, v in rows:
+        if d <= 0:
+            d = 1
+        end = s + d
+        last_bucket = (end - 1 - origin) // width
+        bucket = (s - origin) // width
+        while bucket <= last_bucket:
+            bucket_start = origin + bucket * width
+            overlap = min(end, bucket_start + width) - max(s, bucket_start)
+
+            if aggregate == AGGREGATE_SUM:
+                totals[bucket] = totals.get(bucket, 0.0) + (v if overlap == d else v * overlap / d)
+            elif aggregate == AGGREGATE_MEAN:
+                totals[bucket] = totals.get(bucket, 0.0) + v * overlap
+            elif bucket not in totals:
+                totals[bucket] = v
+            elif aggregate == AGGREGATE_MAX:
+                totals[bucket] = max(totals[bucket], v)
+            else:
+                totals[bucket] = min(totals[bucket], v)
+            coverage[bucket] = coverage.get(bucket, 0) + overlap
+            bucket += 1
+
+    buckets = sorted(totals)
+    values = map(totals.__getitem__, buckets)
+    if aggregate == AGGREGATE_MEAN:
+        values = map(lambda b: totals[b] / coverage[b], buckets)
+    return ResampledReadings(
+        width=width,
+        aggregate=aggregate,
+        start=array("q", (origin + b * width for b in buckets)),
+        value=array("d", values),
+        coverage=array("q", map(coverage.__getitem__, buckets)),
+    )
+
+
+def resample_readings(batch: ReadingBatch, reading_type: ReadingType, width: int, origin: int = 0) -> ResampledReadings:
+    """Resamples the (raw) values of batch according to reading_type. Readings without a value or timePeriod are
+    ignored"""
+    selector = batch.none_mask.tobytes().translate(_USABLE_TABLE)
+    start, duration, value = batch.start, batch.duration, batch.value
+    if selector.count(0):
+        start = array("q", compress(start, selector))
+        duration = array("q", compress(duration, selector))
+        value = array("q", compress(value, selector))
+
+    return resample_intervals(
+        start,
+        duration,
+        value,
+        width,
+        accumulation_behaviour=reading_type.accumulationBehaviour,
+        data_qualifier=reading_type.dataQualifier,
+        origin=origin,
+    )
@@ -0,0 +1,476 @@
+"""Precompiled XML serialization for BaseXmlModelWithNS.
+
+pydantic-xml serializes a model by walking its serializer tree into an intermediate XmlElement tree, converting that to
+an lxml tree and then calling etree.tostring. For the small set of XML constructs used by the sep2 models (attributes,
+primitive elements, sub models and lists of either) we can instead flatten the serializer tree ONCE per class into an
+XmlSerializationPlan and write the encoded document directly. The output is byte for byte identical to
+BaseXmlModel.to_xml (with no additional tostring kwargs).
+
+Any model using a construct that isn't understood here (unions, wrapped elements, custom xml field serializers etc) will
+not have a plan and callers are expected to fall back to the pydantic-xml implementation."""
+
+import re
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional, Union
+
+import pydantic_core as pdc
+from pydantic import BaseModel
+from pydantic_xml.element.native import ElementT
+from pydantic_xml.serializers.factories import homogeneous, model, primitive
+from pydantic_xml.serializers.serializer import Serializer, encode_primitive
+from pydantic_xml.utils import QName
+
+if TYPE_CHECKING:
+    from pydantic_xml import BaseXmlModel
+
+# Step kinds for XmlSerializationPlan.steps
+STEP_ATTRIBUTE = 0
+STEP_ELEMENT = 1
+STEP_MODEL = 2
+STEP_LIST = 3
+
+DEFAULT_CHUNK_SIZE = 64 * 1024  # Approximate number of characters buffered per chunk by iter_list_xml_chunks
+
+# Characters that lxml will refuse to serialize (it raises ValueError on assignment)
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff￾￿]")
+
+
+def escape_text(v: str) -> str:
+    """Escapes element text in the same way as libxml2"""
+    if "&" in v:
+        v = v.replace("&", "&amp;")
+    if "<" in v:
+        v = v.replace("<", "&lt;")
+    if ">" in v:
+        v = v.replace(">", "&gt;")
+    if "\r" in v:
+        v = v.replace("\r", "&#13;")
+    return v
+
+
+def escape_attribute(v: str) -> str:
+    """Escapes an attribute value in the same way as libxml2"""
+    v = escape_text(v)
+    if '"' in v:
+        v = v.replace('"', "&quot;")
+    if "\n" in v:
+        v = v.replace("\n", "&#10;")
+    if "\t" in v:
+        v = v.replace("\t", "&#9;")
+    return v
+
+
+def encode_document(parts: list[str]) -> bytes:
+    """Joins rendered document parts into the final ASCII encoded document (non ASCII chars become char references)"""
+    doc = "".join(parts)
+    if _INVALID_XML_CHARS.search(doc):
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+    return doc.encode("ascii", "xmlcharrefreplace")
+
+
+class UnsupportedPlanError(Exception):
+    """Raised during compilation when a serializer can't be represented by a XmlSerializationPlan"""
+
+
+class XmlSerializationPlan:
+    """The flattened set of steps required to serialize a single model type. Each step is a tuple of the form
+    (kind, field_name, qualified_name, child) where child is the XmlSerializationPlan for STEP_MODEL or the inner step
+    for STEP_LIST"""
+
+    def __init__(
+        self,
+        model_type: type,
+        tag: str,
+        root_nsmap: dict[str, str],
+        steps: list[tuple],
+        excluded_fields: set[str],
+        skip_empty: Optional[bool],
+    ):
+        self.model_type = model_type
+        self.tag = tag
+        self.steps = steps
+        self.excluded_fields = excluded_fields
+        self.skip_empty = skip_empty
+
+        ns_decls = "".join(
+            f' xmlns="{escape_attribute(uri)}"' if not prefix else f' xmlns:{prefix}="{escape_attribute(uri)}"'
+            for prefix, uri in root_nsmap.items()
+        )
+        self.root_open = "<" + tag + ns_decls
+
+    def render(
+        self,
+        value: BaseModel,
+        *,
+        skip_empty: bool = False,
+        exclude_none: bool = False,
+        exclude_unset: bool = False,
+    ) -> bytes:
+        """Renders value (which must be an instance of model_type) as an encoded XML document"""
+        encoded = _encode(value)
+        parts: list[str] = []
+        self.render_root(parts, value, encoded, skip_empty, exclude_none, exclude_unset)
+        return encode_document(parts)
+
+    def render_root(
+        self,
+        parts: list[str],
+        value: BaseModel,
+        encoded: dict[str, Any],
+        skip_empty: bool,
+        exclude_none: bool,
+        exclude_unset: bool,
+    ) -> None:
+        """Appends the root element (including namespace declarations) for value to parts"""
+        attrs, children = self.render_content(value, encoded, skip_empty, exclude_none, exclude_unset)
+        self._append_root(parts, attrs, children)
+
+    def render_element(
+        self,
+        value: BaseModel,
+        tag: str,
+        *,
+        skip_empty: bool = False,
+        exclude_none: bool = False,
+        exclude_unset: bool = False,
+    ) -> bytes:
+        """Renders value as an encoded (non root) element named tag (without namespace declarations) suitable for
+        splicing into another document via render_spliced"""
+        children: list[str] = []
+        _render_child(
+            (STEP_MODEL, None, tag, self), children, value, _encode(value), skip_empty, exclude_none, exclude_unset
+        )
+        return encode_document(children)
+
+    def render_spliced(
+        self,
+        value: BaseModel,
+        spliced: dict[str, bytes],
+        *,
+        skip_empty: bool = False,
+        exclude_none: bool = False,
+        exclude_unset: bool = False,
+    ) -> bytes:
+        """Equivalent to render but each field in spliced is rendered as the (already encoded) element XML
+        spliced[field_name] rather than from value. Only element (not attribute) fields can be spliced"""
+        encoded = _encode(value)
+        attrs: dict[str, str] = {}
+        segments: list[list[str]] = []
+        start = 0
+        for idx, step in enumerate(self.steps):
+            if step[1] not in spliced:
+                continue
+            if step[0] == STEP_ATTRIBUTE:
+                raise ValueError(f"{step[1]} is an attribute and can't be spliced.")
+            segment_attrs, segment = self.render_content(
+                value, encoded, skip_empty, exclude_none, exclude_unset, steps=self.steps[start:idx]
+            )
+            attrs.update(segment_attrs)
+            segments.append(segment)
+            start = idx + 1
+        segment_attrs, segment = self.render_content(
+            value, encoded, skip_empty, exclude_none, exclude_unset, steps=self.steps[start:]
+        )
+        attrs.update(segment_attrs)
+        segments.append(segment)
+
+        spliced_xml = [spliced[step[1]] for step in self.steps if step[1] in spliced]
+        if not any(spliced_xml):
+            parts: list[str] = []
+            self._append_root(parts, attrs, [c for segment in segments for c in segment])
+            return encode_document(parts)
+
+        # Each segment is encoded separately so the spliced bytes never need to be rescanned/re-encoded
+        root = [self.root_open, *(f' {k}="{v}"' for k, v in attrs.items()), ">", *segments[0]]
+        encoded_parts = [encode_document(root)]
+        for xml, segment in zip(spliced_xml, segments[1:]):
+            encoded_parts.append(xml)
+            encoded_parts.append(encode_document(segment))
+        encoded_parts.append(f"</{self.tag}>".encode("ascii", "xmlcharrefreplace"))
+        return b"".join(encoded_parts)
+
+    def _append_root(self, parts: list[str], attrs: dict[str, str], children: list[str]) -> None:
+        parts.append(self.root_open)
+        parts.extend(f' {k}="{v}"' for k, v in attrs.items())
+        if children:
+            parts.append(">")
+            parts.extend(children)
+            parts.append(f"</{self.tag}>")
+        else:
+            parts.append("/>")
+
+    def render_content(
+        self,
+        value: BaseModel,
+        encoded: dict[str, Any],
+        skip_empty: bool,
+        exclude_none: bool,
+        exclude_unset: bool,
+        steps: Optional[list[tuple]] = None,
+    ) -> tuple[dict[str, str], list[str]]:
+        """Returns the (escaped) attributes and rendered child elements for value. steps can be used to only render a
+        subset of this plan's steps (defaults to all steps)"""
+        if self.skip_empty is not None:
+            skip_empty = self.skip_empty
+
+        attrs: dict[str, str] = {}
+        children: list[str] = []
+        fields_set = value.__pydantic_fields_set__
+        for step in self.steps if steps is None else steps:
+            field_name = step[1]
+            if field_name in self.excluded_fields:
+                continue
+            if exclude_unset and field_name not in fields_set:
+                continue
+
+            field_value = getattr(value, field_name)
+            if step[0] == STEP_ATTRIBUTE:
+                if field_value is None and (skip_empty or exclude_none):
+                    continue
+                attrs[step[2]] = escape_attribute(encode_primitive(encoded[field_name]))
+            elif step[0] == STEP_LIST:
+                if field_value is None or (skip_empty and len(field_value) == 0):
+                    continue
+                for item_value, item_encoded in zip(field_value, encoded[field_name]):
+                    if skip_empty and item_value is None:
+                        continue
+                    _render_child(step[3], children, item_value, item_encoded, skip_empty, exclude_none, exclude_unset)
+            else:
+                _render_child(step, children, field_value, encoded[field_name], skip_empty, exclude_none, exclude_unset)
+
+        return attrs, children
+
+
+def _render_child(
+    step: tuple,
+    children: list[str],
+    value: Any,
+    encoded: Any,
+    skip_empty: bool,
+    exclude_none: bool,
+    exclude_unset: bool,
+) -> None:
+    """Renders a single STEP_ELEMENT / STEP_MODEL step into children"""
+    if value is None and (skip_empty or exclude_none):
+        return
+
+    tag = step[2]
+    if step[0] == STEP_ELEMENT:
+        text = encode_primitive(encoded)
+        if skip_empty and not text:
+            return
+        children.append(f"<{tag}>{escape_text(text)}</{tag}>")
+        return
+
+    if value is None:
+        return
+
+    attrs, sub_children = step[3].render_content(value, encoded, skip_empty, exclude_none, exclude_unset)
+    if skip_empty and not attrs and not sub_children:
+        return
+
+    attr_str = "".join(f' {k}="{v}"' for k, v in attrs.items())
+    if sub_children:
+        children.append(f"<{tag}{attr_str}>{''.join(sub_children)}</{tag}>")
+    else:
+        children.append(f"<{tag}{attr_str}/>")
+
+
+def _prefixed_name(clark_name: str, prefixes: dict[str, str], is_attr: bool) -> str:
+    """Converts a {ns}tag clark name to its prefix:tag form using the (reversed) root nsmap"""
+    qname = QName.from_uri(clark_name)
+    if not qname.ns:
+        return qname.tag
+
+    prefix = prefixes.get(qname.ns, None)
+    if prefix is None or (is_attr and not prefix):
+        raise UnsupportedPlanError(f"Namespace {qname.ns} isn't declared on the root element")
+    return f"{prefix}:{qname.tag}" if prefix else qname.tag
+
+
+def _compile_step(field_name: str, serializer: Serializer, prefixes: dict[str, str]) -> tuple:
+    if isinstance(serializer, primitive.AttributeSerializer):
+        return (STEP_ATTRIBUTE, field_name, _prefixed_name(serializer.attr_name, prefixes, True), None)
+
+    if isinstance(serializer, primitive.ElementSerializer):
+        if serializer._nillable:
+            raise UnsupportedPlanError(f"{field_name} is nillable")
+        return (STEP_ELEMENT, field_name, _prefixed_name(serializer._element_name, prefixes, False), None)
+
+    if isinstance(serializer, model.ModelProxySerializer):
+        child_plan = get_plan(serializer.model)
+        if child_plan is None or serializer._nillable:
+            raise UnsupportedPlanError(f"{field_name} references a model without a serialization plan")
+        return (STEP_MODEL, field_name, _prefixed_name(serializer.element_name, prefixes, False), child_plan)
+
+    if isinstance(serializer, homogeneous.ElementSerializer):
+        inner = _compile_step(field_name, serializer._inner_serializer, prefixes)
+        if inner[0] not in (STEP_ELEMENT, STEP_MODEL):
+            raise UnsupportedPlanError(f"{field_name} is a list of unsupported items")
+        return (STEP_LIST, field_name, None, inner)
+
+    raise UnsupportedPlanError(f"{field_name} uses unsupported serializer {type(serializer).__name__}")
+
+
+def _has_custom_xml_serializers(model_type: type) -> bool:
+    for field_info in model_type.model_fields.values():  # type: ignore[attr-defined]
+        if any(type(m).__name__ == "XmlFieldSerializer" for m in field_info.metadata):
+            return True
+    return any(getattr(v, "__xml_field_serializer__", None) for v in vars(model_type).values())
+
+
+def ensure_xml_serializer(model_type: type["BaseXmlModel"]) -> None:
+    """Completes the schema (and XML serializer) build of model_type if it was deferred (pydantic defer_build)"""
+    if model_type.__xml_serializer__ is None and not model_type.__pydantic_complete__:
+        model_type.model_rebuild()
+
+
+def get_plan(model_type: type["BaseXmlModel"]) -> Optional[XmlSerializationPlan]:
+    """Returns the XmlSerializationPlan for model_type (completing any deferred build first) or None if unsupported"""
+    ensure_xml_serializer(model_type)
+    return getattr(model_type, "__xml_plan__", None)
+
+
+def compile_plan(model_type: type["BaseXmlModel"]) -> Optional[XmlSerializationPlan]:
+    """Attempts to compile a XmlSerializationPlan for model_type from its pydantic-xml serializer. Returns None if
+    model_type (or any of its child models) uses XML constructs that XmlSerializationPlan doesn't support"""
+    serializer = model_type.__xml_serializer__
+    if not isinstance(serializer, model.ModelSerializer) or not serializer.nsmap:
+        return None
+
+    if _has_custom_xml_serializers(model_type):
+        return None
+
+    prefixes = {uri: prefix for prefix, uri in serializer.nsmap.items()}
+    try:
+        tag = _prefixed_name(serializer.element_name, prefixes, False)
+        steps = [
+            _compile_step(field_name, field_serializer, prefixes)
+            for field_name, field_serializer in serializer.fields_serializers.items()
+        ]
+    except UnsupportedPlanError:
+        return None
+
+    return XmlSerializationPlan(
+        model_type=model_type,
+        tag=tag,
+        root_nsmap=dict(serializer.nsmap),
+        steps=steps,
+        excluded_fields=set(getattr(serializer, "_fields_serialization_exclude", set())),
+        skip_empty=model_type.__xml_skip_empty__,
+    )
+
+
+def to_xml_bytes(
+    entity: "BaseXmlModel", *, skip_empty: bool = False, exclude_none: bool = False, exclude_unset: bool = False
+) -> bytes:
+    """Serializes entity using its XmlSerializationPlan (if available) otherwise falls back to pydantic-xml to_xml"""
+    plan = get_plan(type(entity))
+    if plan is None:
+        xml: Union[str, bytes] = entity.to_xml(
+            skip_empty=skip_empty, exclude_none=exclude_none, exclude_unset=exclude_unset
+        )
+        return xml.encode() if isinstance(xml, str) else xml
+    return plan.render(entity, skip_empty=skip_empty, exclude_none=exclude_none, exclude_unset=exclude_unset)
+
+
+def _encode(entity: BaseModel) -> Any:
+    return pdc.to_jsonable_python(
+        entity,
+        by_alias=False,
+        fallback=lambda obj: obj if not isinstance(obj, ElementT) else None,  # Consistent with pydantic-xml
+    )
+
+
+def iter_list_xml_chunks(
+    list_type: type["BaseXmlModel"],
+    items: Iterable[BaseModel],
+    *,
+    list_field: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    skip_empty: bool = False,
+    exclude_none: bool = False,
+    exclude_unset: bool = False,
+    **header: Any,
+) -> Iterator[bytes]:
+    """Serializes a sep2 List resource (eg EndDeviceListResponse) as a series of encoded byte chunks without ever
+    holding the full list of child models (or the full document) in memory.
+
+    list_type: The list model type being serialized - it must have a serialization plan
+    items: The child models to encode in the list (consumed lazily)
+    list_field: The name of the list_type field that items will be encoded as. If None, the only list field on
+                list_type will be used.
+    chunk_size: Approximate number of characters to buffer before yielding a chunk (chunks always end on an element
+                boundary)
+    header: Values for all the other list_type fields (eg all_, results, pollRate, subscribable, href)
+
+    Concatenating the yielded chunks will produce identical output to serializing
+    list_type(**header, list_field=list(items)) with to_xml_bytes"""
+    plan = get_plan(list_type)
+    if plan is None:
+        raise ValueError(f"{list_type.__name__} doesn't have a serialization plan.")
+
+    list_steps = [(i, step) for i, step in enumerate(plan.steps) if step[0] == STEP_LIST]
+    if list_field is not None:
+        list_steps = [(i, step) for i, step in list_steps if step[1] == list_field]
+    if len(list_steps) != 1:
+        raise ValueError(f"Unable to identify a single list field on {list_type.__name__} (list_field={list_field}).")
+    list_idx, list_step = list_steps[0]
+    after_idx = list_idx + 1
+    if list_step[1] in header:
+        raise ValueError(f"{list_step[1]} will be populated from items and can't also be specified in header.")
+
+    header_entity = list_type(**header)
+    header_encoded = _encode(header_entity)
+    attrs, before = plan.render_content(
+        header_entity, header_encoded, skip_empty, exclude_none, exclude_unset, steps=plan.steps[:list_idx]
+    )
+    after_attrs, after = plan.render_content(
+        header_entity, header_encoded, skip_empty, exclude_none, exclude_unset, steps=plan.steps[after_idx:]
+    )
+    attrs.update(after_attrs)
+
+    # The root element can only be "opened" once we know whether it has any children
+    root_open = plan.root_open + "".join(f' {k}="{v}"' for k, v in attrs.items())
+    item_skip_empty = skip_empty if plan.skip_empty is None else plan.skip_empty
+    parts: list[str] = []
+    parts_len = 0
+    is_open = False
+
+    for children in _iter_children(before, list_step[3], items, item_skip_empty, exclude_none, exclude_unset, after):
+        if not is_open:
+            parts.append(root_open + ">")
+            is_open = True
+        parts.extend(children)
+        parts_len += sum(len(c) for c in children)
+        if parts_len >= chunk_size:
+            yield encode_document(parts)
+            parts = []
+            parts_len = 0
+
+    parts.append(f"</{plan.tag}>" if is_open else root_open + "/>")
+    yield encode_document(parts)
+
+
+def _iter_children(
+    before: list[str],
+    item_step: tuple,
+    items: Iterable[BaseModel],
+    skip_empty: bool,
+    exclude_none: bool,
+    exclude_unset: bool,
+    after: list[str],
+) -> Iterator[list[str]]:
+    """Yields the rendered child elements (in document order) for iter_list_xml_chunks. Empty lists are never yielded"""
+    if before:
+        yield before
+    for item in items:
+        if skip_empty and item is None:
+            continue
+        children: list[str] = []
+        _render_child(
+            item_step, children, item, None if item is None else _encode(item), skip_empty, exclude_none, exclude_unset
+        )
+        if children:
+            yield children
+    if after:
+        yield after
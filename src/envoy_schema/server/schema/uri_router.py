@@ -0,0 +1,181 @@
+"""Reverse matching of request paths (eg Subscription.subscribedResource) against the templates defined in uri.py
+
+The templates are compiled into a trie of path segments where each node has a dict of literal children and at most
+one parameter child. Matching is a single pass over the path segments (one dict lookup per segment) so it's
+independent of the number of templates:
+
+    default_router().match("/edev/12/derp/3/derc/99")
+    # UriMatch(name="DERControlUri", template="/edev/{site_id}/derp/{der_program_id}/derc/{derc_id}",
+    #          params={"site_id": 12, "der_program_id": 3, "derc_id": 99})
+
+Each path segment is percent-decoded (eg "13%3A05" -> "13:05") before it's matched, so a client that escapes the
+delimiters within a parameter value still routes to the same resource. Literal segments always take precedence over
+parameters (there is no backtracking). Parameters are coerced with
+a per parameter name converter (defaulting to a strict non negative integer parse) - if a converter raises a
+ValueError the path doesn't match. default_router uses DEFAULT_CONVERTERS for the uri.py parameters that aren't ids
+(eg the signed sep2_price of a ConsumptionTariffInterval)."""
+
+import re
+from datetime import date, time
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+from urllib.parse import unquote
+
+from envoy_schema.server.schema.uri_template import URI_TEMPLATES, UriTemplate
+
+Converter = Callable[[str], Any]
+
+
+_SIGNED_INT = re.compile(r"-?[0-9]+")
+_DATE = re.compile(r"([0-9]{4})-([0-9]{2})-([0-9]{2})")
+_TIME = re.compile(r"([0-9]{2}):([0-9]{2})")
+
+
+def parse_id(v: str) -> int:
+    """Strictly parses a non negative base 10 integer path parameter (no signs, whitespace or underscores)"""
+    if not (v.isascii() and v.isdigit()):
+        raise ValueError(f"'{v}' is not a valid id.")
+    return int(v)
+
+
+def parse_signed_int(v: str) -> int:
+    """Strictly parses a (possibly negative) base 10 integer path parameter (no "+", whitespace or underscores)"""
+    if not _SIGNED_INT.fullmatch(v):
+        raise ValueError(f"'{v}' is not a valid integer.")
+    return int(v)
+
+
+def parse_date(v: str) -> date:
+    """Strictly parses a YYYY-MM-DD path parameter (eg the rate_component_id of a RateComponent)"""
+    match = _DATE.fullmatch(v)
+    if not match:
+        raise ValueError(f"'{v}' is not a valid YYYY-MM-DD date.")
+    return date(*map(int, match.groups()))
+
+
+def parse_time(v: str) -> time:
+    """Strictly parses a HH:MM path parameter (eg the tti_id of a TimeTariffInterval)"""
+    match = _TIME.fullmatch(v)
+    if not match:
+        raise ValueError(f"'{v}' is not a valid HH:MM time.")
+    return time(int(match.group(1)), int(match.group(2)))
+
+
+# Converters for the uri.py parameters that aren't (non negative integer) ids. Pricing resources are identified by the
+# date the rate applies from (rate_component_id), the time of day the interval starts (tti_id) and the price itself
+# (sep2_price - which can be negative)
+DEFAULT_CONVERTERS: dict[str, Converter] = {
+    "rate_component_id": parse_date,
+    "tti_id": parse_time,
+    "sep2_price": parse_signed_int,
+}
+
+
+class UriMatch(NamedTuple):
+    """The result of matching a path against a UriRouter"""
+
+    name: Optional[str]  # The uri.py name of the matched template (eg DERControlUri) - None for non uri.py templates
+    template: str  # The matched template eg "/edev/{site_id}/derp/{der_program_id}/derc/{derc_id}"
+    params: dict[str, Any]  # The coerced parameter values (keyed by parameter name)
+
+
+class _Route(NamedTuple):
+    name: Optional[str]
+    template: str
+    param_names: tuple[str, ...]  # Parameter name for each parameter segment (in path order)
+    converters: tuple[Converter, ...]  # Converter for each parameter segment (in path order)
+
+
+class _Node:
+    __slots__ = ("literals", "param", "route")
+
+    def __init__(self) -> None:
+        self.literals: dict[str, _Node] = {}
+        self.param: Optional[_Node] = None
+        self.route: Optional[_Route] = None
+
+
+class UriRouter:
+    """Matches paths against a set of templates (where every parameter must be an entire path segment)"""
+
+    def __init__(
+        self,
+        templates: Iterable[UriTemplate],
+        converters: Optional[dict[str, Converter]] = None,
+        default_converter: Converter = parse_id,
+    ):
+        self._root = _Node()
+        for uri_template in templates:
+            if uri_template.template:  # Some uri.py templates are empty (not defined by sep2)
+                self.add(uri_template, converters, default_converter)
+
+    def add(
+        self,
+        uri_template: UriTemplate,
+        converters: Optional[dict[str, Converter]] = None,
+        default_converter: Converter = parse_id,
+    ) -> None:
+        """Adds uri_template to this router. Raises ValueError if the template can't be routed or if it would be
+        ambiguous with an existing template"""
+        node = self._root
+        param_names: list[str] = []
+        for segment in uri_template.template.split("/"):
+            parsed = list(Formatter().parse(segment))
+            fields = [(literal, name, spec) for literal, name, spec, _ in parsed if name is not None]
+            if not fields:
+                node = node.literals.setdefault("".join(literal for literal, _, _, _ in parsed), _Node())
+                continue
+
+            if len(parsed) != 1 or fields[0][0] or fields[0][2]:
+                raise ValueError(f"{uri_template.template} has a parameter that isn't an entire path segment.")
+            param_names.append(fields[0][1])
+            if node.param is None:
+                node.param = _Node()
+            node = node.param
+
+        if node.route is not None:
+            raise ValueError(f"{uri_template.template} is ambiguous with {node.route.template}.")
+        node.route = _Route(
+            name=uri_template.name,
+            template=uri_template.template,
+            param_names=tuple(param_names),
+            converters=tuple((converters or {}).get(name, default_converter) for name in param_names),
+        )
+
+    def match(self, path: str) -> Optional[UriMatch]:
+        """Matches path (any query string / fragment is ignored) returning None if there is no matching template. Every
+        segment of path is percent-decoded before it's compared / converted"""
+        for separator in ("?", "#"):
+            if separator in path:
+                path = path.split(separator, 1)[0]
+
+        node = self._root
+        raw_params: list[str] = []
+        for segment in path.split("/"):
+            if "%" in segment:
+                segment = unquote(segment)
+            next_node = node.literals.get(segment, None)
+            if next_node is None:
+                next_node = node.param
+                if next_node is None or not segment:
+                    return None
+                raw_params.append(segment)
+            node = next_node
+
+        route = node.route
+        if route is None:
+            return None
+
+        try:
+            params = {name: convert(v) for name, convert, v in zip(route.param_names, route.converters, raw_params)}
+        except ValueError:
+            return None
+        return UriMatch(name=route.name, template=route.template, params=params)
+
+
+@lru_cache(maxsize=None)
+def default_router() -> UriRouter:
+    """A (cached) UriRouter for every template in uri.py (parameters are parsed with DEFAULT_CONVERTERS falling back to
+    parse_id)"""
+    return UriRouter(URI_TEMPLATES.values(), converters=DEFAULT_CONVERTERS)
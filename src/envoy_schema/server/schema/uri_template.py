@@ -0,0 +1,123 @@
+"""Precompiled builders for the templates defined in uri.py
+
+Each template is split ONCE into its literal and slot (eg {site_id}) segments which are then compiled into a
+dedicated f-string builder function, so building a href no longer requires a str.format parse of the template.
+build_many is intended for list responses where every child href shares all but one parameter (eg every DERControl
+under a single DERProgram) - the shared prefix/suffix is only built once.
+
+    compile_uri(uri.DERControlUri).build(site_id=1, der_program_id=2, derc_id=3)  # "/edev/1/derp/2/derc/3"
+    compile_uri(uri.DERControlUri).build_many([3, 4], site_id=1, der_program_id=2)  # ["/edev/1/derp/2/derc/3", ...]
+
+The output is always identical to template.format(...)"""
+
+from functools import lru_cache
+from keyword import iskeyword
+from string import Formatter
+from typing import Any, Callable, Iterable, Optional
+
+from envoy_schema.server.schema import uri
+
+
+class UriTemplate:
+    """A uri.py template that has been split into literal and slot segments"""
+
+    def __init__(self, template: str, name: Optional[str] = None):
+        self.template = template
+        self.name = name
+
+        literals: list[str] = []  # literals[i] precedes slots[i] (with a trailing literal after the last slot)
+        slots: list[tuple[str, str]] = []  # (parameter name, format spec)
+        current_literal = ""
+        for literal, field_name, format_spec, conversion in Formatter().parse(template):
+            current_literal += literal
+            if field_name is None:
+                continue
+            if not field_name.isidentifier() or iskeyword(field_name) or conversion is not None:
+                raise ValueError(f"Template {template} uses an unsupported replacement field {{{field_name}}}.")
+            literals.append(current_literal)
+            slots.append((field_name, format_spec or ""))
+            current_literal = ""
+        literals.append(current_literal)
+
+        self.literals = literals
+        self.slots = slots
+        self.parameters = tuple(dict.fromkeys(name for name, _ in slots))  # Unique parameter names (in order)
+
+        # Equivalent to template.format(**params) (raising KeyError for any missing parameter)
+        self.build: Callable[..., str] = _compile_builder(literals, slots)
+
+    def __repr__(self) -> str:
+        return f"UriTemplate({self.template!r}, name={self.name!r})"
+
+    def build_many(self, values: Iterable[Any], param: Optional[str] = None, **params: Any) -> list[str]:
+        """Builds a href for each of values (in order) where values are used for param (defaulting to the last
+        parameter in the template) and all other parameters are shared. Equivalent to
+        [template.format(**params, param=v) for v in values]"""
+        if param is None:
+            if not self.slots:
+                raise ValueError(f"Template {self.template} has no parameters.")
+            param = self.slots[-1][0]
+        elif param not in self.parameters:
+            raise ValueError(f"Template {self.template} has no parameter {param}.")
+        if param in params:
+            raise ValueError(f"{param} will be populated from values and can't also be specified in params.")
+
+        slot_indexes = [idx for idx, (name, _) in enumerate(self.slots) if name == param]
+        if len(slot_indexes) != 1:
+            # Multiple slots for the same parameter are rare enough that it's not worth optimising
+            return [self.build(**params, **{param: v}) for v in values]
+
+        # Everything either side of the varying slot only needs to be built once
+        idx = slot_indexes[0]
+        after_idx = idx + 1
+        tail_idx = idx + 2
+        prefix = [self.literals[0]]
+        for (name, spec), literal in zip(self.slots[:idx], self.literals[1:after_idx]):
+            prefix.append(format(params[name], spec))
+            prefix.append(literal)
+        suffix = [self.literals[after_idx]]
+        for (name, spec), literal in zip(self.slots[after_idx:], self.literals[tail_idx:]):
+            suffix.append(format(params[name], spec))
+            suffix.append(literal)
+
+        head = "".join(prefix)
+        tail = "".join(suffix)
+        spec = self.slots[idx][1]
+        if spec:
+            return [f"{head}{format(v, spec)}{tail}" for v in values]
+        return [f"{head}{v}{tail}" for v in values]
+
+
+def _compile_builder(literals: list[str], slots: list[tuple[str, str]]) -> Callable[..., str]:
+    """Compiles a function (accepting the template parameters as kwargs) that returns a single f-string expression of
+    literals interleaved with slots. Literals are embedded via repr and parameter names are validated identifiers"""
+    namespace: dict[str, Any] = {}
+    expression = [repr(literals[0])]
+    for idx, ((name, spec), literal) in enumerate(zip(slots, literals[1:])):
+        if spec:
+            namespace[f"_spec{idx}"] = spec
+            expression.append(f'f"{{_p[{name!r}]:{{_spec{idx}}}}}"')
+        else:
+            expression.append(f'f"{{_p[{name!r}]}}"')
+        expression.append(repr(literal))
+
+    source = f"def build(**_p):\n    return ({' '.join(expression)})\n"
+    exec(compile(source, "<uri_template>", "exec"), namespace)  # nosec
+    return namespace["build"]
+
+
+# Every template from uri.py (keyed by its variable name eg "DERControlUri")
+URI_TEMPLATES: dict[str, UriTemplate] = {
+    name: UriTemplate(value, name)
+    for name, value in vars(uri).items()
+    if name.endswith("Uri") and isinstance(value, str)
+}
+
+
+@lru_cache(maxsize=None)
+def compile_uri(template: str) -> UriTemplate:
+    """Returns the (cached) UriTemplate for template (reusing the URI_TEMPLATES instance if it's from uri.py)"""
+    for uri_template in URI_TEMPLATES.values():
+        if uri_template.template == template:
+            return uri_template
+    return UriTemplate(template)
@@ -0,0 +1,324 @@
+"""Throughput/allocation benchmarks for every model in envoy_schema.server and envoy_schema.admin
+
+Models are discovered dynamically (in the same way as tests/unit/server/test_xsd_models.py) and populated using
+assertical. Every list field is then expanded to a range of sizes. For each model/list size combination the following
+operations are measured:
+
+    serialize - to_xml (XML models) or model_dump_json (JSON models)
+    parse     - from_xml (XML models) or model_validate_json (JSON models). Includes validation.
+    validate  - model_validate from a python dict (i.e. validation without any parsing)
+    roundtrip - serialize followed by parse
+
+XML models additionally measure serialize_plan (to_xml_bytes via the precompiled serialization plan).
+
+Results are written as JSON so that they can be compared between releases:
+
+    python -m tests.benchmark.benchmark_models --output bench_output.json
+    python -m tests.benchmark.benchmark_models --output new.json --compare bench_output.json
+"""
+
+import argparse
+import importlib
+import importlib.metadata
+import inspect
+import json
+import pkgutil
+import platform
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from itertools import product
+from typing import Annotated, Any, Callable, Iterable, Optional, TypeVar, get_args, get_origin
+
+from assertical.fake.generator import generate_class_instance, register_value_generator
+from assertical.fixtures.generator import generator_registry_snapshot
+from pydantic import AfterValidator, BaseModel
+from pydantic_xml import BaseXmlModel
+
+from envoy_schema.admin.schema.certificate import CertificateAssignmentRequest
+from envoy_schema.server.schema.sep2.base import BaseXmlModelWithNS
+from envoy_schema.server.schema.sep2.identification import Link, ListLink
+from envoy_schema.server.schema.sep2.primitive_types import validate_HttpUri, validate_LocalAbsoluteUri
+
+DEFAULT_PACKAGES = ["envoy_schema.server", "envoy_schema.admin"]
+DEFAULT_LIST_SIZES = [1, 10, 100]
+DEFAULT_MIN_SECONDS = 0.05  # Minimum time spent timing each individual operation
+DEFAULT_REGRESSION_THRESHOLD = 0.1  # Fractional slowdown in ops/sec before compare_results reports a regression
+
+OPERATIONS = ["serialize", "serialize_plan", "parse", "validate", "roundtrip"]
+
+# generate_class_instance kwargs for models whose (model) validators reject assertical's default values
+MODEL_OVERRIDES: dict[type[BaseModel], dict[str, Any]] = {
+    CertificateAssignmentRequest: {"lfdi": None},  # Only one of lfdi / certificate_id can be set
+}
+
+# Replacement values (by field validator) for str fields that must be in a specific format. The generic str generator
+# produces hex digits (for the many HexBinary fields) which these validators would reject
+FIELD_VALIDATOR_OVERRIDES: dict[Callable, Callable[[str], str]] = {
+    validate_LocalAbsoluteUri: lambda field_name: f"/{field_name}/1",
+    validate_HttpUri: lambda field_name: f"https://example.com/{field_name}",
+}
+
+
+def parametrize_generic(t: type[BaseModel]) -> list[type[BaseModel]]:
+    """Returns every concrete parametrization of a generic model (using each of its TypeVar's constraints or bound) or
+    just [t] if t isn't generic"""
+    parameters = t.__pydantic_generic_metadata__["parameters"]
+    if not parameters:
+        return [t]
+
+    def choices(p: TypeVar) -> tuple[Any, ...]:
+        return p.__constraints__ or (p.__bound__ or Any,)
+
+    return [t[args if len(args) > 1 else args[0]] for args in product(*map(choices, parameters))]  # type: ignore
+
+
+def import_all_models(package_name: str) -> list[type[BaseModel]]:
+    """Dynamically load all the pydantic models from the specified package AND sub modules. Unlike
+    import_all_classes_from_module (test_xsd_models) this isn't limited to XML models so that admin models are included.
+    Generic models are included once per concrete parametrization (see parametrize_generic)"""
+    models: list[type[BaseModel]] = []
+    package = importlib.import_module(package_name)
+    for _, module_name, _ in pkgutil.walk_packages(package.__path__, package_name + "."):
+        module = importlib.import_module(module_name)
+        for _, obj in inspect.getmembers(module, inspect.isclass):
+            if obj.__module__ == module_name and issubclass(obj, BaseModel) and obj is not BaseXmlModelWithNS:
+                models.extend(parametrize_generic(obj))
+    return models
+
+
+def _field_validators(annotation: Any, metadata: Iterable[Any]) -> Iterable[Callable]:
+    """Yields every AfterValidator function applied to a field (including those nested in Optional/Annotated)"""
+    for m in metadata:
+        if isinstance(m, AfterValidator):
+            yield m.func
+    if get_origin(annotation) is Annotated:
+        args = get_args(annotation)
+        yield from _field_validators(args[0], args[1:])
+    else:
+        for arg in get_args(annotation):
+            yield from _field_validators(arg, ())
+
+
+def apply_field_overrides(entity: Any) -> Any:
+    """Replaces (in place) the value of every field in entity (and any child models) that has a validator in
+    FIELD_VALIDATOR_OVERRIDES"""
+    if isinstance(entity, list):
+        for item in entity:
+            apply_field_overrides(item)
+    if not isinstance(entity, BaseModel):
+        return entity
+
+    for field_name, field_info in type(entity).model_fields.items():
+        value = getattr(entity, field_name)
+        if value is None:
+            continue
+        overrides = [
+            FIELD_VALIDATOR_OVERRIDES[v]
+            for v in _field_validators(field_info.annotation, field_info.metadata)
+            if v in FIELD_VALIDATOR_OVERRIDES
+        ]
+        if overrides:
+            setattr(entity, field_name, overrides[0](field_name))
+        else:
+            apply_field_overrides(value)
+    return entity
+
+
+def _generate_value(annotation: Any) -> Any:
+    """Generates a model (or list of models) for a single field annotation"""
+    if get_origin(annotation) is list:
+        return [_generate_value(get_args(annotation)[0])]
+    return generate_class_instance(annotation, optional_is_none=False, generate_relationships=True)
+
+
+def generic_field_overrides(t: type[BaseModel]) -> dict[str, Any]:
+    """assertical reads the annotations of the generic origin (eg list[~ArchiveType]) rather than the concrete
+    parametrization - this generates values for any field whose type is decided by the parametrization"""
+    origin = t.__pydantic_generic_metadata__["origin"]
+    if origin is None:
+        return {}
+    return {
+        name: _generate_value(field_info.annotation)
+        for name, field_info in t.model_fields.items()
+        if field_info.annotation != origin.model_fields[name].annotation
+    }
+
+
+def generate_instance(t: type[BaseModel], list_size: int) -> BaseModel:
+    """Generates a (valid) instance of t with every (top level) list field expanded to list_size items"""
+    entity = generate_class_instance(
+        t,
+        optional_is_none=False,
+        generate_relationships=True,
+        **generic_field_overrides(t),
+        **MODEL_OVERRIDES.get(t, {}),
+    )
+    apply_field_overrides(entity)
+    for field_name in type(entity).model_fields:
+        value = getattr(entity, field_name)
+        if isinstance(value, list) and value:
+            setattr(entity, field_name, [value[i % len(value)] for i in range(list_size)])
+    return entity
+
+
+def build_operations(entity: BaseModel) -> dict[str, Callable[[], Any]]:
+    """Returns the callable for each measured operation against entity (keyed by operation name)"""
+    t = type(entity)
+    as_dict = entity.model_dump()
+    if isinstance(entity, BaseXmlModel):
+        xml_kwargs = {"skip_empty": False, "exclude_none": True, "exclude_unset": True}
+        raw_xml = entity.to_xml(**xml_kwargs)
+        ops: dict[str, Callable[[], Any]] = {
+            "serialize": lambda: entity.to_xml(**xml_kwargs),
+            "parse": lambda: t.from_xml(raw_xml),  # type: ignore[attr-defined]
+            "validate": lambda: t.model_validate(as_dict),
+            "roundtrip": lambda: t.from_xml(entity.to_xml(**xml_kwargs)),  # type: ignore[attr-defined]
+        }
+        if isinstance(entity, BaseXmlModelWithNS):
+            ops["serialize_plan"] = lambda: entity.to_xml_bytes(**xml_kwargs)
+        return ops
+
+    raw_json = entity.model_dump_json()
+    return {
+        "serialize": lambda: entity.model_dump_json(),
+        "parse": lambda: t.model_validate_json(raw_json),
+        "validate": lambda: t.model_validate(as_dict),
+        "roundtrip": lambda: t.model_validate_json(entity.model_dump_json()),
+    }
+
+
+def measure(func: Callable[[], Any], min_seconds: float) -> dict[str, Any]:
+    """Times func (for at least min_seconds) and then measures the allocations of a single call"""
+    func()  # Warm up (and surface any errors before timing)
+
+    timer = timeit.Timer(func)
+    number = 1
+    while (elapsed := timer.timeit(number)) < min_seconds:
+        number *= 2
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": number,
+        "mean_seconds": elapsed / number,
+        "ops_per_sec": number / elapsed,
+        "peak_alloc_bytes": peak - before,
+    }
+
+
+def run_benchmarks(
+    models: Iterable[type[BaseModel]],
+    list_sizes: Iterable[int] = DEFAULT_LIST_SIZES,
+    operations: Iterable[str] = OPERATIONS,
+    min_seconds: float = DEFAULT_MIN_SECONDS,
+) -> list[dict[str, Any]]:
+    """Runs every operation against every model at every list size. Failures (eg a generated model that can't be
+    parsed back) are recorded against the result rather than raised"""
+    results: list[dict[str, Any]] = []
+    with generator_registry_snapshot():
+        # The same registrations as the XSD tests - these ensure that generated XML models can be parsed back
+        register_value_generator(int, lambda x: x % 64)
+        register_value_generator(str, lambda x: f"{x % 256:02x}")
+        register_value_generator(Link, lambda seed: Link(type=None, href=f"/link/{seed}"))
+        register_value_generator(ListLink, lambda seed: ListLink(type=None, href=f"/listlink/{seed}"))
+
+        for t in models:
+            for list_size in list_sizes:
+                key = {"model": f"{t.__module__}.{t.__name__}", "list_size": list_size}
+                try:
+                    ops = build_operations(generate_instance(t, list_size))
+                except Exception as exc:
+                    results.append({**key, "operation": None, "error": repr(exc)})
+                    continue
+
+                for op_name in operations:
+                    if op_name not in ops:
+                        continue
+                    try:
+                        results.append({**key, "operation": op_name, **measure(ops[op_name], min_seconds)})
+                    except Exception as exc:
+                        results.append({**key, "operation": op_name, "error": repr(exc)})
+    return results
+
+
+def build_report(results: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "envoy_schema_version": importlib.metadata.version("envoy_schema"),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "created_time": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+
+
+def compare_results(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float = DEFAULT_REGRESSION_THRESHOLD
+) -> list[str]:
+    """Returns a human readable line for every successful result in baseline that has regressed in current. A result
+    regresses if its ops_per_sec has dropped by more than threshold (as a fraction) or if the same
+    model/operation/list_size is missing from (or failed in) current"""
+
+    def _key(r: dict[str, Any]) -> tuple:
+        return (r["model"], r["operation"], r["list_size"])
+
+    current_by_key = {_key(r): r for r in current["results"]}
+    regressions: list[str] = []
+    for old in baseline["results"]:
+        if "ops_per_sec" not in old:
+            continue
+        name = f"{old['model']} {old['operation']} (list_size={old['list_size']})"
+        r = current_by_key.get(_key(old), None)
+        if r is None:
+            failed = current_by_key.get((old["model"], None, old["list_size"]), None)  # Model couldn't be generated
+            regressions.append(f"{name}: missing" + (f" ({failed['error']})" if failed else ""))
+        elif "ops_per_sec" not in r:
+            regressions.append(f"{name}: now fails with {r.get('error', 'no result')}")
+        else:
+            change = (r["ops_per_sec"] - old["ops_per_sec"]) / old["ops_per_sec"]
+            if change < -threshold:
+                regressions.append(
+                    f"{name}: {old['ops_per_sec']:.1f} -> {r['ops_per_sec']:.1f} ops/sec ({change:+.1%})"
+                )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_output.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", default=None, help="A previous JSON results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+    parser.add_argument("--list-sizes", type=int, nargs="+", default=DEFAULT_LIST_SIZES)
+    parser.add_argument("--min-seconds", type=float, default=DEFAULT_MIN_SECONDS)
+    parser.add_argument("--packages", nargs="+", default=DEFAULT_PACKAGES)
+    parser.add_argument("--filter", default=None, help="Only benchmark models whose qualified name contains this")
+    args = parser.parse_args(argv)
+
+    models = [m for p in args.packages for m in import_all_models(p)]
+    if args.filter:
+        models = [m for m in models if args.filter in f"{m.__module__}.{m.__name__}"]
+
+    report = build_report(run_benchmarks(models, args.list_sizes, OPERATIONS, args.min_seconds))
+    with open(args.output, "w") as fp:
+        json.dump(report, fp, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as fp:
+            regressions = compare_results(json.load(fp), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import pytest
+
+from envoy_schema.admin.schema.archive import ArchivePageResponse, ArchiveSiteResponse
+from envoy_schema.admin.schema.certificate import CertificateAssignmentRequest
+from envoy_schema.admin.schema.site import SiteResponse
+from envoy_schema.server.schema.sep2.der import DERControlListResponse
+from envoy_schema.server.schema.sep2.pub_sub import Subscription
+from tests.benchmark.benchmark_models import (
+    DEFAULT_PACKAGES,
+    OPERATIONS,
+    compare_results,
+    generate_instance,
+    import_all_models,
+    run_benchmarks,
+)
+
+
+def test_import_all_models():
+    models = import_all_models("envoy_schema.admin")
+    assert SiteResponse in models
+    assert DERControlListResponse in import_all_models("envoy_schema.server")
+
+    # Generic models are replaced with each of their concrete parametrizations
+    assert ArchivePageResponse not in models
+    assert ArchivePageResponse[ArchiveSiteResponse] in models
+    assert len([m for m in models if m.__name__.startswith("ArchivePageResponse[")]) == 3
+
+
+def test_run_benchmarks():
+    """Smoke test the harness with a tiny timing budget so it doesn't bit rot"""
+    results = run_benchmarks([SiteResponse, DERControlListResponse], list_sizes=[1, 3], min_seconds=0.0001)
+
+    assert all("error" not in r for r in results), [r for r in results if "error" in r]
+    xml_ops = {r["operation"] for r in results if r["model"].endswith("DERControlListResponse")}
+    json_ops = {r["operation"] for r in results if r["model"].endswith("SiteResponse")}
+    assert xml_ops == {"serialize", "serialize_plan", "parse", "validate", "roundtrip"}
+    assert json_ops == {"serialize", "parse", "validate", "roundtrip"}
+    assert all(r["ops_per_sec"] > 0 and r["peak_alloc_bytes"] >= 0 for r in results)
+
+
+def test_run_benchmarks_all_models():
+    """Every model must generate and complete every operation - otherwise it silently drops out of the benchmarks"""
+    models = [m for package in DEFAULT_PACKAGES for m in import_all_models(package)]
+    results = run_benchmarks(models, list_sizes=[1], min_seconds=0)
+
+    assert [r for r in results if "error" in r] == []
+    assert {r["model"] for r in results} == {f"{m.__module__}.{m.__name__}" for m in models}
+    assert all(r["operation"] in OPERATIONS for r in results)
+
+
+def test_generate_instance_overrides():
+    subscription = generate_instance(Subscription, 1)
+    assert subscription.subscribedResource.startswith("/")
+    assert subscription.notificationURI.startswith("https://")
+
+    assignment = generate_instance(CertificateAssignmentRequest, 1)
+    assert assignment.lfdi is None and assignment.certificate_id is not None
+
+    page = generate_instance(ArchivePageResponse[ArchiveSiteResponse], 3)
+    assert len(page.entities) == 3 and all(isinstance(e, ArchiveSiteResponse) for e in page.entities)
+
+
+def _row(model: str = "m", operation: str = "parse", **kwargs) -> dict:
+    return {"model": model, "operation": operation, "list_size": 1, **kwargs}
+
+
+@pytest.mark.parametrize(
+    "current, expected_regression",
+    [
+        ([_row(ops_per_sec=95.0)], None),
+        ([_row(ops_per_sec=150.0)], None),
+        ([_row(ops_per_sec=50.0)], "100.0 -> 50.0 ops/sec (-50.0%)"),
+        ([_row(error="ValueError()")], "now fails with ValueError()"),
+        ([], "missing"),
+        ([_row(operation="serialize", ops_per_sec=100.0)], "missing"),
+        ([_row(operation=None, error="TypeError('bad')")], "missing (TypeError('bad'))"),
+    ],
+)
+def test_compare_results(current: list[dict], expected_regression):
+    baseline = {"results": [_row(ops_per_sec=100.0), _row(model="failing", error="ValueError()")]}
+
+    regressions = compare_results(baseline, {"results": current}, threshold=0.1)
+    if expected_regression is None:
+        assert regressions == []
+    else:
+        assert len(regressions) == 1
+        assert regressions[0].startswith("m parse (list_size=1): ")
+        assert regressions[0].endswith(expected_regression)
+
+
+def test_compare_results_new_failures_only():
+    """Rows that were already failing in the baseline (or are new in current) aren't regressions"""
+    baseline = {"results": [_row(error="ValueError()")]}
+    current = {"results": [_row(error="ValueError()"), _row(model="new", error="ValueError()")]}
+    assert compare_results(baseline, current) == []
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from envoy_schema.admin.schema.billing import (
+    BillingReading,
+    BillingTariffRate,
+    CalculationLogBillingResponse,
+    SiteBillingResponse,
+)
+from envoy_schema.admin.schema.billing_calculator import calculate_billing, price_readings
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def reading(site_id: int, minutes: int, value: str, duration: int = 300) -> BillingReading:
+    return BillingReading(
+        site_id=site_id, period_start=T0 + timedelta(minutes=minutes), duration_seconds=duration, value=Decimal(value)
+    )
+
+
+def tariff(site_id: int, minutes: int, duration: int, import_price: str, export_price: str) -> BillingTariffRate:
+    return BillingTariffRate(
+        site_id=site_id,
+        period_start=T0 + timedelta(minutes=minutes),
+        duration_seconds=duration,
+        import_active_price=Decimal(import_price),
+        export_active_price=Decimal(export_price),
+        import_reactive_price=Decimal(import_price) / 10,
+        export_reactive_price=Decimal(export_price) / 10,
+    )
+
+
+TARIFFS = [
+    tariff(1, 0, 1800, "0.30", "0.05"),
+    tariff(1, 30, 1800, "0.50", "0.10"),
+    tariff(3, 0, 3600, "0.20", "0.01"),
+]
+
+
+def test_price_readings():
+    readings = [
+        reading(1, 0, "1000"),
+        reading(1, 25, "-2000"),
+        reading(1, 30, "500"),
+        reading(1, 60, "100"),  # After the last site 1 tariff
+        reading(2, 0, "100"),  # No site 2 tariffs
+        reading(3, 10, "-100"),
+    ]
+    costs, unpriced = price_readings(readings, TARIFFS)
+    assert [(c.site_id, c.price, c.cost) for c in costs] == [
+        (1, Decimal("0.30"), Decimal("0.30")),
+        (1, Decimal("0.05"), Decimal("-0.10")),
+        (1, Decimal("0.50"), Decimal("0.25")),
+        (3, Decimal("0.01"), Decimal("-0.001")),
+    ]
+    assert unpriced == [readings[3], readings[4]]
+
+    assert price_readings([], TARIFFS) == ([], [])
+    assert price_readings(readings, []) == ([], readings)
+
+
+def test_price_readings_unordered():
+    with pytest.raises(ValueError, match="readings"):
+        price_readings([reading(2, 0, "1"), reading(1, 0, "1")], TARIFFS)
+    with pytest.raises(ValueError, match="tariffs"):
+        price_readings([], list(reversed(TARIFFS)))
+
+
+def test_calculate_billing():
+    response = SiteBillingResponse(
+        tariff_id=7,
+        site_ids=[1, 2, 3],
+        period_start=T0,
+        period_end=T0 + timedelta(hours=1),
+        wh_readings=[reading(1, 0, "1000"), reading(1, 30, "-1000"), reading(3, 0, "2000")],
+        varh_readings=[reading(1, 0, "100"), reading(2, 0, "5")],
+        watt_readings=[],
+        active_tariffs=TARIFFS,
+        active_does=[],
+    )
+    result = calculate_billing(response)
+    assert result.tariff_id == 7
+    assert len(result.active_costs) == 3
+    assert [c.cost for c in result.reactive_costs] == [Decimal("0.003")]
+    assert result.unpriced_readings == [response.varh_readings[1]]
+
+    assert [s.site_id for s in result.sites] == [1, 2, 3]
+    site_1, site_2, site_3 = result.sites
+    assert site_1.import_active_wh == Decimal(1000) and site_1.export_active_wh == Decimal(1000)
+    assert site_1.import_active_cost == Decimal("0.3") and site_1.export_active_cost == Decimal("-0.1")
+    assert site_1.import_reactive_varh == Decimal(100) and site_1.import_reactive_cost == Decimal("0.003")
+    assert site_1.total_cost == Decimal("0.203")
+    assert site_2.total_cost == Decimal(0) and site_2.unpriced_readings == 1
+    assert site_3.total_cost == Decimal("0.4")
+    assert result.total_cost == Decimal("0.603")
+
+    empty = calculate_billing(
+        CalculationLogBillingResponse(
+            tariff_id=1,
+            calculation_log_id=2,
+            wh_readings=[],
+            varh_readings=[],
+            watt_readings=[],
+            active_tariffs=[],
+            active_does=[],
+        )
+    )
+    assert empty.sites == [] and empty.total_cost == Decimal(0)
+
+
+def test_calculate_billing_large():
+    n_sites, n_intervals = 100, 288
+    tariffs = [tariff(s, h * 60, 3600, "0.25", "0.05") for s in range(n_sites) for h in range(24)]
+    readings = [reading(s, i * 5, "10") for s in range(n_sites) for i in range(n_intervals)]
+    costs, unpriced = price_readings(readings, tariffs)
+    assert len(costs) == n_sites * n_intervals and unpriced == []
+    assert sum(c.cost for c in costs) == Decimal("0.0025") * n_sites * n_intervals
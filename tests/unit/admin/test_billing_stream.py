@@ -0,0 +1,170 @@
+import mmap
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from envoy_schema.admin.schema.billing import (
+    MAX_SITE_IDS_IN_REQUEST,
+    BillingDoe,
+    BillingReading,
+    BillingTariffRate,
+    SiteBillingResponse,
+)
+from envoy_schema.admin.schema.billing_stream import (
+    SiteBillingResponseBuilder,
+    SiteBillingResponseReader,
+    SiteBillingSlice,
+    site_billing_requests,
+)
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_response(site_ids: list[int], intervals: int = 3) -> SiteBillingResponse:
+    def readings(scale: int) -> list[BillingReading]:
+        return [
+            BillingReading(
+                site_id=s,
+                period_start=T0 + timedelta(minutes=5 * i),
+                duration_seconds=300,
+                value=Decimal(f"{scale * s}.{i}5"),
+            )
+            for s in site_ids
+            for i in range(intervals)
+        ]
+
+    return SiteBillingResponse(
+        tariff_id=4,
+        site_ids=site_ids,
+        period_start=T0,
+        period_end=T0 + timedelta(days=1),
+        varh_readings=readings(-1),
+        wh_readings=readings(10),
+        watt_readings=[r for r in readings(100) if r.site_id % 2 == 0],
+        active_tariffs=[
+            BillingTariffRate(
+                site_id=s,
+                period_start=T0,
+                duration_seconds=86400,
+                import_active_price=Decimal("0.2500"),
+                export_active_price=Decimal("0.05"),
+                import_reactive_price=0,
+                export_reactive_price=0,
+            )
+            for s in site_ids
+        ],
+        active_does=[
+            BillingDoe(
+                site_id=s, period_start=T0, duration_seconds=300, import_limit_active_watts=1, export_limit_watts=2
+            )
+            for s in site_ids
+            if s != 3
+        ],
+    )
+
+
+def test_site_billing_requests():
+    site_ids = list(range(250))
+    requests = list(site_billing_requests(site_ids, T0, T0 + timedelta(days=1), 7))
+    assert [len(r.site_ids) for r in requests] == [MAX_SITE_IDS_IN_REQUEST, MAX_SITE_IDS_IN_REQUEST, 50]
+    assert [s for r in requests for s in r.site_ids] == site_ids
+    assert all(r.tariff_id == 7 for r in requests)
+
+    assert [r.site_ids for r in site_billing_requests([1, 2, 3], T0, T0, 1, sites_per_request=2)] == [[1, 2], [3]]
+    assert list(site_billing_requests([], T0, T0, 1)) == []
+    with pytest.raises(ValueError):
+        list(site_billing_requests([1], T0, T0, 1, sites_per_request=MAX_SITE_IDS_IN_REQUEST + 1))
+
+
+def test_builder_matches_model_dump():
+    site_ids = [1, 2, 3, 4, 5]
+    expected = make_response(site_ids)
+    with SiteBillingResponseBuilder(4, site_ids, T0, T0 + timedelta(days=1), spool_bytes=256) as builder:
+        builder.add(make_response([1, 2]))
+        builder.add(make_response([3]))
+        builder.add(make_response([4, 5]))
+        assert builder.to_json() == expected.model_dump_json().encode()
+        assert b"".join(builder.iter_json(read_size=7)) == expected.model_dump_json().encode()
+
+    empty = SiteBillingResponseBuilder(4, [], T0, T0 + timedelta(days=1))
+    assert empty.to_json() == make_response([]).model_dump_json().encode()
+
+
+def test_builder_out_of_order():
+    builder = SiteBillingResponseBuilder(4, [1, 2], T0, T0)
+    builder.add(make_response([2]))
+    with pytest.raises(ValueError, match="site_id 1"):
+        builder.add(make_response([1]))
+    builder.close()
+
+
+def test_reader():
+    response = make_response([1, 2, 3, 4])
+    reader = SiteBillingResponseReader(response.model_dump_json(indent=2).encode())
+    assert reader.response == response.model_copy(
+        update={"varh_readings": [], "wh_readings": [], "watt_readings": [], "active_tariffs": [], "active_does": []}
+    )
+    assert reader.site_ids() == [1, 2, 3, 4]
+
+    slices = list(reader)
+    assert [s.site_id for s in slices] == [1, 2, 3, 4]
+    for name in ["varh_readings", "wh_readings", "watt_readings", "active_tariffs", "active_does"]:
+        assert [item for s in slices for item in getattr(s, name)] == getattr(response, name)
+
+    assert slices[2].active_does == []
+    assert slices[0].watt_readings == []
+    assert reader.site_slice(99) == SiteBillingSlice(99, [], [], [], [], [])
+
+
+def test_reader_mmap(tmp_path: Path):
+    response = make_response(list(range(20)), intervals=12)
+    path = tmp_path / "billing.json"
+    with SiteBillingResponseBuilder(4, response.site_ids, T0, T0 + timedelta(days=1)) as builder:
+        builder.add(make_response(list(range(10)), intervals=12))
+        builder.add(make_response(list(range(10, 20)), intervals=12))
+        with open(path, "wb") as f:
+            for data in builder.iter_json():
+                f.write(data)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        reader = SiteBillingResponseReader(mapped)
+        assert reader.site_slice(13).wh_readings == [r for r in response.wh_readings if r.site_id == 13]
+        assert sum(len(s.varh_readings) for s in reader) == len(response.varh_readings)
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"{}",
+        b"not json",
+        make_response([1]).model_dump_json().replace('"tariff_id":4', '"tariff_id":"a"').encode(),
+        make_response([1, 2]).model_dump_json().replace('"site_id":2', '"site_id":0').encode(),
+        make_response([1]).model_dump_json().replace('"site_id":1,', "").encode(),
+        make_response([1]).model_dump_json().replace('"active_does"', '"wh_readings"').encode(),
+    ],
+)
+def test_reader_invalid(raw: bytes):
+    with pytest.raises(ValueError):
+        SiteBillingResponseReader(raw)
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        ('"varh_readings":[', '"varh_readings":[garbage '),
+        ('},{"site_id"', '} {"site_id"'),
+        ('},{"site_id"', '},,{"site_id"'),
+        ('}],"wh_readings"', '},],"wh_readings"'),
+        ('}],"wh_readings"', '} garbage ],"wh_readings"'),
+        ('"active_does":[]', '"active_does":[1]'),
+    ],
+)
+def test_reader_malformed_list(old: str, new: str):
+    """Content between (or around) list items that isn't a single separating comma should be rejected"""
+    raw = make_response([1, 2]).model_copy(update={"active_does": []}).model_dump_json()
+    assert old in raw
+    SiteBillingResponseReader(raw.encode())  # Sanity check the unmodified document
+    with pytest.raises(ValueError, match="unexpected content"):
+        SiteBillingResponseReader(raw.replace(old, new, 1).encode())
@@ -0,0 +1,182 @@
+import importlib.util
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from envoy_schema.admin.schema.billing import (
+    AggregatorBillingResponse,
+    BillingDoe,
+    BillingReading,
+    BillingTariffRate,
+)
+from envoy_schema.admin.schema.columnar import (
+    BILLING_TABLE_FIELDS,
+    ColumnarTable,
+    billing_tables,
+    calculation_log_list_tables,
+    calculation_log_tables,
+    to_arrow_table,
+    write_parquet,
+)
+from envoy_schema.admin.schema.log import (
+    CalculationLogLabelMetadata,
+    CalculationLogLabelValues,
+    CalculationLogListResponse,
+    CalculationLogResponse,
+    CalculationLogVariableMetadata,
+    CalculationLogVariableValues,
+)
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+AEST = timezone(timedelta(hours=10))
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_log(calculation_log_id: int, with_values: bool) -> CalculationLogResponse:
+    return CalculationLogResponse(
+        calculation_log_id=calculation_log_id,
+        created_time=T0,
+        calculation_range_start=T0,
+        calculation_range_duration_seconds=3600,
+        interval_width_seconds=300,
+        description=f"log {calculation_log_id}",
+        variable_metadata=[CalculationLogVariableMetadata(variable_id=1, name="v", description="var")],
+        variable_values=(
+            CalculationLogVariableValues(
+                variable_ids=[1, 1], site_ids=[None, 2], interval_periods=[0, 1], values=[1.5, -2.0]
+            )
+            if with_values
+            else None
+        ),
+        label_metadata=[CalculationLogLabelMetadata(label_id=3, name="l", description="label")],
+        label_values=CalculationLogLabelValues(label_ids=[3], site_ids=[2], values=["x"]) if with_values else None,
+    )
+
+
+BILLING = AggregatorBillingResponse(
+    tariff_id=5,
+    aggregator_id=6,
+    aggregator_name="agg",
+    period_start=T0,
+    period_end=T0 + timedelta(days=1),
+    varh_readings=[],
+    wh_readings=[
+        BillingReading(site_id=1, period_start=T0, duration_seconds=300, value=Decimal("1.25")),
+        BillingReading(site_id=2, period_start=datetime(2024, 1, 1, 10, tzinfo=AEST), duration_seconds=300, value=-3),
+    ],
+    watt_readings=[],
+    active_tariffs=[
+        BillingTariffRate(
+            site_id=1,
+            period_start=T0,
+            duration_seconds=3600,
+            import_active_price=Decimal("0.1234"),
+            export_active_price=Decimal("-0.01"),
+            import_reactive_price=0,
+            export_reactive_price=0,
+        )
+    ],
+    active_does=[
+        BillingDoe(
+            site_id=1, period_start=T0, duration_seconds=300, import_limit_active_watts=5000, export_limit_watts=1500
+        )
+    ],
+)
+
+
+def assert_consistent(table: ColumnarTable):
+    assert list(table.columns) == [f.name for f in table.schema]
+    assert len({len(c) for c in table.columns.values()}) == 1
+
+
+def test_calculation_log_tables():
+    tables = calculation_log_tables([make_log(11, True), make_log(12, False), make_log(13, True)])
+    assert list(tables) == [
+        "calculation_logs",
+        "variable_metadata",
+        "variable_values",
+        "label_metadata",
+        "label_values",
+    ]
+    for table in tables.values():
+        assert_consistent(table)
+
+    assert tables["calculation_logs"].columns["calculation_log_id"] == [11, 12, 13]
+    assert tables["calculation_logs"].columns["description"] == ["log 11", "log 12", "log 13"]
+    assert tables["calculation_logs"].columns["topology_id"] == [None, None, None]
+    assert tables["variable_metadata"].columns["calculation_log_id"] == [11, 12, 13]
+    assert tables["variable_values"].columns == {
+        "calculation_log_id": [11, 11, 13, 13],
+        "variable_id": [1, 1, 1, 1],
+        "site_id": [None, 2, None, 2],
+        "interval_period": [0, 1, 0, 1],
+        "value": [1.5, -2.0, 1.5, -2.0],
+    }
+    assert tables["label_values"].columns["calculation_log_id"] == [11, 13]
+    assert len(tables["label_values"]) == 2
+
+    empty = calculation_log_tables([])
+    assert all(len(t) == 0 for t in empty.values())
+    for table in empty.values():
+        assert list(table.columns) == [f.name for f in table.schema]
+
+
+def test_calculation_log_list_tables():
+    response = CalculationLogListResponse(
+        start=0, limit=10, total_calculation_logs=1, calculation_logs=[make_log(1, True)]
+    )
+    tables = calculation_log_list_tables(response)
+    assert tables["calculation_logs"].metadata == {"start": "0", "limit": "10", "total_calculation_logs": "1"}
+    assert tables["variable_values"].metadata == {}
+
+
+def test_billing_tables():
+    tables = billing_tables(BILLING)
+    assert list(tables) == list(BILLING_TABLE_FIELDS)
+    for table in tables.values():
+        assert_consistent(table)
+        assert json.loads(table.metadata["tariff_id"]) == 5
+        assert json.loads(table.metadata["aggregator_name"]) == "agg"
+        assert set(table.metadata) == {"tariff_id", "aggregator_id", "aggregator_name", "period_start", "period_end"}
+
+    assert tables["wh_readings"].columns["value"] == [Decimal("1.25"), Decimal("-3")]
+    assert tables["wh_readings"].columns["site_id"] == [1, 2]
+    assert tables["varh_readings"].columns == {"site_id": [], "period_start": [], "duration_seconds": [], "value": []}
+    assert tables["active_does"].columns["export_limit_watts"] == [Decimal(1500)]
+
+
+@pytest.mark.skipif(HAS_PYARROW, reason="pyarrow is installed")
+def test_arrow_requires_pyarrow(tmp_path: Path):
+    with pytest.raises(ImportError, match="pyarrow"):
+        to_arrow_table(billing_tables(BILLING)["wh_readings"])
+    with pytest.raises(ImportError, match="pyarrow"):
+        write_parquet(billing_tables(BILLING), tmp_path)
+
+
+@pytest.mark.skipif(not HAS_PYARROW, reason="pyarrow isn't installed")
+def test_arrow_round_trip(tmp_path: Path):
+    import pyarrow
+    import pyarrow.parquet
+
+    wh = to_arrow_table(billing_tables(BILLING)["wh_readings"])
+    assert wh.schema.field("value").type == pyarrow.decimal128(38, 10)
+    assert str(wh.schema.field("period_start").type.tz) == "UTC"
+    assert wh.column("value").to_pylist() == [Decimal("1.25"), Decimal("-3")]
+    assert wh.column("period_start").to_pylist()[1] == T0
+
+    empty = to_arrow_table(billing_tables(BILLING)["varh_readings"])
+    assert empty.schema == wh.schema
+
+    paths = write_parquet(calculation_log_tables([make_log(1, True)]), tmp_path)
+    assert [p.name for p in paths] == [
+        "calculation_logs.parquet",
+        "variable_metadata.parquet",
+        "variable_values.parquet",
+        "label_metadata.parquet",
+        "label_values.parquet",
+    ]
+    values = pyarrow.parquet.read_table(tmp_path / "variable_values.parquet")
+    assert values.column("site_id").to_pylist() == [None, 2]
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from envoy_schema.admin.schema.billing import AggregatorBillingResponse, BillingDoe, BillingReading
+from envoy_schema.admin.schema.doe_compliance import (
+    DoeComplianceReport,
+    evaluate_billing_doe_compliance,
+    evaluate_doe_compliance,
+)
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def watts(site_id: int, minutes: int, duration: int, value: str) -> BillingReading:
+    return BillingReading(
+        site_id=site_id, period_start=T0 + timedelta(minutes=minutes), duration_seconds=duration, value=Decimal(value)
+    )
+
+
+def doe(site_id: int, minutes: int, duration: int, import_limit: str, export_limit: str) -> BillingDoe:
+    return BillingDoe(
+        site_id=site_id,
+        period_start=T0 + timedelta(minutes=minutes),
+        duration_seconds=duration,
+        import_limit_active_watts=Decimal(import_limit),
+        export_limit_watts=Decimal(export_limit),
+    )
+
+
+def test_evaluate_doe_compliance():
+    does = [
+        doe(1, 0, 300, "1000", "500"),
+        doe(1, 5, 300, "2000", "1500"),
+        doe(2, 0, 3600, "100", "100"),
+    ]
+    readings = [
+        watts(1, 0, 600, "1500"),  # Breaches the first DOE (500W over for 300s) but not the second
+        watts(1, 10, 300, "-5000"),  # No DOE
+        watts(2, 0, 1800, "-400"),  # 300W over export for 1800s
+        watts(2, 30, 0, "300"),  # Instantaneous - 200W over import for 1s
+        watts(3, 0, 300, "99999"),  # No DOE
+    ]
+    report = evaluate_doe_compliance(readings, does)
+    assert isinstance(report, DoeComplianceReport)
+    assert [s.site_id for s in report.sites] == [1, 2, 3]
+
+    site_1, site_2, site_3 = report.sites
+    assert (site_1.evaluated_readings, site_1.import_breaches, site_1.export_breaches) == (1, 1, 0)
+    assert site_1.import_breach_wh == pytest.approx(500 * 300 / 3600)
+    assert site_1.max_import_exceedance_watts == 500.0
+
+    assert (site_2.evaluated_readings, site_2.import_breaches, site_2.export_breaches) == (2, 1, 1)
+    assert site_2.export_breach_wh == pytest.approx(300 * 0.5)
+    assert site_2.import_breach_wh == pytest.approx(200 / 3600)
+    assert site_2.max_export_exceedance_watts == 300.0
+
+    assert site_3.evaluated_readings == 0 and site_3.import_breaches == 0
+
+    assert report.evaluated_readings == 3
+    assert (report.import_breaches, report.export_breaches) == (2, 1)
+    assert report.max_import_exceedance_watts == 500.0
+    assert report.export_breach_wh == pytest.approx(150.0)
+    assert DoeComplianceReport.model_validate_json(report.model_dump_json()) == report
+
+
+def test_evaluate_doe_compliance_empty():
+    report = evaluate_doe_compliance([], [])
+    assert report.sites == [] and report.evaluated_readings == 0 and report.max_export_exceedance_watts == 0.0
+
+    report = evaluate_doe_compliance([], [doe(4, 0, 300, "1", "1")])
+    assert [s.site_id for s in report.sites] == [4]
+
+
+def test_evaluate_doe_compliance_unordered():
+    with pytest.raises(ValueError, match="readings"):
+        evaluate_doe_compliance([watts(2, 0, 300, "1"), watts(1, 0, 300, "1")], [])
+    with pytest.raises(ValueError, match="does"):
+        evaluate_doe_compliance([], [doe(1, 5, 300, "1", "1"), doe(1, 0, 300, "1", "1")])
+
+
+def test_evaluate_billing_doe_compliance():
+    response = AggregatorBillingResponse(
+        tariff_id=1,
+        aggregator_id=2,
+        aggregator_name="agg",
+        period_start=T0,
+        period_end=T0 + timedelta(days=1),
+        wh_readings=[],
+        varh_readings=[],
+        watt_readings=[watts(1, m, 300, "-2000") for m in range(0, 60, 5)],
+        active_tariffs=[],
+        active_does=[doe(1, 0, 1800, "0", "1500"), doe(1, 30, 1800, "0", "3000")],
+    )
+    report = evaluate_billing_doe_compliance(response)
+    assert report.export_breaches == 6
+    assert report.export_breach_wh == pytest.approx(6 * 500 * 300 / 3600)
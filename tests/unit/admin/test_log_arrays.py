@@ -0,0 +1,97 @@
+import json
+import math
+from array import array
+
+import pytest
+
+from envoy_schema.admin.schema.log import CalculationLogVariableValues
+from envoy_schema.admin.schema.log_arrays import CalculationLogVariableArrays
+
+MODEL = CalculationLogVariableValues(
+    variable_ids=[1, 1, 2, 2],
+    site_ids=[3, None, 3, None],
+    interval_periods=[0, 1, 0, 1],
+    values=[7.7, -8.8, 0.0, 1],
+)
+
+
+def test_model_round_trip():
+    arrays = CalculationLogVariableArrays.from_model(MODEL)
+    assert len(arrays) == 4
+    assert arrays.variable_ids == array("q", [1, 1, 2, 2])
+    assert arrays.site_ids == array("q", [3, 0, 3, 0])
+    assert arrays.site_id_mask == b"\x00\x01\x00\x01"
+    assert arrays.values == array("d", [7.7, -8.8, 0.0, 1.0])
+    assert arrays.site_ids_list() == [3, None, 3, None]
+    assert arrays.to_model() == MODEL
+
+
+def test_json_round_trip():
+    raw = MODEL.model_dump_json()
+    arrays = CalculationLogVariableArrays.from_json(raw)
+    assert arrays == CalculationLogVariableArrays.from_model(MODEL)
+    assert arrays.to_json() == raw
+    assert CalculationLogVariableValues.model_validate_json(arrays.to_json()) == MODEL
+
+    no_none = CalculationLogVariableArrays.from_json(raw.replace("null", "5").encode())
+    assert no_none.site_id_mask == bytes(4)
+
+
+@pytest.mark.parametrize("chunk_items, read_size", [(1, 1), (3, 7), (1000, 1024 * 1024)])
+def test_json_round_trip_chunked(monkeypatch: pytest.MonkeyPatch, chunk_items: int, read_size: int):
+    """Encoding/decoding should work straight from/to the arrays (a bounded slice at a time) - never via to_dict"""
+    expected = CalculationLogVariableArrays.from_lists(
+        list(range(50)),
+        [None if i % 3 else i for i in range(50)],
+        [i % 5 for i in range(50)],
+        [i / 7 for i in range(50)],
+    )
+    raw = expected.to_model().model_dump_json()
+
+    def no_lists(*args, **kwargs):
+        raise AssertionError("Whole columns shouldn't be converted to lists")
+
+    monkeypatch.setattr(CalculationLogVariableArrays, "to_dict", no_lists)
+    monkeypatch.setattr(CalculationLogVariableArrays, "from_dict", no_lists)
+
+    assert "".join(expected.iter_json(chunk_items)) == raw
+    assert expected.to_json(chunk_items) == raw
+    assert CalculationLogVariableArrays.from_json(raw, read_size) == expected
+    assert CalculationLogVariableArrays.from_json(raw.encode(), read_size) == expected
+
+    empty = CalculationLogVariableArrays.from_lists([], [], [], [])
+    assert empty.to_json(chunk_items) == '{"variable_ids":[],"site_ids":[],"interval_periods":[],"values":[]}'
+    assert CalculationLogVariableArrays.from_json(empty.to_json(), read_size) == empty
+
+
+def test_json_non_finite():
+    arrays = CalculationLogVariableArrays.from_lists([1, 2], [None, 1], [0, 0], [math.inf, 1.5])
+    assert arrays.to_json() == arrays.to_model().model_dump_json()
+    assert json.loads(arrays.to_json())["values"] == [None, 1.5]
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "[]",
+        '{"variable_ids": [1], "site_ids": [1], "interval_periods": [1]}',
+        '{"variable_ids": [1.5], "site_ids": [1], "interval_periods": [1], "values": [1]}',
+        '{"variable_ids": [1], "site_ids": ["a"], "interval_periods": [1], "values": [1]}',
+        '{"variable_ids": [1], "site_ids": [1], "interval_periods": [1e30], "values": [1]}',
+        '{"variable_ids": [1], "site_ids": [1], "interval_periods": [1], "values": ["a"]}',
+        '{"variable_ids": [1], "site_ids": [1], "interval_periods": [99999999999999999999], "values": [1]}',
+        '{"variable_ids": [1, 2], "site_ids": [1], "interval_periods": [1], "values": [1]}',
+        '{"variable_ids": 1, "site_ids": [1], "interval_periods": [1], "values": [1]}',
+        '{"variable_ids": [1], "site_ids": [1], "interval_periods": [1], "values": [1]} trailing',
+        '{"variable_ids": [1], "site_ids": [1], "interval_periods": [1], "values": [1]',
+        "",
+    ],
+)
+def test_from_json_invalid(raw: str):
+    with pytest.raises(ValueError):
+        CalculationLogVariableArrays.from_json(raw)
+
+
+def test_invalid_typecode():
+    with pytest.raises(ValueError):
+        CalculationLogVariableArrays(array("q"), array("q"), b"", array("q"), array("f"))
@@ -0,0 +1,160 @@
+from array import array
+from datetime import datetime, timezone
+from typing import Optional
+
+import pytest
+
+from envoy_schema.admin.schema.log import (
+    CalculationLogLabelMetadata,
+    CalculationLogLabelValues,
+    CalculationLogRequest,
+    CalculationLogVariableMetadata,
+    CalculationLogVariableValues,
+)
+from envoy_schema.admin.schema.log_arrays import CalculationLogVariableArrays
+from envoy_schema.admin.schema.log_index import (
+    CalculationLogVariableIndex,
+    interval_count,
+    validate_calculation_log,
+    validate_variable_values,
+)
+
+
+def make_request(
+    variable_values: Optional[CalculationLogVariableValues],
+    label_values: Optional[CalculationLogLabelValues] = None,
+    duration: int = 3600,
+    width: int = 900,
+) -> CalculationLogRequest:
+    return CalculationLogRequest(
+        calculation_range_start=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        calculation_range_duration_seconds=duration,
+        interval_width_seconds=width,
+        variable_metadata=[
+            CalculationLogVariableMetadata(variable_id=1, name="a", description="a"),
+            CalculationLogVariableMetadata(variable_id=2, name="b", description="b"),
+        ],
+        variable_values=variable_values,
+        label_metadata=[CalculationLogLabelMetadata(label_id=1, name="l", description="l")],
+        label_values=label_values,
+    )
+
+
+VALUES = CalculationLogVariableValues(
+    variable_ids=[2, 1, 1, 2, 1, 1],
+    site_ids=[3, None, 3, 3, 3, 4],
+    interval_periods=[0, 1, 3, 1, 0, 2],
+    values=[1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+)
+
+
+@pytest.mark.parametrize("duration, width, expected", [(3600, 900, 4), (3601, 900, 5), (0, 900, 0), (60, 900, 1)])
+def test_interval_count(duration: int, width: int, expected: int):
+    assert interval_count(make_request(None, duration=duration, width=width)) == expected
+
+
+def test_validate_calculation_log_valid():
+    validate_calculation_log(make_request(VALUES))
+    validate_calculation_log(
+        make_request(None, CalculationLogLabelValues(label_ids=[1, 1], site_ids=[None, 1], values=["x", "y"]))
+    )
+    validate_calculation_log(
+        make_request(CalculationLogVariableValues(variable_ids=[], site_ids=[], interval_periods=[], values=[]))
+    )
+    validate_variable_values(make_request(None), CalculationLogVariableArrays.from_model(VALUES))
+
+
+@pytest.mark.parametrize(
+    "request_model, match",
+    [
+        (make_request(VALUES, width=0), "interval_width_seconds"),
+        (make_request(VALUES, duration=-1), "calculation_range_duration_seconds"),
+        (
+            make_request(CalculationLogVariableValues(variable_ids=[1], site_ids=[], interval_periods=[1], values=[1])),
+            "site_ids=0",
+        ),
+        (
+            make_request(
+                CalculationLogVariableValues(
+                    variable_ids=[1, 1], site_ids=[1, 1], interval_periods=[4, -1], values=[1, 2]
+                )
+            ),
+            r"2 interval_periods .* First is interval_period 4 at row 0",
+        ),
+        (
+            make_request(
+                CalculationLogVariableValues(
+                    variable_ids=[1, 3], site_ids=[1, 1], interval_periods=[0, 0], values=[1, 2]
+                )
+            ),
+            r"variable_metadata: \[3\]",
+        ),
+        (
+            make_request(None, CalculationLogLabelValues(label_ids=[1, 2], site_ids=[None, 1], values=["x", "y"])),
+            r"label_metadata: \[2\]",
+        ),
+        (
+            make_request(None, CalculationLogLabelValues(label_ids=[1, 1], site_ids=[None], values=["x", "y"])),
+            "label_values",
+        ),
+    ],
+)
+def test_validate_calculation_log_invalid(request_model: CalculationLogRequest, match: str):
+    with pytest.raises(ValueError, match=match):
+        validate_calculation_log(request_model)
+
+
+def test_validate_duplicate_metadata():
+    request = make_request(VALUES)
+    request.variable_metadata.append(CalculationLogVariableMetadata(variable_id=1, name="c", description="c"))
+    with pytest.raises(ValueError, match="duplicate"):
+        validate_calculation_log(request)
+
+
+def test_index_lookup():
+    index = CalculationLogVariableIndex.from_model(VALUES)
+    assert len(index) == 6
+    assert index.keys() == [(1, 3), (1, 4), (1, None), (2, 3)]
+    assert (1, None) in index and (2, None) not in index
+    assert index.variable_ids() == [1, 2]
+    assert index.site_ids(1) == [3, 4, None]
+    assert index.site_ids(99) == []
+
+    assert index.get(1, 3, 0) == 5.0
+    assert index.get(1, 3, 3) == 3.0
+    assert index.get(1, 3, 1) is None
+    assert index.get(1, None, 1) == 2.0
+    assert index.get(2, 3, 1) == 4.0
+    assert index.get(2, 4, 1) is None
+
+    assert index.series(1, 3) == (array("q", [0, 3]), array("d", [5.0, 3.0]))
+    assert index.series(1, 3, start_period=1) == (array("q", [3]), array("d", [3.0]))
+    assert index.series(1, 3, end_period=3) == (array("q", [0]), array("d", [5.0]))
+    assert index.series(1, 3, start_period=4, end_period=2) == (array("q"), array("d"))
+    assert index.series(9, 9) == (array("q"), array("d"))
+
+    # rows maps the sorted columns back to the original rows
+    selected = index.series_slice(2, 3)
+    assert [VALUES.values[r] for r in index.rows[selected]] == [1.0, 4.0]
+
+
+def test_index_duplicate():
+    values = CalculationLogVariableValues(
+        variable_ids=[1, 1, 1], site_ids=[None, 2, None], interval_periods=[5, 5, 5], values=[1, 2, 3]
+    )
+    with pytest.raises(ValueError, match="site_id None, interval_period 5"):
+        CalculationLogVariableIndex.from_model(values)
+
+
+def test_index_large_sorted():
+    n_sites, n_periods = 200, 288
+    arrays = CalculationLogVariableArrays.from_lists(
+        [1] * (n_sites * n_periods),
+        [s for s in range(n_sites) for _ in range(n_periods)],
+        list(range(n_periods)) * n_sites,
+        [float(s * 1000 + p) for s in range(n_sites) for p in range(n_periods)],
+    )
+    index = CalculationLogVariableIndex(arrays)
+    assert index.rows == array("q", range(len(arrays)))
+    assert index.get(1, 150, 10) == 150010.0
+    assert index.series(1, 7, 100, 103)[1] == array("d", [7100.0, 7101.0, 7102.0])
@@ -0,0 +1,201 @@
+import json
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Optional
+
+import pytest
+
+from envoy_schema.admin.schema.log import (
+    CalculationLogLabelMetadata,
+    CalculationLogLabelValues,
+    CalculationLogRequest,
+    CalculationLogResponse,
+    CalculationLogVariableMetadata,
+    CalculationLogVariableValues,
+)
+from envoy_schema.admin.schema import log_stream
+from envoy_schema.admin.schema.log_arrays import CalculationLogVariableArrays
+from envoy_schema.admin.schema.log_stream import (
+    FIELD_LABEL_VALUES,
+    FIELD_VARIABLE_VALUES,
+    CalculationLogStreamDecoder,
+    ColumnChunk,
+    decode_calculation_log_stream,
+)
+
+REQUEST = CalculationLogRequest(
+    calculation_range_start=datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    calculation_range_duration_seconds=86400,
+    interval_width_seconds=300,
+    topology_id="feeder-1",
+    description='Has "quotes", commas and ] brackets',
+    variable_metadata=[CalculationLogVariableMetadata(variable_id=1, name="v1", description="desc")],
+    variable_values=CalculationLogVariableValues(
+        variable_ids=[1] * 50 + [2] * 50,
+        site_ids=[None if i % 7 == 0 else i for i in range(100)],
+        interval_periods=list(range(100)),
+        values=[i * 1.5 - 20 for i in range(100)],
+    ),
+    label_metadata=[CalculationLogLabelMetadata(label_id=3, name="l3", description="desc")],
+    label_values=CalculationLogLabelValues(label_ids=[3, 3, 3], site_ids=[1, None, 2], values=["a,b", "c]d", 'e"f']),
+)
+
+
+class CollectingSink:
+    def __init__(self):
+        self.chunks: list[ColumnChunk] = []
+
+    def __call__(self, chunk: ColumnChunk) -> None:
+        self.chunks.append(chunk)
+
+    def column(self, field: str, column: str) -> list:
+        values: list = []
+        for c in self.chunks:
+            if c.field == field and c.column == column:
+                assert c.offset == len(values), "Chunks are contiguous"
+                if c.site_id_mask is None:
+                    values.extend(c.values)
+                else:
+                    values.extend(None if m else v for v, m in zip(c.values, c.site_id_mask))
+        return values
+
+
+def feed_chunks(raw: bytes, chunk_size: int) -> list[bytes]:
+    chunks = []
+    for start in range(0, len(raw), chunk_size):
+        end = start + chunk_size
+        chunks.append(raw[start:end])
+    return chunks
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 17, 1024, 1024 * 1024])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_stream_matches_model(chunk_size: int, indent: Optional[int]):
+    raw = json.dumps(REQUEST.model_dump(mode="json"), indent=indent).encode()
+    sink = CollectingSink()
+    result = decode_calculation_log_stream(feed_chunks(raw, chunk_size), sink)
+
+    assert result.request == REQUEST.model_copy(update={"variable_values": None, "label_values": None})
+    assert result.variable_value_count == 100
+    assert result.label_value_count == 3
+
+    variable_values = CalculationLogVariableValues(
+        **{c: sink.column(FIELD_VARIABLE_VALUES, c) for c in CalculationLogVariableValues.model_fields}
+    )
+    assert variable_values == REQUEST.variable_values
+    label_values = CalculationLogLabelValues(
+        **{c: sink.column(FIELD_LABEL_VALUES, c) for c in CalculationLogLabelValues.model_fields}
+    )
+    assert label_values == REQUEST.label_values
+
+
+def test_stream_chunks_are_typed_arrays():
+    raw = REQUEST.model_dump_json().encode()
+    sink = CollectingSink()
+    decode_calculation_log_stream(BytesIO(raw), sink, read_size=64)
+    assert len(sink.chunks) > 8
+    for chunk in sink.chunks:
+        if chunk.field == FIELD_VARIABLE_VALUES:
+            assert chunk.values.typecode == ("d" if chunk.column == "values" else "q")
+
+    arrays = CalculationLogVariableArrays.from_model(REQUEST.variable_values)
+    assert sink.column(FIELD_VARIABLE_VALUES, "values") == arrays.values.tolist()
+
+
+def test_stream_large_buffered_values(monkeypatch: pytest.MonkeyPatch):
+    """Large (non streamed) values fed a byte at a time shouldn't be re-parsed from their start on every feed"""
+    request = REQUEST.model_copy(
+        update={
+            "description": 'Escaped \\" quotes \\\\ and \u00e9 ' * 200,
+            "variable_metadata": [
+                CalculationLogVariableMetadata(variable_id=i, name=f"v{i}", description='"x" {y} [z]')
+                for i in range(200)
+            ],
+            "label_values": CalculationLogLabelValues(label_ids=[1], site_ids=[None], values=["a,]\\" * 2000]),
+        }
+    )
+    raw = request.model_dump_json().encode()
+
+    failed_lengths: list[int] = []  # The amount of text that each failed (incomplete) decode was attempted over
+
+    class RecordingDecoder:
+        def raw_decode(self, s: str, idx: int):
+            try:
+                return json.JSONDecoder().raw_decode(s, idx)
+            except json.JSONDecodeError:
+                failed_lengths.append(len(s) - idx)
+                raise
+
+    monkeypatch.setattr(log_stream, "_decoder", RecordingDecoder())
+    sink = CollectingSink()
+    result = decode_calculation_log_stream(feed_chunks(raw, 1), sink)
+
+    assert result.request == request.model_copy(update={"variable_values": None, "label_values": None})
+    assert sink.column(FIELD_LABEL_VALUES, "values") == request.label_values.values
+    assert max(failed_lengths) < 100, "Only short values (eg property names / numbers) are retried"
+
+
+def test_stream_null_and_response():
+    response = CalculationLogResponse(
+        **REQUEST.model_dump(), calculation_log_id=1, created_time=datetime(2024, 1, 1, tzinfo=timezone.utc)
+    )
+    response.variable_values = None
+    response.label_values = CalculationLogLabelValues(label_ids=[], site_ids=[], values=[])
+
+    sink = CollectingSink()
+    result = decode_calculation_log_stream(response.model_dump_json().encode(), sink, model=CalculationLogResponse)
+    assert isinstance(result.request, CalculationLogResponse)
+    assert result.request.calculation_log_id == 1
+    assert result.variable_value_count is None
+    assert result.label_value_count == 0
+    assert sink.chunks == []
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        lambda d: d["variable_values"].update({"site_ids": d["variable_values"]["site_ids"][:-1]}),
+        lambda d: d["variable_values"].pop("values"),
+        lambda d: d["variable_values"].update({"other": [1]}),
+        lambda d: d["variable_values"].update({"values": ["a"] * 100}),
+        lambda d: d["variable_values"].update({"variable_ids": [1.5] * 100}),
+        lambda d: d["variable_values"].update({"variable_ids": [[1]] * 100}),
+        lambda d: d["variable_values"].update({"values": 1}),
+        lambda d: d["label_values"].update({"values": [1, 2, 3]}),
+        lambda d: d.pop("interval_width_seconds"),
+        lambda d: d.update({"interval_width_seconds": "abc"}),
+    ],
+)
+def test_stream_invalid_content(mutate):
+    d = REQUEST.model_dump(mode="json")
+    mutate(d)
+    with pytest.raises(ValueError):
+        decode_calculation_log_stream(feed_chunks(json.dumps(d).encode(), 50), CollectingSink())
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"",
+        b"[]",
+        b'{"variable_values": {"values": [1,,2]}}',
+        b'{"variable_values": {"values": [1,2,]}}',
+        b'{"variable_values": {"values": [,1]}}',
+        b'{"variable_values": {"values": [1, 2]',
+        b'{"label_values": {"values": ["a",]}}',
+        b'{"a": 1} trailing',
+        b'{"a": 1',
+        b'{"a" 1}',
+    ],
+)
+def test_stream_invalid_json(raw: bytes):
+    with pytest.raises(ValueError):
+        decode_calculation_log_stream(feed_chunks(raw, 4) if raw else [], CollectingSink())
+
+
+def test_feed_after_close():
+    decoder = CalculationLogStreamDecoder(CollectingSink())
+    decoder.feed(REQUEST.model_dump_json().encode())
+    decoder.close()
+    with pytest.raises(ValueError):
+        decoder.feed(b" ")
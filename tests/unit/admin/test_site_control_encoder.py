@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional
+
+import pytest
+
+from envoy_schema.admin.schema.config import RuntimeServerConfigResponse
+from envoy_schema.admin.schema.site_control import SiteControlRequest, SiteControlResponse
+from envoy_schema.admin.schema.site_control_encoder import SiteControlEncoder, scale_column
+from envoy_schema.server.schema.sep2.der import DERControlListResponse, DERControlResponse
+from envoy_schema.server.schema.sep2.encoding import encode_xml
+from envoy_schema.server.schema.sep2.event import EventStatusType
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+NOW = T0 + timedelta(minutes=10)
+
+
+@pytest.mark.parametrize(
+    "values, pow10, expected",
+    [
+        ([Decimal("1234.5"), Decimal("-1234.5"), Decimal("0")], 0, [1234, -1234, 0]),
+        ([Decimal("1235.5"), None, Decimal("12.3456")], -2, [123550, None, 1235]),
+        ([Decimal("12345")], 2, [123]),
+        ([Decimal("12350")], 2, [124]),
+        ([Decimal("12250")], 2, [122]),
+        ([None, None], 0, [None, None]),
+        ([], 1, []),
+    ],
+)
+def test_scale_column(values: list[Optional[Decimal]], pow10: int, expected: list[Optional[int]]):
+    assert scale_column(values, pow10) == expected
+
+
+CONTROLS = [
+    SiteControlRequest(
+        site_id=1,
+        calculation_log_id=None,
+        start_time=T0,
+        duration_seconds=3600,
+        import_limit_watts=Decimal("5000.4"),
+        export_limit_watts=Decimal("1500"),
+        set_energized=False,
+        set_point_percentage=Decimal("-50.25"),
+        ramp_time_seconds=Decimal("12.5"),
+        randomize_start_seconds=-60,
+    ),
+    SiteControlResponse(
+        site_control_id=9,
+        site_id=2,
+        calculation_log_id=3,
+        start_time=T0 + timedelta(hours=1),
+        duration_seconds=300,
+        generation_limit_watts=Decimal("1.23"),
+        load_limit_watts=Decimal("0"),
+        storage_target_watts=Decimal("-2000"),
+        set_connect=True,
+        created_time=T0 - timedelta(days=1),
+        changed_time=T0,
+        superseded=False,
+    ),
+    SiteControlResponse(
+        site_control_id=10,
+        site_id=2,
+        calculation_log_id=None,
+        start_time=T0,
+        duration_seconds=300,
+        created_time=T0,
+        changed_time=T0,
+        superseded=True,
+    ),
+]
+
+
+def test_encode():
+    encoder = SiteControlEncoder.from_config(
+        RuntimeServerConfigResponse(
+            dcap_pollrate_seconds=1,
+            edevl_pollrate_seconds=1,
+            fsal_pollrate_seconds=1,
+            derpl_pollrate_seconds=1,
+            derl_pollrate_seconds=1,
+            mup_postrate_seconds=1,
+            site_control_pow10_encoding=-1,
+            tariff_pow10_encoding=-4,
+            disable_edev_registration=False,
+            created_time=T0,
+            changed_time=T0,
+        )
+    )
+    encoded = encoder.encode(CONTROLS, ["a1", "b2", "c3"], NOW, hrefs=["/derc/1", "/derc/2", "/derc/3"])
+    first, second, third = encoded
+
+    base = first.DERControlBase_
+    assert (base.opModImpLimW.value, base.opModImpLimW.multiplier) == (50004, -1)
+    assert (base.opModExpLimW.value, base.opModExpLimW.multiplier) == (15000, -1)
+    assert base.opModGenLimW is None and base.opModConnect is None
+    assert base.opModEnergize is False
+    assert base.opModFixedW == -5025
+    assert base.rampTms == 1250
+    assert first.randomizeStart == -60
+    assert first.creationTime == int(NOW.timestamp())
+    assert first.EventStatus_.currentStatus == EventStatusType.Active
+    assert first.interval.start == int(T0.timestamp()) and first.interval.duration == 3600
+    assert first.mRID == "a1" and first.href == "/derc/1"
+
+    assert second.DERControlBase_.opModGenLimW.value == 12
+    assert second.DERControlBase_.opModStorageTargetW.value == -20000
+    assert second.DERControlBase_.opModConnect is True
+    assert second.creationTime == int((T0 - timedelta(days=1)).timestamp())
+    assert second.EventStatus_.currentStatus == EventStatusType.Scheduled
+    assert second.randomizeStart is None
+
+    assert third.EventStatus_.currentStatus == EventStatusType.Superseded
+    assert third.EventStatus_.potentiallySuperseded is True
+
+    # Constructing without validation must be indistinguishable from validating the same values
+    for control in encoded:
+        validated = DERControlResponse.model_validate(control.model_dump(exclude_unset=True))
+        assert encode_xml(control) == encode_xml(validated)
+        assert DERControlResponse.from_xml(encode_xml(control)) == validated
+
+
+def test_encode_invalid():
+    with pytest.raises(ValueError):
+        SiteControlEncoder(0).encode(CONTROLS, ["a1"], NOW)
+    with pytest.raises(ValueError):
+        SiteControlEncoder(0).encode(CONTROLS, ["a1", "b2", "c3"], NOW, hrefs=[])
+    assert SiteControlEncoder(0).encode([], [], NOW) == []
+
+
+def test_iter_der_control_list_xml():
+    encoder = SiteControlEncoder(0)
+    mrids = ["a1", "b2", "c3"]
+    xml = b"".join(encoder.iter_der_control_list_xml(CONTROLS, mrids, NOW, all_=3, results=3, href="/derc"))
+    expected = DERControlListResponse(all_=3, results=3, href="/derc", DERControl=encoder.encode(CONTROLS, mrids, NOW))
+    assert xml == encode_xml(expected)
+
+    parsed = DERControlListResponse.from_xml(xml)
+    assert [c.mRID for c in parsed.DERControl] == mrids
+    assert parsed.DERControl[0].DERControlBase_.opModImpLimW.value == 5000
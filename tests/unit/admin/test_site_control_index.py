@@ -0,0 +1,107 @@
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import count
+
+from envoy_schema.admin.schema.site_control import SiteControlRequest, SiteControlResponse
+from envoy_schema.admin.schema.site_control_index import SiteControlIndex
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+IDS = count(1)
+
+
+def control(site_id: int, minutes: int, duration: int, created_minutes: int = 0, superseded=False):
+    return SiteControlResponse(
+        site_control_id=next(IDS),
+        site_id=site_id,
+        calculation_log_id=None,
+        start_time=T0 + timedelta(minutes=minutes),
+        duration_seconds=duration,
+        created_time=T0 + timedelta(minutes=created_minutes),
+        changed_time=T0,
+        superseded=superseded,
+        import_limit_watts=1000,
+    )
+
+
+def test_active_and_overlapping():
+    long = control(1, 0, 3600)
+    early = control(1, 0, 300)
+    late = control(1, 10, 300, created_minutes=5)
+    other_site = control(2, 0, 3600)
+    priority = control(1, 5, 600)
+
+    index = SiteControlIndex()
+    index.add([long, early, late, other_site], primacy=2)
+    index.add([priority], primacy=1)
+    assert len(index) == 5
+    assert index.site_ids() == [1, 2]
+
+    assert index.active_at(1, T0) == [early, long]  # Same primacy / created_time - higher id wins
+    assert index.active_at(1, T0 + timedelta(minutes=5)) == [priority, long]
+    assert index.active_at(1, T0 + timedelta(minutes=12)) == [priority, late, long]
+    assert index.active_at(1, T0 + timedelta(minutes=60)) == []  # Half open
+    assert index.active_at(1, T0 - timedelta(seconds=1)) == []
+    assert index.active_at(3, T0) == []
+
+    new = SiteControlRequest(
+        site_id=1, calculation_log_id=None, start_time=T0 + timedelta(minutes=4), duration_seconds=60
+    )
+    assert index.overlapping(new) == [early, long]
+    assert index.overlapping(late) == [priority, long]
+    assert index.overlapping(new.model_copy(update={"site_id": 9})) == []
+
+    # Adding after a query rebuilds the site
+    newest = control(1, 4, 60, created_minutes=10)
+    index.add([newest], primacy=2)
+    assert index.overlapping(new) == [newest, early, long]
+
+
+def test_recompute_superseded():
+    a = control(1, 0, 600, created_minutes=0, superseded=True)
+    b = control(1, 5, 600, created_minutes=1)  # Newer - supersedes a
+    c = control(1, 20, 300, created_minutes=0, superseded=True)  # Doesn't overlap anything
+    d = control(1, 0, 1800, created_minutes=5)  # Lower priority group - superseded by b
+    e = control(2, 0, 1800, created_minutes=5)
+
+    index = SiteControlIndex()
+    index.add([a, b, c], primacy=1)
+    index.add([d, e], primacy=5)
+    results = index.recompute_superseded()
+    assert [r.site_control_id for r in results] == [x.site_control_id for x in [a, b, c, d, e]]
+    assert [r.superseded for r in results] == [True, False, False, True, False]
+    assert results[0] is a and results[1] is b  # Unchanged controls aren't copied
+    assert results[2] is not c and c.superseded
+    assert index.is_superseded(d, primacy=5)
+    assert not index.is_superseded(d, primacy=0)
+
+    assert SiteControlIndex().recompute_superseded() == []
+
+
+def test_matches_pairwise():
+    rng = random.Random(42)
+    controls = [
+        (control(rng.randint(1, 3), rng.randint(0, 600), rng.randint(0, 7200), rng.randint(0, 50)), rng.randint(1, 3))
+        for _ in range(400)
+    ]
+    index = SiteControlIndex()
+    for c, primacy in controls:
+        index.add([c], primacy)
+
+    def overlaps(x: SiteControlResponse, y: SiteControlResponse) -> bool:
+        x_end = x.start_time + timedelta(seconds=x.duration_seconds)
+        y_end = y.start_time + timedelta(seconds=y.duration_seconds)
+        return x.site_id == y.site_id and x.start_time < y_end and y.start_time < x_end
+
+    def priority(x: SiteControlResponse, primacy: int):
+        return (primacy, -x.created_time.timestamp(), -x.site_control_id)
+
+    expected = [
+        any(overlaps(x, y) and priority(y, py) < priority(x, px) for y, py in controls if y is not x)
+        for x, px in controls
+    ]
+    assert [r.superseded for r in index.recompute_superseded()] == expected
+
+    for x, _ in controls[:50]:
+        assert {c.site_control_id for c in index.overlapping(x)} == {
+            y.site_control_id for y, _ in controls if y is not x and overlaps(x, y)
+        }
@@ -0,0 +1,144 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from envoy_schema.admin.schema.site_reading import CSIPAusSiteReading, CSIPAusSiteReadingUnit, PhaseEnum
+from envoy_schema.admin.schema.site_reading_normaliser import SiteReadingNormaliser, normalise_readings
+from envoy_schema.server.schema.sep2.metering import Reading, ReadingType
+from envoy_schema.server.schema.sep2.reading_batch import ReadingBatch
+from envoy_schema.server.schema.sep2.types import (
+    DateTimeIntervalType,
+    FlowDirectionType,
+    KindType,
+    PhaseCode,
+    UomType,
+)
+
+
+def reading_batch(*values) -> ReadingBatch:
+    return ReadingBatch.from_readings(
+        [
+            Reading(value=v, timePeriod=DateTimeIntervalType(start=1700000000 + idx * 300, duration=300))
+            for idx, v in enumerate(values)
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "reading_type, expected_unit, expected_phase, expected_values",
+    [
+        (ReadingType(uom=UomType.REAL_POWER_WATT), CSIPAusSiteReadingUnit.ACTIVEPOWER, PhaseEnum.NA, ["123", "-4"]),
+        (
+            ReadingType(
+                uom=UomType.REACTIVE_POWER_VAR,
+                powerOfTenMultiplier=3,
+                phase=PhaseCode.PHASE_BN,
+                kind=KindType.POWER,
+            ),
+            CSIPAusSiteReadingUnit.REACTIVEPOWER,
+            PhaseEnum.BN,
+            ["123E+3", "-4E+3"],
+        ),
+        (
+            ReadingType(uom=UomType.VOLTAGE, powerOfTenMultiplier=-1, phase=PhaseCode.PHASE_A_S1),
+            CSIPAusSiteReadingUnit.VOLTAGE,
+            PhaseEnum.AN,
+            ["12.3", "-0.4"],
+        ),
+        (
+            ReadingType(
+                uom=UomType.REAL_ENERGY_WATT_HOURS,
+                powerOfTenMultiplier=-2,
+                flowDirection=FlowDirectionType.REVERSE,
+                kind=KindType.ENERGY,
+                phase=PhaseCode.PHASE_ABC,
+            ),
+            CSIPAusSiteReadingUnit.STORED_ENERGY,
+            PhaseEnum.NA,
+            ["-1.23", "0.04"],
+        ),
+    ],
+)
+def test_normaliser(reading_type, expected_unit, expected_phase, expected_values):
+    normaliser = SiteReadingNormaliser(reading_type)
+    batch = reading_batch(123, -4)
+
+    site_readings = normaliser.to_site_readings(batch)
+    assert site_readings == [
+        CSIPAusSiteReading(
+            reading_start_time=datetime(2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc),
+            duration_seconds=300,
+            phase=expected_phase,
+            value=Decimal(expected_values[0]),
+            csip_aus_unit=expected_unit,
+        ),
+        CSIPAusSiteReading(
+            reading_start_time=datetime(2023, 11, 14, 22, 18, 20, tzinfo=timezone.utc),
+            duration_seconds=300,
+            phase=expected_phase,
+            value=Decimal(expected_values[1]),
+            csip_aus_unit=expected_unit,
+        ),
+    ]
+
+    normalised = normaliser.normalise(batch)
+    assert normalised.csip_aus_unit == expected_unit
+    assert normalised.phase == expected_phase
+    assert list(normalised.start) == [1700000000, 1700000300]
+    assert list(normalised.duration) == [300, 300]
+    assert list(normalised.value) == [float(v) for v in expected_values]
+
+
+@pytest.mark.parametrize(
+    "reading_type",
+    [
+        ReadingType(),
+        ReadingType(uom=UomType.JOULES),
+        ReadingType(uom=UomType.REAL_POWER_WATT, kind=KindType.CURRENCY),
+        ReadingType(uom=UomType.REAL_POWER_WATT, phase=PhaseCode.PHASE_AB),
+    ],
+)
+def test_normaliser_unsupported(reading_type):
+    with pytest.raises(ValueError):
+        SiteReadingNormaliser(reading_type)
+
+
+def test_unrepresentable_readings_dropped():
+    batch = ReadingBatch.from_readings(
+        [
+            Reading(value=1, timePeriod=DateTimeIntervalType(start=0, duration=60)),
+            Reading(value=2),
+            Reading(timePeriod=DateTimeIntervalType(start=60, duration=60)),
+            Reading(value=4, timePeriod=DateTimeIntervalType(start=180, duration=60)),
+        ]
+    )
+    normaliser = SiteReadingNormaliser(ReadingType(uom=UomType.FREQUENCY_HZ, powerOfTenMultiplier=-2))
+    assert [r.value for r in normaliser.to_site_readings(batch)] == [Decimal("0.01"), Decimal("0.04")]
+    assert list(normaliser.normalise(batch).start) == [0, 180]
+
+
+def test_iter_pages():
+    normaliser = SiteReadingNormaliser(ReadingType(uom=UomType.REAL_POWER_WATT))
+    pages = list(normaliser.iter_pages(reading_batch(*range(5)), site_id=7, limit=2))
+
+    assert [p.start for p in pages] == [0, 2, 4]
+    assert [len(p.readings) for p in pages] == [2, 2, 1]
+    assert all(p.total_count == 5 and p.limit == 2 and p.site_id == 7 for p in pages)
+    assert pages[0].start_time == datetime(2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc)
+    assert pages[0].end_time == datetime(2023, 11, 14, 22, 38, 20, tzinfo=timezone.utc)
+    assert [r.value for p in pages for r in p.readings] == [Decimal(v) for v in range(5)]
+
+    empty = list(normaliser.iter_pages(ReadingBatch(), site_id=7, limit=2))
+    assert len(empty) == 1 and empty[0].readings == [] and empty[0].total_count == 0
+
+    with pytest.raises(ValueError):
+        list(normaliser.iter_pages(ReadingBatch(), site_id=7, limit=0))
+
+
+def test_normalise_readings():
+    normalised = normalise_readings(
+        ReadingType(uom=UomType.REAL_POWER_WATT, powerOfTenMultiplier=1), [reading_batch(1, 2), reading_batch(3)]
+    )
+    assert list(normalised.value) == [10.0, 20.0, 30.0]
+    assert list(normalised.start) == [1700000000, 1700000300, 1700000000]
@@ -0,0 +1,78 @@
+import pytest
+
+from envoy_schema.server.schema.sep2 import encoding
+from envoy_schema.server.schema.sep2.encoding import (
+    MEDIA_TYPE_SEP_EXI,
+    MEDIA_TYPE_SEP_XML,
+    ResourceCodec,
+    decode_resource,
+    encode_resource,
+    media_type,
+    register_codec,
+)
+from envoy_schema.server.schema.sep2.experimental_exi import EXPERIMENTAL_EXI_CODEC, encode_experimental_exi
+from envoy_schema.server.schema.sep2.pub_sub import Notification, SubscriptionEncoding
+
+
+@pytest.fixture
+def restore_codecs():
+    original = dict(encoding._codecs)
+    yield
+    encoding._codecs.clear()
+    encoding._codecs.update(original)
+
+
+def test_media_type():
+    assert media_type(SubscriptionEncoding.XML) == MEDIA_TYPE_SEP_XML
+    assert media_type(SubscriptionEncoding.EXI) == MEDIA_TYPE_SEP_EXI
+
+
+def test_xml_roundtrip():
+    with open("tests/data/notification_doe.xml", "r") as fp:
+        notif = Notification.from_xml(fp.read())
+
+    raw = encode_resource(notif, SubscriptionEncoding.XML)
+    assert raw == notif.to_xml(skip_empty=False, exclude_none=True, exclude_unset=True)
+    assert decode_resource(Notification, raw).model_dump() == notif.model_dump()
+
+
+def test_exi_unavailable_by_default():
+    """The experimental EXI-like codec isn't EXI 1.0 conformant so mustn't be used for application/sep-exi by default"""
+    with open("tests/data/notification_doe.xml", "r") as fp:
+        notif = Notification.from_xml(fp.read())
+
+    with pytest.raises(ValueError, match=MEDIA_TYPE_SEP_EXI):
+        encode_resource(notif, SubscriptionEncoding.EXI)
+    with pytest.raises(ValueError, match=MEDIA_TYPE_SEP_EXI):
+        decode_resource(Notification, b"", SubscriptionEncoding.EXI)
+
+
+def test_register_experimental_exi(restore_codecs):
+    with open("tests/data/notification_doe.xml", "r") as fp:
+        notif = Notification.from_xml(fp.read())
+
+    register_codec(SubscriptionEncoding.EXI, EXPERIMENTAL_EXI_CODEC)
+    raw = encode_resource(notif, SubscriptionEncoding.EXI)
+    assert raw == encode_experimental_exi(notif)
+    assert len(raw) < len(encode_resource(notif, SubscriptionEncoding.XML))
+    assert decode_resource(Notification, raw, SubscriptionEncoding.EXI) == decode_resource(
+        Notification, encode_resource(notif)
+    )
+
+
+def test_register_codec(restore_codecs):
+    """A registered codec should be used for encoding/decoding (this fake just wraps the xml)"""
+    register_codec(
+        SubscriptionEncoding.EXI,
+        ResourceCodec(
+            encode=lambda e: b"EXI" + encoding.encode_xml(e),
+            decode=lambda t, raw: encoding.decode_xml(t, raw[3:]),
+        ),
+    )
+
+    with open("tests/data/notification_doe.xml", "r") as fp:
+        notif = Notification.from_xml(fp.read())
+
+    raw = encode_resource(notif, SubscriptionEncoding.EXI)
+    assert raw.startswith(b"EXI")
+    assert decode_resource(Notification, raw, SubscriptionEncoding.EXI).model_dump() == notif.model_dump()
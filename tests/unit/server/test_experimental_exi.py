@@ -0,0 +1,159 @@
+from itertools import product
+from typing import Any
+
+import pytest
+from assertical.fake.generator import generate_class_instance, register_value_generator
+from assertical.fixtures.generator import generator_registry_snapshot
+from pydantic import BaseModel
+
+from envoy_schema.server.schema.sep2.base import BaseXmlModelWithNS
+from envoy_schema.server.schema.sep2.der import DERControlListResponse, DERSettings
+from envoy_schema.server.schema.sep2.encoding import decode_xml, encode_xml
+from envoy_schema.server.schema.sep2.experimental_exi import (
+    EXI_COOKIE,
+    VALUE_BINARY_HEX,
+    VALUE_BOOLEAN,
+    VALUE_INTEGER,
+    VALUE_STRING,
+    decode_experimental_exi,
+    encode_experimental_exi,
+    get_grammar,
+)
+from envoy_schema.server.schema.sep2.identification import Link
+from envoy_schema.server.schema.sep2.metering import Reading
+from envoy_schema.server.schema.sep2.pub_sub import Notification, Subscription
+from tests.unit.server.test_xsd_models import import_all_classes_from_module
+
+SEP2_CLASSES = [c for c in import_all_classes_from_module("envoy_schema.server.schema") if c is not BaseXmlModelWithNS]
+
+
+def with_valid_uris(entity: Any) -> Any:
+    """assertical generates the same strings for every str field - this replaces any that must be a URI"""
+    if isinstance(entity, list):
+        return [with_valid_uris(e) for e in entity]
+    if not isinstance(entity, BaseModel):
+        return entity
+
+    for name, field_info in type(entity).model_fields.items():
+        value = getattr(entity, name)
+        if value is None:
+            continue
+        field_type = str(field_info.annotation) + str(field_info.metadata)
+        if "validate_LocalAbsoluteUri" in field_type:
+            setattr(entity, name, f"/uri/{name}")
+        elif "validate_HttpUri" in field_type:
+            setattr(entity, name, f"https://example.com/{name}")
+        else:
+            setattr(entity, name, with_valid_uris(value))
+    return entity
+
+
+def generate_valid(t: type, optional_is_none: bool = False) -> Any:
+    with generator_registry_snapshot():
+        register_value_generator(str, lambda x: f"{x % 256:02X}")  # Upper case hex is also a valid string
+        register_value_generator(Link, lambda seed: Link(type=None, href=f"/link/{seed}"))
+        return with_valid_uris(
+            generate_class_instance(t, optional_is_none=optional_is_none, generate_relationships=True)
+        )
+
+
+@pytest.mark.parametrize("xml_class, optional_is_none", list(product(SEP2_CLASSES, [True, False])))
+def test_roundtrip_matches_xml(xml_class: type[BaseXmlModelWithNS], optional_is_none: bool):
+    """Every sep2 model should decode from EXI to exactly what it decodes to from XML"""
+    entity = generate_valid(xml_class, optional_is_none)
+    xml = encode_xml(entity)
+    exi = encode_experimental_exi(entity)
+    decoded = decode_experimental_exi(xml_class, exi)
+    assert decoded == decode_xml(xml_class, xml)
+    assert encode_xml(decoded) == xml
+    assert decode_experimental_exi(xml_class, EXI_COOKIE + exi) == decoded
+
+
+@pytest.mark.parametrize(
+    "file, model_type", [("notification_doe.xml", Notification), ("subscription.xml", Subscription)]
+)
+def test_roundtrip_documents(file: str, model_type: type[BaseXmlModelWithNS]):
+    with open(f"tests/data/{file}", "r") as fp:
+        entity = model_type.from_xml(fp.read())
+
+    xml = encode_xml(entity)
+    exi = encode_experimental_exi(entity)
+    assert len(exi) * 5 < len(xml)
+    assert encode_xml(decode_experimental_exi(model_type, exi)) == xml
+
+
+def test_grammar():
+    grammar = get_grammar(Reading)
+    assert grammar is get_grammar(Reading)
+    assert grammar.tag == "{urn:ieee:std:2030.5:ns}Reading"
+
+    # Attributes first (sorted by local name), then elements in declaration order
+    names = [p.qname.split("}")[-1] for p in grammar.particles]
+    assert names[:3] == ["href", "subscribable", "type"]
+    assert {p.qname.split("}")[-1]: p.value for p in grammar.particles}["qualityFlags"] == VALUE_BINARY_HEX
+    assert {p.qname.split("}")[-1]: p.value for p in grammar.particles}["value"] == VALUE_INTEGER
+    assert {p.qname.split("}")[-1]: p.value for p in grammar.particles}["href"] == VALUE_STRING
+
+    list_grammar = get_grammar(DERControlListResponse)
+    der_control = [p for p in list_grammar.particles if p.qname.endswith("}DERControl")][0]
+    assert der_control.repeated and not der_control.required
+    assert der_control.grammar is not None
+    base = der_control.grammar.particles[
+        [p.qname for p in der_control.grammar.particles].index("{urn:ieee:std:2030.5:ns}DERControlBase")
+    ]
+    assert base.required and not base.repeated
+    assert [p.value for p in base.grammar.particles if p.qname.endswith("}opModConnect")] == [VALUE_BOOLEAN]
+
+    # The final state can only end the element
+    assert grammar.states[-1] == [(-1, len(grammar.particles))]
+
+
+def test_string_table_and_hex():
+    entity = Reading(value=1, qualityFlags="0a", localID="ab1", href="/r/1")
+    decoded = decode_experimental_exi(Reading, encode_experimental_exi(entity))
+    assert (decoded.qualityFlags, decoded.localID) == ("0A", "0AB1")  # hexBinary is encoded by value, not case
+
+    # Repeated strings are encoded as string table hits - this should be much smaller than the literal strings
+    controls = generate_valid(DERControlListResponse)
+    controls.DERControl = controls.DERControl * 50
+    exi = encode_experimental_exi(controls)
+    assert len(exi) < len(encode_xml(controls)) / 20
+    assert decode_experimental_exi(DERControlListResponse, exi) == decode_xml(
+        DERControlListResponse, encode_xml(controls)
+    )
+
+
+def test_unicode_and_negative_values():
+    entity = DERSettings(
+        href="/der/1/dercap/é\U0001f600",
+        setGradW=-1,
+        setMaxW={"value": -(2**40), "multiplier": -3},
+        updatedTime=0,
+        modesEnabled="FF00",
+    )
+    decoded = decode_experimental_exi(DERSettings, encode_experimental_exi(entity))
+    assert decoded == entity
+    assert encode_xml(decoded) == encode_xml(entity)
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"",
+        b"\x00",  # Bad distinguishing bits
+        b"\xa0",  # Options present
+        b"\x81",  # Unsupported version
+        EXI_COOKIE,
+        b"\x80",  # Truncated
+        encode_experimental_exi(Reading(value=1, href="/mup/1/mr/2/rs/3/r/4"))[:-3],
+    ],
+)
+def test_decode_invalid(raw: bytes):
+    with pytest.raises(ValueError):
+        decode_experimental_exi(Reading, raw)
+
+
+def test_encode_missing_required():
+    settings = DERSettings.model_construct(href="/der/1/derg", updatedTime=1)  # setGradW is required
+    with pytest.raises(ValueError, match="setGradW"):
+        encode_experimental_exi(settings)
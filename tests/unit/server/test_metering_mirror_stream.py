@@ -0,0 +1,129 @@
+from io import BytesIO
+
+import pytest
+from lxml import etree
+
+from envoy_schema.server.schema.sep2.metering import Reading, ReadingType
+from envoy_schema.server.schema.sep2.metering_mirror import (
+    MirrorMeterReading,
+    MirrorMeterReadingListRequest,
+    MirrorReadingSet,
+    MirrorUsagePoint,
+    MirrorUsagePointRequest,
+)
+from envoy_schema.server.schema.sep2.metering_mirror_stream import MirrorStreamParser, iter_mirror_stream
+from envoy_schema.server.schema.sep2.types import DateTimeIntervalType, ServiceKind, UomType
+
+
+def generate_mmr(seed: int, sets: int, readings: int) -> MirrorMeterReading:
+    """Generates a valid (parseable) MirrorMeterReading with the specified number of sets/readings"""
+    return MirrorMeterReading(
+        mRID=f"{seed:x}",
+        description=f"mmr {seed}",
+        readingType=ReadingType(uom=UomType.REAL_POWER_WATT, powerOfTenMultiplier=seed, intervalLength=300),
+        mirrorReadingSets=[
+            MirrorReadingSet(
+                mRID=f"{seed:x}{s:02x}",
+                timePeriod=DateTimeIntervalType(start=seed * 1000 + s, duration=300 * readings),
+                readings=[
+                    Reading(
+                        value=seed * 100 + s * 10 + r,
+                        qualityFlags="01",
+                        localID=f"{r:02x}",
+                        timePeriod=DateTimeIntervalType(start=seed * 1000 + s + r * 300, duration=300),
+                    )
+                    for r in range(readings)
+                ],
+            )
+            for s in range(sets)
+        ],
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024, 1024 * 1024])
+def test_iter_mirror_stream_mmr_list(chunk_size: int):
+    """Streams a MirrorMeterReadingList and checks that reassembling the streamed items matches a full parse"""
+    request = MirrorMeterReadingListRequest(mirrorMeterReadings=[generate_mmr(1, 2, 3), generate_mmr(2, 1, 5)])
+    xml = request.to_xml(skip_empty=False, exclude_none=True, exclude_unset=True)
+    expected = MirrorMeterReadingListRequest.from_xml(xml)
+
+    readings: list[Reading] = []
+    sets: list[MirrorReadingSet] = []
+    mmrs: list[MirrorMeterReading] = []
+    for item in iter_mirror_stream(BytesIO(xml), chunk_size=chunk_size):
+        assert item.mirror_usage_point_mrid is None
+        if isinstance(item.entity, Reading):
+            assert item.mirror_reading_set_mrid is not None
+            readings.append(item.entity)
+        elif isinstance(item.entity, MirrorReadingSet):
+            assert item.entity.readings is None, "Already streamed"
+            sets.append(item.entity)
+        else:
+            assert item.entity.mirrorReadingSets is None, "Already streamed"
+            assert item.mirror_meter_reading_mrid is None
+            mmrs.append(item.entity)
+
+    assert [m.mRID for m in mmrs] == [m.mRID for m in expected.mirrorMeterReadings]
+    assert [m.readingType for m in mmrs] == [m.readingType for m in expected.mirrorMeterReadings]
+    assert [s.mRID for s in sets] == [s.mRID for m in expected.mirrorMeterReadings for s in m.mirrorReadingSets]
+    assert readings == [r for m in expected.mirrorMeterReadings for s in m.mirrorReadingSets for r in s.readings]
+
+
+def test_iter_mirror_stream_mup():
+    """MirrorUsagePoint documents yield the MirrorUsagePoint (as the last item) and the enclosing mRIDs"""
+    mup = MirrorUsagePointRequest(
+        mRID="abcd",
+        deviceLFDI="ef01",
+        roleFlags="01",
+        serviceCategoryKind=ServiceKind.ELECTRICITY,
+        status=1,
+        mirrorMeterReadings=[generate_mmr(3, 1, 2)],
+    )
+    xml = mup.to_xml(skip_empty=False, exclude_none=True, exclude_unset=True)
+
+    items = list(iter_mirror_stream(xml))
+    assert [type(i.entity) for i in items] == [Reading, Reading, MirrorReadingSet, MirrorMeterReading, MirrorUsagePoint]
+    assert all(i.mirror_usage_point_mrid == "abcd" for i in items[:-1])
+    assert items[0].mirror_meter_reading_mrid == "03"
+    assert items[0].mirror_reading_set_mrid == "0300"
+    assert items[-1].entity.mRID == "abcd"
+    assert items[-1].entity.mirrorMeterReadings is None
+
+
+def test_mirror_stream_parser_incremental():
+    """Items should become available as soon as the elements close (before the document is complete)"""
+    xml = MirrorMeterReadingListRequest(mirrorMeterReadings=[generate_mmr(1, 1, 2)]).to_xml(exclude_none=True)
+    cutoff = xml.index(b"</Reading>") + len(b"</Reading>")
+
+    parser = MirrorStreamParser()
+    first = parser.feed(xml[:cutoff])
+    assert len(first) == 1 and isinstance(first[0].entity, Reading)
+
+    remaining = parser.feed(xml[cutoff:]) + parser.close()
+    assert [type(i.entity) for i in remaining] == [Reading, MirrorReadingSet, MirrorMeterReading]
+
+
+def test_mirror_stream_parser_truncated():
+    """An incomplete document should raise an error on close"""
+    xml = MirrorMeterReadingListRequest(mirrorMeterReadings=[generate_mmr(1, 1, 2)]).to_xml(exclude_none=True)
+    parser = MirrorStreamParser()
+    parser.feed(xml[:-10])
+    with pytest.raises(etree.XMLSyntaxError):
+        parser.close()
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1024])
+def test_iter_mirror_stream_batch_readings(chunk_size: int):
+    """With batch_readings the Readings of each set are only available as a ReadingBatch on the MirrorReadingSet"""
+    request = MirrorMeterReadingListRequest(mirrorMeterReadings=[generate_mmr(1, 2, 3), generate_mmr(2, 1, 5)])
+    xml = request.to_xml(skip_empty=False, exclude_none=True, exclude_unset=True)
+    expected = MirrorMeterReadingListRequest.from_xml(xml)
+
+    items = list(iter_mirror_stream(xml, chunk_size=chunk_size, batch_readings=True))
+    assert not any(isinstance(i.entity, Reading) for i in items)
+    assert all(i.readings is None for i in items if not isinstance(i.entity, MirrorReadingSet))
+
+    batches = [(i.entity.mRID, i.readings) for i in items if isinstance(i.entity, MirrorReadingSet)]
+    expected_sets = [s for m in expected.mirrorMeterReadings for s in m.mirrorReadingSets]
+    assert [mrid for mrid, _ in batches] == [s.mRID for s in expected_sets]
+    assert [b.to_readings() for _, b in batches] == [s.readings for s in expected_sets]
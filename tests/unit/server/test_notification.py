@@ -0,0 +1,190 @@
+import re
+
+import pytest
+from assertical.fake.generator import generate_class_instance, register_value_generator
+from lxml import etree
+
+from envoy_schema.server.schema.sep2.der import DERControlListResponse, DERControlResponse, DERStatus
+from envoy_schema.server.schema.sep2.end_device import EndDeviceResponse
+from envoy_schema.server.schema.sep2.identification import Resource
+from envoy_schema.server.schema.sep2 import notification
+from envoy_schema.server.schema.sep2.notification import (
+    NOTIFICATION_RESOURCE_TYPES,
+    limit_resource,
+    parse_notification,
+    render_notification,
+    render_notifications,
+    render_resource,
+)
+from envoy_schema.server.schema.sep2.pub_sub import (
+    Notification,
+    NotificationStatus,
+    Subscription,
+    SubscriptionEncoding,
+)
+
+
+def test_parse_notification_doe():
+    with open("tests/data/notification_doe.xml", "r") as fp:
+        raw = fp.read()
+
+    parsed = parse_notification(raw)
+    assert parsed.notification.resource is None
+    assert parsed.notification.subscriptionURI == "/edev/8/sub/5"
+    assert isinstance(parsed.resource, DERControlListResponse)
+    assert parsed.resource.type == "DERControlList"
+    assert parsed.resource.DERControl[0].DERControlBase_.opModStorageTargetW.value == 500
+
+    # Should be identical to the output from the NotificationResourceCombined workaround
+    assert render_notification(parsed.notification, parsed.resource) == Notification.from_xml(raw).to_xml(
+        skip_empty=False, exclude_none=True, exclude_unset=True
+    )
+
+
+def test_parse_notification_unknown_type():
+    """Unknown xsi:type values fall back to Resource (consistent with get_notification_resource_discriminator)"""
+    with open("tests/data/notification.xml", "r") as fp:
+        parsed = parse_notification(fp.read())
+
+    assert type(parsed.resource) is Resource
+    assert parsed.resource.href == "/my/list"
+
+
+def test_parse_notification_no_resource():
+    notif = Notification(
+        subscribedResource="/edev/1",
+        status=NotificationStatus.SUBSCRIPTION_CANCELLED_NO_INFO,
+        subscriptionURI="/edev/1/sub/2",
+    )
+    xml = render_notification(notif, None)
+    assert b"<Resource" not in xml
+    assert xml == notif.to_xml(skip_empty=False, exclude_none=True, exclude_unset=True)
+
+    parsed = parse_notification(xml)
+    assert parsed.resource is None
+    assert parsed.notification == notif
+
+
+@pytest.mark.parametrize("xsi_type, resource_type", NOTIFICATION_RESOURCE_TYPES.items())
+def test_render_notification_xsd_valid(
+    xsi_type: str, resource_type: type[Resource], csip_aus_schema: etree.XMLSchema, use_assertical_extensions
+):
+    """Each resource type should render as a XSD valid notification (with the correct xsi:type) and roundtrip"""
+    register_value_generator(int, lambda x: x % 64)
+    register_value_generator(str, lambda x: f"{x % 256:02x}")
+    resource = generate_class_instance(resource_type, generate_relationships=True, type=None)
+    notif = Notification(subscribedResource="/edev/1", status=NotificationStatus.DEFAULT, subscriptionURI="/sub/2")
+
+    # assertical will also populate the xsi:type of any child resources with nonsense (see test_xsd_models)
+    xml = re.sub(b' xsi:type="[0-9a-f]*"', b"", render_notification(notif, resource))
+    assert csip_aus_schema.validate(etree.fromstring(xml)), "\n".join(str(e) for e in csip_aus_schema.error_log)
+
+    parsed = parse_notification(xml)
+    assert type(parsed.resource) is resource_type
+    assert parsed.notification == notif
+    if xsi_type != "Resource":
+        assert parsed.resource.type == xsi_type
+    assert render_notification(parsed.notification, parsed.resource) == xml
+
+
+def test_render_resource_reuse():
+    """A rendered resource can be spliced into many notifications"""
+    resource = DERStatus(href="/edev/1/der/2/ders", readingTime=123)
+    rendered = render_resource(resource)
+    assert rendered.startswith(b'<Resource xsi:type="DERStatus"')
+
+    for i in range(3):
+        notif = Notification(subscribedResource="/edev/1", status=NotificationStatus.DEFAULT, subscriptionURI=f"/s/{i}")
+        assert render_notification(notif, rendered) == render_notification(notif, resource)
+
+
+def test_render_resource_unsupported():
+    with pytest.raises(ValueError):
+        render_resource(generate_class_instance(EndDeviceResponse))
+
+
+def generate_subscription(sub_id: int, limit: int) -> Subscription:
+    return Subscription(
+        href=f"/edev/{sub_id}/sub/{sub_id}",
+        subscribedResource="/edev/1/derp/2/derc",
+        encoding=SubscriptionEncoding.XML,
+        level="+S1",
+        limit=limit,
+        notificationURI=f"https://example.com/{sub_id}",
+    )
+
+
+def generate_der_control_list(count: int) -> DERControlListResponse:
+    return DERControlListResponse(
+        href="/edev/1/derp/2/derc",
+        all_=count,
+        results=count,
+        DERControl=[
+            DERControlResponse.model_validate(
+                {
+                    "mRID": f"{i:02x}",
+                    "creationTime": i,
+                    "interval": {"start": i * 300, "duration": 300},
+                    "EventStatus_": {"currentStatus": 0, "dateTime": i, "potentiallySuperseded": False},
+                    "DERControlBase_": {"opModExpLimW": {"value": i, "multiplier": 0}},
+                }
+            )
+            for i in range(count)
+        ],
+    )
+
+
+def test_limit_resource():
+    resource = generate_der_control_list(3)
+    assert limit_resource(resource, 3) is resource
+    assert limit_resource(resource, 10) is resource
+
+    limited = limit_resource(resource, 2)
+    assert limited.all_ == 3 and limited.results == 2
+    assert [c.mRID for c in limited.DERControl] == ["00", "01"]
+    assert len(resource.DERControl) == 3, "The original shouldn't be modified"
+
+    status = DERStatus(readingTime=1)
+    assert limit_resource(status, 0) is status, "Non list resources can't be limited"
+
+
+def test_render_notifications(monkeypatch):
+    """Each notification should match one rendered individually and the resource should only be rendered once per
+    distinct subscription limit"""
+    resource = generate_der_control_list(3)
+    subscriptions = [generate_subscription(i, limit) for i, limit in enumerate([1, 5, 1, 3, 0])]
+
+    render_count = 0
+    original_render_resource = notification.render_resource
+
+    def counting_render_resource(*args, **kwargs):
+        nonlocal render_count
+        render_count += 1
+        return original_render_resource(*args, **kwargs)
+
+    monkeypatch.setattr(notification, "render_resource", counting_render_resource)
+    results = list(render_notifications(resource, subscriptions, notification_href=lambda s: f"{s.href}/n"))
+    assert render_count == 3  # limits 1, 3 (5 is capped to the list length of 3) and 0
+
+    assert [s for s, _ in results] == subscriptions
+    for sub, xml in results:
+        parsed = parse_notification(xml)
+        assert parsed.notification.subscriptionURI == sub.href
+        assert parsed.notification.subscribedResource == sub.subscribedResource
+        assert parsed.notification.href == f"{sub.href}/n"
+        assert parsed.notification.status == NotificationStatus.DEFAULT
+        assert parsed.resource.all_ == 3
+        assert parsed.resource.results == min(sub.limit, 3)
+        assert len(parsed.resource.DERControl or []) == min(sub.limit, 3)
+
+        expected_envelope = Notification(
+            href=f"{sub.href}/n", subscribedResource=sub.subscribedResource, subscriptionURI=sub.href, status=0
+        )
+        assert xml == render_notification(expected_envelope, limit_resource(resource, sub.limit))
+
+
+def test_render_notifications_no_href():
+    sub = generate_subscription(1, 1)
+    sub.href = None
+    with pytest.raises(ValueError):
+        list(render_notifications(DERStatus(readingTime=1), [sub]))
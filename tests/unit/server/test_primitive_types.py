@@ -1,6 +1,20 @@
 import pytest
 
-from envoy_schema.server.schema.sep2.primitive_types import validate_HttpUri, validate_LocalAbsoluteUri
+from envoy_schema.server.schema.sep2.primitive_types import (
+    hex_binary_validator,
+    serialize_octet,
+    validate_HexBinary,
+    validate_HexBinary8,
+    validate_HexBinary16,
+    validate_HexBinary32,
+    validate_HexBinary48,
+    validate_HexBinary64,
+    validate_HexBinary128,
+    validate_HexBinary160,
+    validate_hex_binary_batch,
+    validate_HttpUri,
+    validate_LocalAbsoluteUri,
+)
 
 
 @pytest.mark.parametrize(
@@ -60,3 +74,62 @@ def test_local_uri(raw: str, valid: bool):
         else:
             with pytest.raises(ValueError):
                 validate_LocalAbsoluteUri(v)
+
+
+HEX_BINARY_VALIDATORS = [
+    (8, validate_HexBinary8),
+    (16, validate_HexBinary16),
+    (32, validate_HexBinary32),
+    (48, validate_HexBinary48),
+    (64, validate_HexBinary64),
+    (128, validate_HexBinary128),
+    (160, validate_HexBinary160),
+]
+HEX_VALUES = [
+    "0",
+    "1",
+    "a",
+    "FF",
+    "0f0",
+    "abcd",
+    "ABCDEF01",
+    "0" * 12,
+    "f" * 16,
+    "1" * 32,
+    "2" * 33,
+    "e" * 40,
+    "3" * 41,
+]
+NON_HEX_VALUES = ["", "g", "0xZZ", "12 34", "hello", "--1"]
+ODD_HEX_VALUES = [" ab ", "0x1f", "+1", "-1", "1_f"]  # These parse with int(v, 16) - they must stay valid
+
+
+@pytest.mark.parametrize("bits, length_validator", HEX_BINARY_VALIDATORS)
+@pytest.mark.parametrize("v", HEX_VALUES + NON_HEX_VALUES + ODD_HEX_VALUES)
+def test_hex_binary_validator(bits: int, length_validator, v: str):
+    """The fused validator must behave identically to validate_HexBinary followed by the length validator"""
+    try:
+        expected = length_validator(validate_HexBinary(v))
+        expected_error = None
+    except ValueError as exc:
+        expected_error = str(exc)
+
+    validate = hex_binary_validator(bits)
+    if expected_error is None:
+        assert validate(v) == expected
+        assert validate_hex_binary_batch([v], bits) == [serialize_octet(v)]
+    else:
+        with pytest.raises(ValueError) as exc_info:
+            validate(v)
+        assert str(exc_info.value) == expected_error
+
+        with pytest.raises(ValueError, match="Index 1"):
+            validate_hex_binary_batch(["00", v], bits)
+
+
+def test_validate_hex_binary_batch():
+    assert validate_hex_binary_batch([], 8) == []
+    assert validate_hex_binary_batch(["1", "ab", "abc", "0DEF"], 16) == ["01", "ab", "0abc", "0DEF"]
+    assert validate_hex_binary_batch((v for v in [" 1", "ab"]), 8) == ["01", "ab"]
+    with pytest.raises(ValueError, match="Index 2: HexBinary8 max length of 2."):
+        validate_hex_binary_batch(["1", "ab", "abc"], 8)
@@ -0,0 +1,101 @@
+from array import array
+from itertools import compress
+
+import pytest
+
+from envoy_schema.server.schema.sep2.metering import Reading
+from envoy_schema.server.schema.sep2.quality_flags import (
+    ESTIMATED_FLAGS,
+    any_estimated,
+    count_quality_flags,
+    decode_quality_flags,
+    encode_quality_flags,
+    exclude_forecast,
+    only_valid,
+    select_quality_flags,
+)
+from envoy_schema.server.schema.sep2.reading_batch import ReadingBatch
+from envoy_schema.server.schema.sep2.types import QualityFlagsType
+
+VALID = QualityFlagsType.VALID
+FORECAST = QualityFlagsType.FORECAST
+ESTIMATED_BY_DAY = QualityFlagsType.ESTIMATED_BY_DAY
+ESTIMATED_BY_LINEAR = QualityFlagsType.ESTIMATED_BY_LINEAR
+
+FLAGS = array(
+    "H",
+    [
+        0,
+        VALID,
+        VALID | FORECAST,
+        ESTIMATED_BY_DAY,
+        VALID | ESTIMATED_BY_LINEAR,
+        FORECAST,
+        0x8000 | VALID,  # Reserved high bit
+    ],
+)
+
+
+def test_decode_encode_quality_flags():
+    assert decode_quality_flags(["00", "1", "0041", None, "ff00"]) == array("H", [0, 1, 0x41, 0, 0xFF00])
+    assert decode_quality_flags([]) == array("H")
+    assert encode_quality_flags(array("H", [0, 1, 0x41, 0xFF00])) == ["00", "01", "41", "ff00"]
+
+    with pytest.raises(ValueError, match="Index 1"):
+        decode_quality_flags(["00", "12345"])
+    with pytest.raises(ValueError, match="Index 2"):
+        decode_quality_flags(["00", "01", "xx"])
+
+
+def test_predicate_helpers():
+    assert list(exclude_forecast(FLAGS)) == [1, 1, 0, 1, 1, 0, 1]
+    assert list(only_valid(FLAGS)) == [0, 1, 1, 0, 1, 0, 1]
+    assert list(any_estimated(FLAGS)) == [0, 0, 0, 1, 1, 0, 0]
+    assert list(compress(range(len(FLAGS)), only_valid(FLAGS))) == [1, 2, 4, 6]
+
+
+@pytest.mark.parametrize(
+    "all_of, any_of, none_of",
+    [
+        (0, 0, 0),
+        (VALID, 0, FORECAST),
+        (0, ESTIMATED_FLAGS, 0),
+        (VALID, ESTIMATED_FLAGS, FORECAST),
+        (0x8000, 0, 0),  # High byte predicates take the slow path
+        (0, 0, 0x8000 | FORECAST),
+    ],
+)
+def test_select_quality_flags_matches_per_row(all_of: int, any_of: int, none_of: int):
+    expected = [(v & all_of) == all_of and (any_of == 0 or (v & any_of) != 0) and (v & none_of) == 0 for v in FLAGS]
+    actual = select_quality_flags(FLAGS, all_of=all_of, any_of=any_of, none_of=none_of)
+    assert isinstance(actual, bytes)
+    assert list(actual) == [int(e) for e in expected]
+
+
+def test_select_quality_flags_invalid():
+    with pytest.raises(ValueError):
+        select_quality_flags(array("B", [1, 2]), all_of=VALID)
+
+
+def test_count_quality_flags():
+    counts = count_quality_flags(FLAGS)
+    assert counts[VALID] == 4
+    assert counts[FORECAST] == 2
+    assert counts[QualityFlagsType.QUESTIONABLE] == 0
+    assert QualityFlagsType.NONE not in counts
+
+
+def test_reading_batch_select():
+    readings = [
+        Reading(value=idx, qualityFlags=f"{flags:02x}", href=f"/r/{idx}" if idx % 2 else None)
+        for idx, flags in enumerate(FLAGS)
+    ]
+    batch = ReadingBatch.from_readings(readings)
+
+    selected = batch.select(exclude_forecast(batch.quality_flags))
+    assert selected.to_readings() == [readings[i] for i in (0, 1, 3, 4, 6)]
+    assert selected.extras == {1: {"href": "/r/1"}, 2: {"href": "/r/3"}}, "Rows are renumbered"
+    assert len(batch.select(bytes(len(batch)))) == 0
+
+    with pytest.raises(ValueError):
+        batch.select(b"\x01")
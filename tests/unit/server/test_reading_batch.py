@@ -0,0 +1,143 @@
+from array import array
+
+import pytest
+from lxml import etree
+
+from envoy_schema.server.schema.sep2.metering import Reading
+from envoy_schema.server.schema.sep2.metering_mirror import MirrorReadingSet
+from envoy_schema.server.schema.sep2.reading_batch import ReadingBatch, ReadingField, decode_hex16, encode_hex16
+from envoy_schema.server.schema.sep2.types import DateTimeIntervalType, SubscribableType
+
+READINGS = [
+    Reading(value=123, timePeriod=DateTimeIntervalType(start=1000, duration=300)),
+    Reading(
+        value=-(2**40),
+        qualityFlags="41",
+        touTier=3,
+        consumptionBlock=16,
+        localID="ff",
+        timePeriod=DateTimeIntervalType(start=1300, duration=300),
+    ),
+    Reading(),  # Everything defaulted
+    Reading(qualityFlags=None, touTier=None, consumptionBlock=None),  # Explicitly None
+    Reading(
+        value=0,
+        localID="0001",
+        href="/r/1",
+        subscribable=SubscribableType.resource_supports_non_conditional_subscriptions,
+    ),
+]
+
+
+def test_round_trip_readings():
+    batch = ReadingBatch.from_readings(READINGS)
+    assert len(batch) == len(READINGS)
+    assert batch.to_readings() == [
+        r.model_copy(update={"localID": "01"}) if r.localID == "0001" else r for r in READINGS
+    ], "Only localID '0001' is normalised to its shortest octet form"
+
+    assert batch.start == array("q", [1000, 1300, 0, 0, 0])
+    assert batch.value == array("q", [123, -(2**40), 0, 0, 0])
+    assert batch.quality_flags == array("H", [0, 0x41, 0, 0, 0])
+    assert batch.tou_tier == array("B", [0, 3, 0, 0, 0])
+    assert batch.consumption_block == array("B", [0, 16, 0, 0, 0])
+    assert batch.local_id == array("H", [0, 0xFF, 0, 0, 1])
+    assert batch.none_mask[0] == ReadingField.LOCAL_ID
+    assert batch.none_mask[1] == ReadingField.NONE
+    assert batch.none_mask[3] == ReadingField.TIME_PERIOD | ReadingField.VALUE | ReadingField.QUALITY_FLAGS | (
+        ReadingField.TOU_TIER | ReadingField.CONSUMPTION_BLOCK | ReadingField.LOCAL_ID
+    )
+    assert batch.extras == {4: {"href": "/r/1", "subscribable": 1}}
+
+
+def test_defaults_left_unset():
+    """Readings with default values shouldn't serialize any additional elements after a round trip"""
+    reading = ReadingBatch.from_readings([READINGS[0]]).reading(0)
+    assert reading.to_xml(exclude_unset=True) == READINGS[0].to_xml(exclude_unset=True)
+
+
+def test_explicit_defaults_round_trip():
+    """Fields explicitly set to their default value should still serialize after a round trip"""
+    readings = [
+        Reading(value=1, qualityFlags="00", touTier=0, consumptionBlock=0),
+        Reading(value=2, touTier=0),
+        Reading(value=3, qualityFlags="41"),
+        Reading(value=4),
+    ]
+    batch = ReadingBatch.from_readings(readings)
+    assert list(batch.set_mask) == [
+        ReadingField.QUALITY_FLAGS | ReadingField.TOU_TIER | ReadingField.CONSUMPTION_BLOCK,
+        ReadingField.TOU_TIER,
+        ReadingField.QUALITY_FLAGS,
+        ReadingField.NONE,
+    ]
+
+    round_tripped = batch.to_readings()
+    assert round_tripped == readings
+    assert [r.model_fields_set for r in round_tripped] == [r.model_fields_set for r in readings]
+    for reading, expected in zip(round_tripped, readings):
+        assert reading.to_xml(exclude_unset=True) == expected.to_xml(exclude_unset=True)
+
+    # The set state should survive decoding from XML and the other batch operations
+    for reading in readings:
+        element = etree.fromstring(reading.to_xml(exclude_unset=True))
+        from_element = ReadingBatch()
+        from_element.append_element(element)
+        assert from_element == ReadingBatch.from_readings([reading])
+    assert batch.take([3, 0]).set_mask == array("B", [batch.set_mask[3], batch.set_mask[0]])
+    assert ReadingBatch.concat([batch, batch]).to_readings() == readings * 2
+
+
+def test_reading_set_round_trip():
+    reading_set = MirrorReadingSet(
+        mRID="abcd", timePeriod=DateTimeIntervalType(start=1000, duration=600), readings=READINGS[:2]
+    )
+    batch = ReadingBatch.from_reading_set(reading_set)
+    assert batch.to_reading_set(reading_set.model_copy(update={"readings": None})) == reading_set
+    assert len(ReadingBatch.from_reading_set(reading_set.model_copy(update={"readings": None}))) == 0
+
+
+def test_append_element_matches_model_parse():
+    for reading in READINGS:
+        element = etree.fromstring(reading.to_xml(skip_empty=False, exclude_none=True, exclude_unset=True))
+        from_element = ReadingBatch()
+        from_element.append_element(element)
+        assert from_element == ReadingBatch.from_readings([Reading.from_xml_tree(element)])
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "<value>abc</value>",
+        "<qualityFlags>12345</qualityFlags>",
+        "<qualityFlags>zz</qualityFlags>",
+        "<touTier>99</touTier>",
+        "<timePeriod><start>1</start></timePeriod>",
+        "<value>99999999999999999999999</value>",
+    ],
+)
+def test_append_element_invalid(body: str):
+    batch = ReadingBatch.from_readings(READINGS[:1])
+    element = etree.fromstring(f'<Reading xmlns="urn:ieee:std:2030.5:ns">{body}</Reading>')
+    with pytest.raises(ValueError):
+        batch.append_element(element)
+    assert len(batch) == 1
+    assert all(len(getattr(batch, c)) == 1 for c in ReadingBatch.__slots__ if c != "extras")
+
+
+@pytest.mark.parametrize("value, encoded", [(0, "00"), (1, "01"), (0xAB, "ab"), (0x100, "0100"), (0xFFFF, "ffff")])
+def test_hex16(value: int, encoded: str):
+    assert encode_hex16(value) == encoded
+    assert decode_hex16(encoded) == value
+
+
+def test_take_and_concat():
+    batch = ReadingBatch.from_readings(READINGS)
+    assert batch.take([4, 0, 4]).to_readings() == [batch.reading(4), batch.reading(0), batch.reading(4)]
+    assert batch.take([4, 0, 4]).extras == {0: batch.extras[4], 2: batch.extras[4]}
+    assert len(batch.take([])) == 0
+
+    combined = ReadingBatch.concat([batch, ReadingBatch(), batch])
+    assert len(combined) == 2 * len(batch)
+    assert combined.to_readings() == batch.to_readings() * 2
+    assert combined.extras == {4: batch.extras[4], 9: batch.extras[4]}
@@ -0,0 +1,95 @@
+from array import array
+
+from envoy_schema.server.schema.sep2.metering import Reading, ReadingType
+from envoy_schema.server.schema.sep2.metering_mirror import (
+    MirrorMeterReading,
+    MirrorMeterReadingListRequest,
+    MirrorReadingSet,
+)
+from envoy_schema.server.schema.sep2.reading_batch import ReadingBatch
+from envoy_schema.server.schema.sep2.reading_index import (
+    ReadingDuplicate,
+    ReadingGap,
+    ReadingOverlap,
+    index_mirror_reading_list,
+    index_reading_batch,
+)
+from envoy_schema.server.schema.sep2.types import DateTimeIntervalType
+
+
+def reading_set(mrid: str, *readings: tuple[int, int, int]) -> MirrorReadingSet:
+    """readings are (start, value, local_id) - every reading is 300 seconds long"""
+    return MirrorReadingSet(
+        mRID=mrid,
+        timePeriod=DateTimeIntervalType(start=readings[0][0], duration=300 * len(readings)),
+        readings=[
+            Reading(value=v, localID=f"{lid:02x}", timePeriod=DateTimeIntervalType(start=s, duration=300))
+            for s, v, lid in readings
+        ],
+    )
+
+
+def test_index_mirror_reading_list():
+    request = MirrorMeterReadingListRequest(
+        mirrorMeterReadings=[
+            MirrorMeterReading(
+                mRID="aa",
+                readingType=ReadingType(intervalLength=300),
+                mirrorReadingSets=[reading_set("01", (0, 1, 0), (300, 2, 0), (600, 3, 0))],
+            ),
+            MirrorMeterReading(mRID="bb", mirrorReadingSets=[reading_set("02", (0, 10, 0), (400, 11, 0))]),
+            MirrorMeterReading(
+                mRID="aa",
+                mirrorReadingSets=[
+                    reading_set("03", (600, 99, 0), (900, 4, 0)),  # Re-posted window
+                    reading_set("04", (2100, 5, 0), (2200, 6, 0)),  # 1200s gap then an overlap
+                    reading_set("05", (900, 7, 1)),  # Same start - different localID
+                ],
+            ),
+        ]
+    )
+    indexes = index_mirror_reading_list(request)
+    assert [i.mirror_meter_reading_mrid for i in indexes] == ["aa", "bb"]
+
+    aa, bb = indexes
+    assert aa.interval_length == 300
+    assert list(aa.readings.start) == [0, 300, 600, 900, 900, 2100, 2200]
+    assert list(aa.readings.value) == [1, 2, 3, 4, 7, 5, 6], "First posted duplicate is kept"
+    assert aa.duplicates == [
+        ReadingDuplicate(start=600, local_id=0, mirror_reading_set_mrid="03", kept_mirror_reading_set_mrid="01")
+    ]
+    assert aa.overlaps == [
+        ReadingOverlap(start=900, overlap_seconds=300),
+        ReadingOverlap(start=2200, overlap_seconds=200),
+    ]
+    assert aa.gaps == [ReadingGap(start=1200, end=2100, missing_intervals=3)]
+    assert aa.untimed == 0
+
+    assert bb.interval_length is None
+    assert bb.duplicates == [] and bb.overlaps == []
+    assert bb.gaps == [ReadingGap(start=300, end=400, missing_intervals=None)]
+
+
+def test_index_reading_batch_gap_threshold():
+    """Gaps shorter than intervalLength aren't reported. Untimed readings are excluded"""
+    batch = ReadingBatch.from_readings(
+        [
+            Reading(value=1, timePeriod=DateTimeIntervalType(start=0, duration=300)),
+            Reading(value=2),
+            Reading(value=3, timePeriod=DateTimeIntervalType(start=310, duration=300)),
+            Reading(value=4, timePeriod=DateTimeIntervalType(start=1210, duration=300)),
+        ]
+    )
+    index = index_reading_batch("aa", batch, ["01"], array("I", [0] * 4), interval_length=300)
+    assert index.untimed == 1
+    assert list(index.readings.value) == [1, 3, 4]
+    assert index.gaps == [ReadingGap(start=610, end=1210, missing_intervals=2)]
+    assert index.duplicates == [] and index.overlaps == []
+
+
+def test_index_empty():
+    request = MirrorMeterReadingListRequest(mirrorMeterReadings=[MirrorMeterReading(mRID="aa")])
+    (index,) = index_mirror_reading_list(request)
+    assert len(index.readings) == 0
+    assert index.duplicates == [] and index.overlaps == [] and index.gaps == []
+    assert index_mirror_reading_list(MirrorMeterReadingListRequest()) == []
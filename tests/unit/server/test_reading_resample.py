@@ -0,0 +1,150 @@
+from array import array
+
+import pytest
+
+from envoy_schema.server.schema.sep2.metering import Reading, ReadingType
+from envoy_schema.server.schema.sep2.reading_batch import ReadingBatch
+from envoy_schema.server.schema.sep2.reading_resample import (
+    AGGREGATE_MAX,
+    AGGREGATE_MEAN,
+    AGGREGATE_MIN,
+    AGGREGATE_SUM,
+    get_aggregate,
+    resample_intervals,
+    resample_readings,
+)
+from envoy_schema.server.schema.sep2.types import AccumulationBehaviourType, DataQualifierType, DateTimeIntervalType
+
+
+def columns(*rows: tuple[int, int, int]) -> tuple[array, array, array]:
+    return (array("q", [r[0] for r in rows]), array("q", [r[1] for r in rows]), array("q", [r[2] for r in rows]))
+
+
+@pytest.mark.parametrize(
+    "accumulation_behaviour, data_qualifier, expected",
+    [
+        (AccumulationBehaviourType.CUMULATIVE, None, (True, AGGREGATE_SUM)),
+        (AccumulationBehaviourType.SUMMATION, DataQualifierType.AVERAGE, (True, AGGREGATE_SUM)),
+        (AccumulationBehaviourType.DELTA_DATA, None, (False, AGGREGATE_SUM)),
+        (AccumulationBehaviourType.INSTANTANEOUS, DataQualifierType.AVERAGE, (False, AGGREGATE_MEAN)),
+        (None, None, (False, AGGREGATE_MEAN)),
+        (AccumulationBehaviourType.INDICATING, DataQualifierType.MAXIMUM, (False, AGGREGATE_MAX)),
+        (AccumulationBehaviourType.INSTANTANEOUS, DataQualifierType.MINIMUM, (False, AGGREGATE_MIN)),
+    ],
+)
+def test_get_aggregate(accumulation_behaviour, data_qualifier, expected):
+    assert get_aggregate(accumulation_behaviour, data_qualifier) == expected
+
+
+def test_get_aggregate_invalid():
+    with pytest.raises(ValueError):
+        get_aggregate(AccumulationBehaviourType.INSTANTANEOUS, DataQualifierType.STD_DEVIATION_OF_SAMPLE)
+
+
+def test_resample_delta_downsample():
+    """5 minute deltas summed into 15 minute buckets (input unsorted, with a missing interval)"""
+    rows = columns((600, 300, 3), (0, 300, 1), (300, 300, 2), (1200, 300, 5))
+    result = resample_intervals(*rows, 900, accumulation_behaviour=AccumulationBehaviourType.DELTA_DATA)
+    assert result.width == 900 and result.aggregate == AGGREGATE_SUM
+    assert list(result.start) == [0, 900]
+    assert list(result.value) == [6.0, 5.0]
+    assert list(result.coverage) == [900, 300]
+
+
+def test_resample_delta_upsample():
+    """A 30 minute delta is apportioned (by time) over 5 minute buckets. origin shifts the bucket alignment"""
+    rows = columns((100, 1800, 60))
+    result = resample_intervals(*rows, 300, accumulation_behaviour=AccumulationBehaviourType.DELTA_DATA, origin=100)
+    assert list(result.start) == [100, 400, 700, 1000, 1300, 1600]
+    assert list(result.value) == [10.0] * 6
+
+    result = resample_intervals(*rows, 900, accumulation_behaviour=AccumulationBehaviourType.DELTA_DATA)
+    assert list(result.start) == [0, 900, 1800]
+    assert list(result.value) == pytest.approx([800 / 1800 * 60, 30.0, 100 / 1800 * 60])
+    assert list(result.coverage) == [800, 900, 100]
+
+
+def test_resample_cumulative():
+    """Cumulative registers are diffed (the first reading is only the baseline)"""
+    rows = columns((0, 300, 1000), (300, 300, 1010), (600, 300, 1030), (900, 300, 1031), (1200, 300, 1100))
+    result = resample_intervals(*rows, 900, accumulation_behaviour=AccumulationBehaviourType.CUMULATIVE)
+    assert list(result.start) == [0, 900]
+    assert list(result.value) == [30.0, 70.0]
+
+
+def test_resample_cumulative_snapshots():
+    """Zero duration register snapshots - each change belongs to the period since the previous snapshot"""
+    rows = columns((0, 0, 1000), (300, 0, 1010), (600, 0, 1030))
+    result = resample_intervals(*rows, 300, accumulation_behaviour=AccumulationBehaviourType.CUMULATIVE)
+    assert list(result.start) == [0, 300]
+    assert list(result.value) == [10.0, 20.0]
+    assert list(result.coverage) == [300, 300]
+
+    # A missing snapshot (at 900) spreads the change over the gap rather than a single interval
+    rows = columns((0, 0, 1000), (300, 0, 1010), (1200, 0, 1040), (1500, 0, 1041))
+    result = resample_intervals(*rows, 300, accumulation_behaviour=AccumulationBehaviourType.SUMMATION)
+    assert list(result.start) == [0, 300, 600, 900, 1200]
+    assert list(result.value) == [10.0, 10.0, 10.0, 10.0, 1.0]
+
+
+def test_resample_cumulative_gap():
+    """Interval readings with a missing interval - the change after the gap covers the missing interval too"""
+    rows = columns((0, 300, 1000), (300, 300, 1010), (900, 300, 1070))
+    result = resample_intervals(*rows, 300, accumulation_behaviour=AccumulationBehaviourType.CUMULATIVE)
+    assert list(result.start) == [300, 600, 900]
+    assert list(result.value) == [10.0, 30.0, 30.0]
+
+
+def test_resample_cumulative_reset():
+    """A decreasing register (rollover / meter reset) drops that period and re-baselines rather than spreading a
+    large negative change"""
+    rows = columns((0, 300, 99990), (300, 300, 99995), (600, 300, 4), (900, 300, 10), (1200, 300, 10))
+    result = resample_intervals(*rows, 300, accumulation_behaviour=AccumulationBehaviourType.CUMULATIVE)
+    assert list(result.start) == [300, 900, 1200]
+    assert list(result.value) == [5.0, 6.0, 0.0]
+    assert list(result.coverage) == [300, 300, 300]
+
+    # Snapshots with a reset to 0 and a gap after it
+    rows = columns((0, 0, 500), (300, 0, 0), (900, 0, 30))
+    result = resample_intervals(*rows, 300, accumulation_behaviour=AccumulationBehaviourType.SUMMATION)
+    assert list(result.start) == [300, 600]
+    assert list(result.value) == [15.0, 15.0]
+    assert all(v >= 0 for v in result.value)
+
+
+def test_resample_instantaneous():
+    rows = columns((0, 300, 10), (300, 600, 40), (900, 0, 7))
+    mean = resample_intervals(*rows, 900, data_qualifier=DataQualifierType.AVERAGE)
+    assert list(mean.start) == [0, 900]
+    assert list(mean.value) == [30.0, 7.0], "Time weighted - zero duration is a 1 second sample"
+    assert list(mean.coverage) == [900, 1]
+
+    assert list(resample_intervals(*rows, 900, data_qualifier=DataQualifierType.MAXIMUM).value) == [40.0, 7.0]
+    assert list(resample_intervals(*rows, 900, data_qualifier=DataQualifierType.MINIMUM).value) == [10.0, 7.0]
+
+
+def test_resample_invalid():
+    with pytest.raises(ValueError):
+        resample_intervals(*columns((0, 300, 1)), 0)
+    with pytest.raises(ValueError):
+        resample_intervals(array("q", [1]), array("q"), array("q"), 300)
+
+
+def test_resample_readings():
+    batch = ReadingBatch.from_readings(
+        [
+            Reading(value=1, timePeriod=DateTimeIntervalType(start=0, duration=300)),
+            Reading(timePeriod=DateTimeIntervalType(start=300, duration=300)),
+            Reading(value=100),
+            Reading(value=2, timePeriod=DateTimeIntervalType(start=600, duration=300)),
+        ]
+    )
+    result = resample_readings(
+        batch, ReadingType(accumulationBehaviour=AccumulationBehaviourType.DELTA_DATA, intervalLength=300), 1800
+    )
+    assert list(result.start) == [0]
+    assert list(result.value) == [3.0]
+    assert list(result.coverage) == [600]
+
+    empty = resample_readings(ReadingBatch(), ReadingType(), 300)
+    assert len(empty.start) == len(empty.value) == len(empty.coverage) == 0
@@ -0,0 +1,194 @@
+from itertools import product
+
+import pytest
+from assertical.fake.generator import generate_class_instance
+from pydantic_xml import BaseXmlModel
+
+from envoy_schema.server.schema.sep2.base import BaseXmlModelWithNS
+from envoy_schema.server.schema.sep2.der import DERControlListResponse, DERControlResponse
+from envoy_schema.server.schema.sep2.end_device import EndDeviceListResponse, EndDeviceResponse
+from envoy_schema.server.schema.sep2.identification import Resource
+from envoy_schema.server.schema.sep2.metering import Reading, ReadingListResponse
+from envoy_schema.server.schema.sep2.metering_mirror import MirrorUsagePoint, MirrorUsagePointListResponse
+from envoy_schema.server.schema.sep2.pub_sub import (
+    Notification,
+    NotificationResourceCombined,
+    Subscription,
+    SubscriptionListResponse,
+)
+from envoy_schema.server.schema.sep2.serialization import (
+    escape_attribute,
+    escape_text,
+    get_plan,
+    iter_list_xml_chunks,
+)
+from tests.unit.server.test_xsd_models import import_all_classes_from_module
+
+ALL_XML_CLASSES = [
+    c for c in import_all_classes_from_module("envoy_schema.server.schema") if c is not BaseXmlModelWithNS
+]
+
+
+@pytest.mark.parametrize("xml_class", ALL_XML_CLASSES)
+def test_every_model_has_plan(xml_class: type[BaseXmlModelWithNS]):
+    """Every sep2/csip-aus model should be simple enough to have a compiled serialization plan"""
+    plan = get_plan(xml_class)
+    assert plan is not None
+    assert plan.model_type is xml_class
+
+
+def test_subclass_does_not_inherit_plan():
+    """Subclasses must compile their own plan (not inherit the parent plan)"""
+    assert get_plan(Resource) is not get_plan(EndDeviceResponse)
+    assert get_plan(EndDeviceResponse).tag == "EndDevice"
+
+
+@pytest.mark.parametrize(
+    "xml_class, optional_is_none, skip_empty, exclude_none, exclude_unset",
+    [
+        (c, *flags)
+        for c, flags in product(ALL_XML_CLASSES, product([True, False], [True, False], [True, False], [True, False]))
+    ],
+)
+def test_to_xml_bytes_matches_to_xml(
+    xml_class: type[BaseXmlModel], optional_is_none: bool, skip_empty: bool, exclude_none: bool, exclude_unset: bool
+):
+    """The precompiled plan must produce byte identical output to the pydantic-xml implementation"""
+    entity = generate_class_instance(xml_class, optional_is_none=optional_is_none, generate_relationships=True)
+
+    expected = entity.to_xml(skip_empty=skip_empty, exclude_none=exclude_none, exclude_unset=exclude_unset)
+    actual = entity.to_xml_bytes(skip_empty=skip_empty, exclude_none=exclude_none, exclude_unset=exclude_unset)
+    assert isinstance(actual, bytes)
+    assert actual == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "plain",
+        "",
+        'quote" amp& lt< gt>',
+        "newline\n tab\t cr\r",
+        "non ascii é 😀",
+        "&amp; already escaped",
+    ],
+)
+def test_to_xml_bytes_escaping(text: str):
+    """Tests text/attributes with characters requiring escaping are encoded identically to lxml"""
+    entity: DERControlListResponse = generate_class_instance(
+        DERControlListResponse, optional_is_none=False, generate_relationships=True, href=f"/list/{text}"
+    )
+    entity.DERControl[0].description = text
+
+    expected = entity.to_xml(skip_empty=False, exclude_none=True, exclude_unset=True)
+    assert entity.to_xml_bytes(skip_empty=False, exclude_none=True, exclude_unset=True) == expected
+
+
+def test_to_xml_bytes_invalid_chars():
+    """Control characters can't be encoded in XML - ensure we raise the same error type as lxml"""
+    entity: Resource = generate_class_instance(Resource, href="/bad/\x01/href")
+    with pytest.raises(ValueError):
+        entity.to_xml()
+    with pytest.raises(ValueError):
+        entity.to_xml_bytes()
+
+
+def test_to_xml_bytes_notification():
+    """Sanity check that a real document roundtrips via the plan"""
+    with open("tests/data/notification_doe.xml", "r") as fp:
+        original_xml = fp.read()
+
+    notif = Notification.from_xml(original_xml)
+    xml = notif.to_xml_bytes(exclude_none=True)
+    assert xml == notif.to_xml(exclude_none=True)
+    assert Notification.from_xml(xml).model_dump() == notif.model_dump()
+
+
+@pytest.mark.parametrize(
+    "raw, text, attribute",
+    [
+        ("abc", "abc", "abc"),
+        ("a&b", "a&amp;b", "a&amp;b"),
+        ('<">', '&lt;"&gt;', "&lt;&quot;&gt;"),
+        ("\r\n\t", "&#13;\n\t", "&#13;&#10;&#9;"),
+    ],
+)
+def test_escape(raw: str, text: str, attribute: str):
+    assert escape_text(raw) == text
+    assert escape_attribute(raw) == attribute
+
+
+@pytest.mark.parametrize(
+    "list_type, list_field, item_type, header",
+    [
+        (EndDeviceListResponse, "EndDevice", EndDeviceResponse, {"pollRate": 60, "subscribable": 1}),
+        (DERControlListResponse, "DERControl", DERControlResponse, {"href": "/edev/1/derp/2/derc"}),
+        (ReadingListResponse, "Readings", Reading, {}),
+        (MirrorUsagePointListResponse, "mirrorUsagePoints", MirrorUsagePoint, {"href": "/mup"}),
+        (SubscriptionListResponse, "subscriptions", Subscription, {"pollRate": 900}),
+    ],
+)
+@pytest.mark.parametrize("item_count, chunk_size", [(0, 1), (1, 1), (5, 1), (5, 200), (20, 1024 * 1024)])
+@pytest.mark.parametrize("exclude_none", [True, False])
+def test_iter_list_xml_chunks(
+    list_type: type,
+    list_field: str,
+    item_type: type,
+    header: dict,
+    item_count: int,
+    chunk_size: int,
+    exclude_none: bool,
+):
+    """Concatenated chunks must match the equivalent (fully materialised) list serialization"""
+    items = [
+        generate_class_instance(item_type, seed=i * 1001, optional_is_none=(i % 2 == 0), generate_relationships=True)
+        for i in range(item_count)
+    ]
+    header = {"all_": item_count + 10, "results": item_count, **header}
+
+    chunks = list(
+        iter_list_xml_chunks(
+            list_type,
+            iter(items),
+            chunk_size=chunk_size,
+            skip_empty=False,
+            exclude_none=exclude_none,
+            exclude_unset=True,
+            **header,
+        )
+    )
+    assert all(isinstance(c, bytes) for c in chunks)
+    if chunk_size == 1:
+        assert len(chunks) == item_count + 1, "Every element should be in its own chunk (plus the closing tag)"
+
+    expected = list_type(**header, **{list_field: items}).to_xml(
+        skip_empty=False, exclude_none=exclude_none, exclude_unset=True
+    )
+    assert b"".join(chunks) == expected
+
+
+def test_iter_list_xml_chunks_errors():
+    with pytest.raises(ValueError):
+        list(iter_list_xml_chunks(EndDeviceListResponse, [], list_field="foo", all_=0, results=0))
+    with pytest.raises(ValueError):
+        list(iter_list_xml_chunks(EndDeviceListResponse, [], EndDevice=[], all_=0, results=0))
+
+
+def test_render_spliced():
+    plan = get_plan(Notification)
+    notif = Notification(subscribedResource="/edev/1", status=0, subscriptionURI="/edev/1/sub/2", href="/n")
+    spliced = plan.render_spliced(
+        notif, {"resource": b"<Resource/>", "newResourceURI": b"<newResourceURI>/a</newResourceURI>"}, exclude_none=True
+    )
+    expected = Notification(
+        subscribedResource="/edev/1",
+        status=0,
+        subscriptionURI="/edev/1/sub/2",
+        href="/n",
+        newResourceURI="/a",
+        resource=NotificationResourceCombined(),
+    )
+    assert spliced == expected.to_xml(exclude_none=True)
+
+    with pytest.raises(ValueError):
+        plan.render_spliced(notif, {"href": b"/foo"})
@@ -0,0 +1,159 @@
+from datetime import date, time
+from urllib.parse import quote
+
+import pytest
+
+from envoy_schema.server.schema import uri
+from envoy_schema.server.schema.uri_router import (
+    UriMatch,
+    UriRouter,
+    default_router,
+    parse_date,
+    parse_id,
+    parse_signed_int,
+    parse_time,
+)
+from envoy_schema.server.schema.uri_template import URI_TEMPLATES, UriTemplate, compile_uri
+
+
+@pytest.mark.parametrize("name, uri_template", [(n, t) for n, t in URI_TEMPLATES.items() if t.template])
+def test_default_router_roundtrip(name: str, uri_template: UriTemplate):
+    """Every (non empty) uri.py template should route back to itself with the original parameters"""
+    raw = {"rate_component_id": "2024-02-29", "tti_id": "13:05", "sep2_price": -12345}
+    expected = {"rate_component_id": date(2024, 2, 29), "tti_id": time(13, 5), "sep2_price": -12345}
+    params = {p: raw.get(p, i * 11 + 1) for i, p in enumerate(uri_template.parameters)}
+    assert default_router().match(uri_template.build(**params)) == UriMatch(
+        name, uri_template.template, {p: expected.get(p, v) for p, v in params.items()}
+    )
+
+
+@pytest.mark.parametrize("sep2_price", [-1500, 0, 27])
+def test_default_router_pricing(sep2_price: int):
+    """Pricing uris (built from uri.py) identify resources by date, time of day and (signed) price"""
+    params = {"site_id": 1, "tariff_id": 2, "rate_component_id": "2023-01-02", "pricing_reading": 3, "tti_id": "00:30"}
+    expected = {**params, "rate_component_id": date(2023, 1, 2), "tti_id": time(0, 30), "sep2_price": sep2_price}
+
+    match = default_router().match(uri.ConsumptionTariffIntervalUri.format(**params, sep2_price=sep2_price))
+    assert match == UriMatch("ConsumptionTariffIntervalUri", uri.ConsumptionTariffIntervalUri, expected)
+    match = default_router().match(uri.ConsumptionTariffIntervalListUri.format(**params, sep2_price=sep2_price))
+    assert match == UriMatch("ConsumptionTariffIntervalListUri", uri.ConsumptionTariffIntervalListUri, expected)
+
+    match = default_router().match(uri.TimeTariffIntervalUri.format(**params))
+    assert match is not None and match.params["tti_id"] == time(0, 30)
+    assert default_router().match(uri.RateComponentUri.format(**params)).params["rate_component_id"] == date(2023, 1, 2)
+
+    assert default_router().match(uri.RateComponentUri.format(**{**params, "rate_component_id": 5})) is None
+    assert default_router().match(uri.TimeTariffIntervalUri.format(**{**params, "tti_id": "25:00"})) is None
+
+
+PRICING_TEMPLATES = [
+    t for t in URI_TEMPLATES.values() if {"rate_component_id", "tti_id", "sep2_price"} & set(t.parameters)
+]
+
+
+@pytest.mark.parametrize("uri_template", PRICING_TEMPLATES, ids=lambda t: t.name)
+@pytest.mark.parametrize(
+    "encode",
+    [
+        lambda v: v,
+        lambda v: quote(v, safe=""),  # eg "13:05" -> "13%3A05"
+        lambda v: quote(v, safe="").lower(),  # Lower case hex digits eg "13%3a05"
+        lambda v: "".join(f"%{b:02X}" for b in v.encode()),  # Every character escaped
+    ],
+)
+def test_default_router_pricing_percent_encoded(uri_template: UriTemplate, encode):
+    """Percent-encoded pricing parameters (eg a ':' in tti_id) should route back to the same values as unencoded"""
+    raw = {"rate_component_id": "2024-02-29", "tti_id": "13:05", "sep2_price": "-1500"}
+    expected = {"rate_component_id": date(2024, 2, 29), "tti_id": time(13, 5), "sep2_price": -1500}
+    params = {p: raw.get(p, str(i + 1)) for i, p in enumerate(uri_template.parameters)}
+
+    path = uri_template.build(**{p: encode(v) for p, v in params.items()})
+    assert default_router().match(path) == UriMatch(
+        uri_template.name,
+        uri_template.template,
+        {p: expected[p] if p in expected else int(v) for p, v in params.items()},
+    )
+    assert default_router().match(path.replace("/rc/", "/r%63/")).name == uri_template.name  # Encoded literal
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("/edev/12/derp/3/derc/99", ("DERControlUri", {"site_id": 12, "der_program_id": 3, "derc_id": 99})),
+        ("/edev/12/derp/3/derc?s=0&l=10", ("DERControlListUri", {"site_id": 12, "der_program_id": 3})),
+        ("/edev/1/cfg/prcfg#frag", ("PriceResponseCfgListUri", {"site_id": 1})),
+        ("/edev", ("EndDeviceListUri", {})),
+        ("/edev/12/derp/3/derc/abc", None),  # Not an id
+        ("/edev/12/derp/3/derc/-1", None),  # Not an id
+        ("/edev/12/derp/3/derc/ 1", None),  # Not an id
+        ("/edev/12/derp/3/derc/99/", None),  # Trailing slash
+        ("/edev//cp", None),  # Empty parameter
+        ("/edev/1%2F2/cp", None),  # An encoded "/" doesn't split a segment
+        ("/edev/%31%32/derp/3/derc/99", ("DERControlUri", {"site_id": 12, "der_program_id": 3, "derc_id": 99})),
+        ("/edev/1/unknown", None),
+        ("edev/1", None),
+        ("", None),
+        ("/", None),
+    ],
+)
+def test_default_router_match(path: str, expected):
+    match = default_router().match(path)
+    if expected is None:
+        assert match is None
+    else:
+        assert (match.name, match.params) == expected
+        assert match.template == getattr(uri, expected[0])
+
+
+def test_router_converters():
+    router = UriRouter(
+        [compile_uri("/a/{a_id}/b/{price}"), compile_uri("/a/{a_id}/c"), compile_uri("/a/{a_id}")],
+        converters={"price": float},
+        default_converter=str,
+    )
+    assert router.match("/a/x/b/1.5") == UriMatch(None, "/a/{a_id}/b/{price}", {"a_id": "x", "price": 1.5})
+    assert router.match("/a/c/c").params == {"a_id": "c"}
+    assert router.match("/a/x/b/y") is None  # float conversion fails
+
+    # Literals have precedence over parameters
+    router.add(compile_uri("/a/special"))
+    assert router.match("/a/special").template == "/a/special"
+    assert router.match("/a/special/c") is None, "No backtracking"
+
+
+@pytest.mark.parametrize("template", ["/a/{x}b", "/a/b{x}", "/a/{x}{y}", "/a/{x:03d}"])
+def test_router_unsupported(template: str):
+    with pytest.raises(ValueError):
+        UriRouter([compile_uri(template)])
+
+
+def test_router_ambiguous():
+    with pytest.raises(ValueError):
+        UriRouter([compile_uri("/a/{x}"), compile_uri("/a/{y}")])
+
+
+def test_parse_id():
+    assert parse_id("0") == 0
+    assert parse_id("0123") == 123
+    for bad in ["", "+1", "-1", "1_0", " 1", "1.0", "١"]:
+        with pytest.raises(ValueError):
+            parse_id(bad)
+
+
+def test_parse_signed_int():
+    assert parse_signed_int("-0012") == -12
+    assert parse_signed_int("7") == 7
+    for bad in ["", "+1", "--1", "1-", " 1", "1.0", "١"]:
+        with pytest.raises(ValueError):
+            parse_signed_int(bad)
+
+
+def test_parse_date_time():
+    assert parse_date("2023-12-31") == date(2023, 12, 31)
+    assert parse_time("23:59") == time(23, 59)
+    for bad in ["", "20231231", "2023-2-01", "2023-02-30", "2023-01-01T00:00"]:
+        with pytest.raises(ValueError):
+            parse_date(bad)
+    for bad in ["", "1:00", "24:00", "12:60", "12:00:00", "1200"]:
+        with pytest.raises(ValueError):
+            parse_time(bad)
@@ -0,0 +1,66 @@
+import pytest
+
+from envoy_schema.server.schema import uri
+from envoy_schema.server.schema.uri_template import URI_TEMPLATES, UriTemplate, compile_uri
+
+
+@pytest.mark.parametrize("name, uri_template", URI_TEMPLATES.items())
+def test_uri_templates_match_format(name: str, uri_template: UriTemplate):
+    """Every uri.py template should build identically to str.format"""
+    assert uri_template.template == getattr(uri, name)
+    assert uri_template.name == name
+
+    params = {p: i + 10 for i, p in enumerate(uri_template.parameters)}
+    expected = uri_template.template.format(**params)
+    assert uri_template.build(**params) == expected
+
+    if uri_template.parameters:
+        param = uri_template.parameters[-1]
+        shared = {k: v for k, v in params.items() if k != param}
+        assert uri_template.build_many([params[param]], **shared) == [expected]
+
+
+def test_build_many():
+    t = compile_uri(uri.DERControlUri)
+    assert t is URI_TEMPLATES["DERControlUri"]
+    assert t.build_many([3, "a", 5], site_id=1, der_program_id=2) == [
+        uri.DERControlUri.format(site_id=1, der_program_id=2, derc_id=v) for v in [3, "a", 5]
+    ]
+    assert t.build_many([], site_id=1, der_program_id=2) == []
+
+    # Parameters in the middle of the template
+    assert t.build_many((v for v in [7, 8]), param="site_id", der_program_id=2, derc_id=3) == [
+        "/edev/7/derp/2/derc/3",
+        "/edev/8/derp/2/derc/3",
+    ]
+
+
+def test_uncommon_templates():
+    t = compile_uri("/a/{{literal}}/{x:03d}/{y}/{x}")
+    assert t.parameters == ("x", "y")
+    assert t.build(x=4, y="b") == "/a/{literal}/004/b/4"
+    assert t.build_many([4, 5], param="x", y="b") == ["/a/{literal}/004/b/4", "/a/{literal}/005/b/5"]
+    assert t.build_many([1, 2], param="y", x=3) == ["/a/{literal}/003/1/3", "/a/{literal}/003/2/3"]
+
+    quoted = "/a'\"\\{{b}}/{c:>3}"
+    assert compile_uri(quoted).build(c=1) == quoted.format(c=1)
+
+    assert compile_uri("/dcap").build() == "/dcap"
+    with pytest.raises(ValueError):
+        compile_uri("/dcap").build_many([1])
+
+
+@pytest.mark.parametrize("template", ["/a/{0}", "/a/{}", "/a/{b!r}", "/a/{b.c}", "/a/{b[0]}", "/a/{import}"])
+def test_unsupported_templates(template: str):
+    with pytest.raises(ValueError):
+        UriTemplate(template)
+
+
+def test_build_errors():
+    t = compile_uri(uri.DERControlUri)
+    with pytest.raises(KeyError):
+        t.build(site_id=1, derc_id=2)
+    with pytest.raises(ValueError):
+        t.build_many([1], param="foo", site_id=1, der_program_id=2)
+    with pytest.raises(ValueError):
+        t.build_many([1], site_id=1, der_program_id=2, derc_id=3)
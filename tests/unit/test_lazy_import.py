@@ -0,0 +1,88 @@
+import importlib
+import inspect
+import os
+import pkgutil
+import subprocess
+import sys
+
+import pytest
+
+from envoy_schema import admin, lazy_import
+from envoy_schema.admin import schema as admin_schema
+from envoy_schema.server.schema import sep2
+
+LAZY_PACKAGES = [sep2, admin_schema]
+
+# Names defined in multiple submodules - the value is the submodule that the package resolves the name to
+AMBIGUOUS_NAMES = {"envoy_schema.server.schema.sep2": {"DERControlResponse": "der"}}
+
+
+@pytest.mark.parametrize("package", LAZY_PACKAGES)
+def test_lazy_imports_in_sync(package):
+    """Every public class defined in a submodule should be resolvable from the package (and nothing else)"""
+    expected: dict[str, str] = {}
+    for _, submodule, _ in pkgutil.iter_modules(package.__path__):
+        module = importlib.import_module(f"{package.__name__}.{submodule}")
+        for name, obj in vars(module).items():
+            if inspect.isclass(obj) and obj.__module__ == module.__name__ and not name.startswith("_"):
+                expected.setdefault(name, submodule)
+    expected.update(AMBIGUOUS_NAMES.get(package.__name__, {}))
+
+    assert package._LAZY_IMPORTS == expected
+    for name, submodule in expected.items():
+        assert getattr(package, name) is getattr(importlib.import_module(f"{package.__name__}.{submodule}"), name)
+
+
+def test_lazy_getattr():
+    assert sep2.DERControlListResponse.__name__ == "DERControlListResponse"
+    assert "DERControlListResponse" in dir(sep2)
+    with pytest.raises(AttributeError):
+        sep2.NotAModel
+    with pytest.raises(AttributeError):
+        admin.schema.NotAModel
+
+
+def run_isolated(code: str, defer_build: bool) -> str:
+    """Runs code in a fresh interpreter (so that import side effects can be observed) returning stdout"""
+    env = {**os.environ, lazy_import.DEFER_BUILD_ENV_VAR: "1" if defer_build else "0"}
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)  # nosec
+    return result.stdout.strip()
+
+
+def test_package_import_is_lazy():
+    code = """
+import sys
+from envoy_schema.server.schema.sep2 import Reading
+from envoy_schema.admin.schema import SiteGroupResponse
+print(sorted(m for m in sys.modules if m.startswith("envoy_schema.") and m.count(".") > 2))
+"""
+    loaded = run_isolated(code, defer_build=False)
+    assert "envoy_schema.server.schema.sep2.metering" in loaded
+    assert "envoy_schema.admin.schema.site_group" in loaded
+    assert "envoy_schema.server.schema.sep2.pub_sub" not in loaded
+    assert "envoy_schema.admin.schema.billing" not in loaded
+
+
+def test_defer_build():
+    """Deferred models should be built on first use (or warm_up) and behave identically"""
+    code = """
+from envoy_schema.server.schema import sep2
+from envoy_schema.server.schema.sep2.der import DERControlListResponse, DefaultDERControl
+from envoy_schema.server.schema.sep2.serialization import get_plan
+
+print(DERControlListResponse.__pydantic_complete__, DefaultDERControl.__pydantic_complete__)
+xml = DERControlListResponse(all_=0, results=0).to_xml(exclude_none=True)
+print(DERControlListResponse.__pydantic_complete__, DERControlListResponse.from_xml(xml).all_)
+print(get_plan(DERControlListResponse) is not None)
+sep2.warm_up(["der"])
+print(DefaultDERControl.__pydantic_complete__)
+"""
+    assert run_isolated(code, defer_build=True).splitlines() == ["False False", "True 0", "True", "True"]
+    assert run_isolated(code, defer_build=False).splitlines() == ["True True", "True 0", "True", "True"]
+
+
+@pytest.mark.parametrize("package", LAZY_PACKAGES)
+def test_warm_up(package):
+    package.warm_up()
+    for submodule in set(package._LAZY_IMPORTS.values()):
+        assert f"{package.__name__}.{submodule}" in sys.modules